@@ -0,0 +1,2 @@
+
+# Empty __init__.py file to make the directory a package
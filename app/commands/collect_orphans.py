@@ -0,0 +1,40 @@
+"""
+Delete orphaned files from the uploads directory right away.
+
+The API runs the same collection every GC_INTERVAL_HOURS; this is for
+checking what it would reclaim, or reclaiming space without waiting.
+
+Run from the repository root:
+    python -m app.commands.collect_orphans [--dry-run]
+"""
+import os
+import argparse
+import logging
+
+from app.database import SessionLocal
+from app.services.orphans import collect_orphans
+
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Delete orphaned uploads")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Stay out of the way of the API and the analysis workers
+    os.nice(10)
+    db = SessionLocal()
+    try:
+        stats = collect_orphans(db, args.dry_run)
+    finally:
+        db.close()
+    action = "Would delete" if args.dry_run else "Deleted"
+    logger.info(
+        f"Scanned {stats['scanned']} files. {action} {stats['deleted']} orphans, "
+        f"{stats['bytes_reclaimed'] / (1024 * 1024):.1f} MB; "
+        f"{stats['refcounts_fixed']} blob reference counts off"
+    )
+
+if __name__ == "__main__":
+    main()
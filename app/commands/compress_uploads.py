@@ -0,0 +1,76 @@
+
+"""
+Compress the models already stored in the uploads directory.
+
+Files are compressed one at a time and atomically replaced, so this can run
+in the background while the API keeps serving; readers detect compressed
+files by content. Already compressed files are skipped, so an interrupted
+run can simply be restarted.
+
+Run from the repository root:
+    python -m app.commands.compress_uploads [--level 3] [--dry-run]
+"""
+import os
+import argparse
+import logging
+
+from app.config import settings
+from app.utils.file import compress_file, is_compressed
+
+logger = logging.getLogger(__name__)
+
+def stored_models():
+    """Yield the paths of model files in the compressed subfolders."""
+    for subfolder in settings.COMPRESSED_SUBFOLDERS:
+        for directory, _, names in os.walk(os.path.join(settings.UPLOAD_DIR, subfolder)):
+            for name in names:
+                if os.path.splitext(name)[1].lower() in settings.ALLOWED_EXTENSIONS:
+                    yield os.path.join(directory, name)
+
+def compress_uploads(level: int, dry_run: bool = False) -> dict:
+    """
+    Compress every stored model that is not compressed yet.
+
+    Args:
+        level: zstd compression level
+        dry_run: Only count the files that would be compressed
+
+    Returns:
+        Counts of compressed, skipped and failed files and bytes saved
+    """
+    stats = {"compressed": 0, "skipped": 0, "failed": 0, "bytes_saved": 0}
+    for full_path in stored_models():
+        try:
+            if dry_run:
+                stats["skipped" if is_compressed(full_path) else "compressed"] += 1
+                continue
+            size = os.path.getsize(full_path)
+            if compress_file(full_path, level):
+                stats["compressed"] += 1
+                stats["bytes_saved"] += size - os.path.getsize(full_path)
+            else:
+                stats["skipped"] += 1
+        except OSError as e:
+            # The file may have been deleted while we were running
+            logger.error(f"Could not compress {full_path}: {str(e)}")
+            stats["failed"] += 1
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Compress stored models with zstd")
+    parser.add_argument("--level", type=int, default=settings.UPLOAD_COMPRESSION_LEVEL)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    # Stay out of the way of the API and the analysis workers
+    os.nice(10)
+    stats = compress_uploads(args.level, args.dry_run)
+    action = "Would compress" if args.dry_run else "Compressed"
+    logger.info(
+        f"{action} {stats['compressed']} files, skipped {stats['skipped']}, "
+        f"failed {stats['failed']}, saved {stats['bytes_saved'] / (1024 * 1024):.1f} MB"
+    )
+
+if __name__ == "__main__":
+    main()
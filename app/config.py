@@ -1,7 +1,7 @@
 
 import os
 from pydantic import BaseSettings, PostgresDsn
-from typing import Optional
+from typing import Literal, Optional
 from dotenv import load_dotenv
 
 load_dotenv()  # Load .env file
@@ -26,6 +26,76 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50 MB
     ALLOWED_EXTENSIONS: list = [".stl", ".obj", ".3mf"]
     
+    # Optional zstd compression of stored models; readers detect compressed
+    # files by content, so both kinds can coexist under the same names
+    UPLOAD_COMPRESSION: bool = os.getenv("UPLOAD_COMPRESSION", "False").lower() in ("true", "1", "t")
+    UPLOAD_COMPRESSION_LEVEL: int = int(os.getenv("UPLOAD_COMPRESSION_LEVEL", "3"))
+    COMPRESSED_SUBFOLDERS: list = ["models", "quotes", "blobs"]
+    
+    # Resumable upload sessions; unfinished or unused ones are deleted once
+    # idle for the TTL, checked every sweep interval
+    UPLOAD_SESSION_TTL_HOURS: int = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+    UPLOAD_SESSION_SWEEP_MINUTES: int = int(os.getenv("UPLOAD_SESSION_SWEEP_MINUTES", "15"))
+    
+    # Orphaned uploads and derived files are deleted by a periodic scan of
+    # these subfolders, once unchanged for the grace period
+    GC_SUBFOLDERS: list = ["blobs", "sessions", "quotes", "models", "images"]
+    GC_GRACE_HOURS: int = int(os.getenv("GC_GRACE_HOURS", "24"))
+    GC_INTERVAL_HOURS: int = int(os.getenv("GC_INTERVAL_HOURS", "24"))
+    
+    # Serving uploads: content-addressed files are cached for this many seconds,
+    # and with an internal nginx location aliasing UPLOAD_DIR set here (e.g.
+    # "/protected-uploads/"), plain files are sent by nginx via X-Accel-Redirect
+    FILE_CACHE_MAX_AGE: int = int(os.getenv("FILE_CACHE_MAX_AGE", "31536000"))
+    FILE_ACCEL_REDIRECT_PREFIX: str = os.getenv("FILE_ACCEL_REDIRECT_PREFIX", "")
+    
+    # Durable background jobs for the side effects of requests (Google Drive,
+    # email), run by this many threads per process; failed jobs are retried
+    # with exponential backoff and kept as dead after their last attempt
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "6"))
+    JOB_RETRY_BASE_SECONDS: int = int(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+    JOB_RETRY_MAX_SECONDS: int = int(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", "5"))
+    JOB_LEASE_MINUTES: int = int(os.getenv("JOB_LEASE_MINUTES", "15"))  # Running jobs not renewed for this long were lost
+    JOB_RETENTION_DAYS: int = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+    JOB_STATS_WINDOW_MINUTES: int = int(os.getenv("JOB_STATS_WINDOW_MINUTES", "60"))
+    
+    # Mesh analysis worker pool settings
+    ANALYSIS_POOL_SIZE: int = int(os.getenv("ANALYSIS_POOL_SIZE", "2"))
+    ANALYSIS_QUEUE_DEPTH: int = int(os.getenv("ANALYSIS_QUEUE_DEPTH", "8"))
+    
+    # Slicer settings for print time and material estimates; each model is
+    # sliced within its analysis worker, so ANALYSIS_POOL_SIZE bounds the CPUs used
+    SLICE_LAYER_HEIGHT: float = float(os.getenv("SLICE_LAYER_HEIGHT", "0.2"))
+    
+    # Build directions sampled when searching for the best print orientation
+    ORIENTATION_CANDIDATES: int = int(os.getenv("ORIENTATION_CANDIDATES", "256"))
+    
+    # Printer build volumes (mm) used to estimate plates for quote quantities
+    PRINTERS: list = [
+        {"name": "Bambu Lab X1 Carbon", "x": 256, "y": 256, "z": 256},
+        {"name": "Prusa MK4", "x": 250, "y": 210, "z": 220},
+        {"name": "Creality K1 Max", "x": 300, "y": 300, "z": 300},
+    ]
+    PLATE_SPACING_MM: float = 5.0
+    
+    # Width and height of rendered model thumbnails in pixels
+    THUMBNAIL_SIZE: int = int(os.getenv("THUMBNAIL_SIZE", "512"))
+    
+    # Product images are resized to these widths (px, never upscaled) in
+    # WebP and JPEG, for responsive srcset attributes
+    IMAGE_VARIANT_WIDTHS: list = [320, 640, 1280]
+    IMAGE_VARIANT_QUALITY: int = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+    
+    # Directory for results cached by file content hash
+    CACHE_DIR: str = os.getenv("CACHE_DIR", "cache")
+    
+    # Each process brings its similarity index up to date with the quotes and
+    # products changed by the others this often, then saves it to CACHE_DIR
+    # so that startup only needs the changes made since
+    SIMILARITY_SYNC_MINUTES: int = int(os.getenv("SIMILARITY_SYNC_MINUTES", "5"))
+    
     # Email settings
     EMAIL_ENABLED: bool = os.getenv("EMAIL_ENABLED", "False").lower() in ("true", "1", "t")
     EMAIL_SENDER: str = os.getenv("EMAIL_SENDER", "noreply@proteuslab.com")
@@ -34,6 +104,19 @@ class Settings(BaseSettings):
     SMTP_USERNAME: str = os.getenv("SMTP_USERNAME", "")
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
     SMTP_USE_TLS: bool = os.getenv("SMTP_USE_TLS", "True").lower() in ("true", "1", "t")
+    # Authenticated SMTP connections kept open per process, and reopened
+    # once idle for longer than servers usually keep them
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    SMTP_TIMEOUT: float = float(os.getenv("SMTP_TIMEOUT", "30"))
+    SMTP_MAX_IDLE_SECONDS: float = float(os.getenv("SMTP_MAX_IDLE_SECONDS", "60"))
+    
+    # Admin notifications: "immediate" emails each one, "digest" buffers them
+    # into one email every ADMIN_DIGEST_MINUTES; quotes priced at
+    # ADMIN_PRIORITY_QUOTE_PRICE or more are always sent at once (0 disables)
+    ADMIN_EMAIL: str = os.getenv("ADMIN_EMAIL", "cscheidegger@gmail.com")
+    ADMIN_NOTIFICATION_MODE: Literal["immediate", "digest"] = os.getenv("ADMIN_NOTIFICATION_MODE", "immediate")
+    ADMIN_DIGEST_MINUTES: int = int(os.getenv("ADMIN_DIGEST_MINUTES", "15"))
+    ADMIN_PRIORITY_QUOTE_PRICE: float = float(os.getenv("ADMIN_PRIORITY_QUOTE_PRICE", "0"))
     
     # Frontend URL for links in emails
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
@@ -41,6 +124,7 @@ class Settings(BaseSettings):
     # Google Drive integration
     GDRIVE_ENABLED: bool = os.getenv("GDRIVE_ENABLED", "False").lower() in ("true", "1", "t")
     GDRIVE_FOLDER_ID: str = os.getenv("GDRIVE_FOLDER_ID", "")
+    GDRIVE_UPLOAD_CONCURRENCY: int = int(os.getenv("GDRIVE_UPLOAD_CONCURRENCY", "4"))  # Files uploaded at once per process
 
     class Config:
         env_file = ".env"
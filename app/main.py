@@ -4,8 +4,14 @@ from fastapi.middleware.cors import CORSMiddleware
 import os
 
 from app.config import settings
-from app.routes import products, services, orders, users, auth, instagram
+from app.routes import products, services, orders, users, auth, instagram, uploads, files, jobs
 from app.routes.quotes import router as quotes_router
+from app.database import get_db
+from app.services.workers import shutdown_pool
+from app.services.scheduler import start_scheduler, shutdown_scheduler
+from app.services.jobs import start_job_workers, stop_job_workers
+from app.utils.mail_transport import close_mail_transport
+from app.services.similarity import load_similarity_index
 
 # Create upload directory if it doesn't exist
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
@@ -33,6 +39,30 @@ app.include_router(orders.router, prefix=settings.API_V1_STR)
 app.include_router(quotes_router, prefix=settings.API_V1_STR)
 app.include_router(users.router, prefix=settings.API_V1_STR)
 app.include_router(instagram.router, prefix=settings.API_V1_STR)
+app.include_router(uploads.router, prefix=settings.API_V1_STR)
+app.include_router(files.router, prefix=settings.API_V1_STR)
+app.include_router(jobs.router, prefix=settings.API_V1_STR)
+
+@app.on_event("startup")
+def load_indexes():
+    # Through get_db, so that overriding it also applies here
+    sessions = app.dependency_overrides.get(get_db, get_db)()
+    try:
+        load_similarity_index(next(sessions))
+    finally:
+        sessions.close()
+
+@app.on_event("startup")
+def start_maintenance():
+    start_scheduler()
+    start_job_workers()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    stop_job_workers()
+    shutdown_scheduler()
+    shutdown_pool()
+    close_mail_transport()
 
 @app.get("/")
 def root():
@@ -5,3 +5,7 @@ from app.models.product import Product
 from app.models.service import Service
 from app.models.order import Order, OrderItem
 from app.models.quote import Quote
+from app.models.blob import Blob
+from app.models.upload_session import UploadSession
+from app.models.job import Job
+from app.models.notification import AdminNotification
@@ -0,0 +1,14 @@
+
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class Blob(Base):
+    __tablename__ = "blobs"
+    
+    path = Column(String, primary_key=True)  # Path relative to the uploads directory
+    sha256 = Column(String(64), index=True)
+    size = Column(BigInteger)  # Size of the original content in bytes
+    refcount = Column(Integer, default=0)  # Quotes and products referencing the blob
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,33 @@
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, JSON, Index
+from sqlalchemy.sql import func
+import enum
+from app.database import Base
+
+class JobStatus(str, enum.Enum):
+    pending = "pending"  # Waiting for its run time, including retries
+    running = "running"  # Claimed by a worker
+    done = "done"
+    dead = "dead"  # Failed every attempt; kept for inspection and manual retry
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), index=True)  # Name of the registered handler
+    payload = Column(JSON)
+    status = Column(Enum(JobStatus), default=JobStatus.pending)
+    depends_on = Column(Integer, ForeignKey("jobs.id"), nullable=True)  # Held back until this job finishes
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer)
+    run_at = Column(DateTime(timezone=True), server_default=func.now())  # Not claimed before this time
+    locked_at = Column(DateTime(timezone=True), nullable=True)  # When a worker claimed it
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)  # First claim
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Workers look for due jobs of a status
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
@@ -0,0 +1,12 @@
+
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AdminNotification(Base):
+    __tablename__ = "admin_notifications"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    subject = Column(String)
+    link = Column(String, nullable=True)  # Admin page of what the notification is about
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
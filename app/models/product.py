@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, JSON
 from sqlalchemy.sql import func
 from app.database import Base
 
@@ -12,7 +12,11 @@ class Product(Base):
     price = Column(Float)
     category = Column(String, index=True)
     image = Column(String)  # URL or path to image
+    image_variants = Column(JSON, nullable=True)  # Resized copies of the image for srcset
     model_file = Column(String, nullable=True)  # Path to 3D model file
+    model_analysis = Column(JSON, nullable=True)  # Volume, area and bounding box of the model
+    thumbnail = Column(String, nullable=True)  # Rendered preview of the model
+    model_previews = Column(JSON, nullable=True)  # Decimated meshes for the web viewer
     rating_sum = Column(Integer, default=0)
     rating_count = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,24 @@
+
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Enum
+from sqlalchemy.sql import func
+import enum
+from app.database import Base
+
+class UploadSessionStatus(str, enum.Enum):
+    open = "open"  # Receiving chunks
+    complete = "complete"  # Finalized into the upload store, not yet used by a quote
+
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(32), primary_key=True)  # Random hex token, used in the session URLs
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    filename = Column(String)
+    size = Column(BigInteger)  # Total size declared by the client in bytes
+    received = Column(BigInteger, default=0)  # Contiguous bytes on disk from the start
+    status = Column(Enum(UploadSessionStatus), default=UploadSessionStatus.open)
+    file_path = Column(String, nullable=True)  # Blob holding the content once complete
+    sha256 = Column(String(64), nullable=True)
+    expires_at = Column(DateTime(timezone=True), index=True)  # Pushed back by every chunk
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
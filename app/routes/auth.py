@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional
 
 from app.database import get_db
 from app.services import auth as auth_service
@@ -13,6 +13,7 @@ from app.schemas.token import Token
 router = APIRouter(tags=["authentication"], prefix="/auth")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
 
 @router.post("/register", response_model=User)
 def register(user_data: UserCreate, db: Session = Depends(get_db)) -> Any:
@@ -75,6 +76,15 @@ def get_current_user(
     user = auth_service.get_current_user(db, token, credentials_exception)
     return user
 
+# Dependency to get the current user on routes also open to anonymous users
+def get_optional_user(
+    db: Session = Depends(get_db),
+    token: Optional[str] = Depends(oauth2_scheme_optional)
+) -> Optional[User]:
+    if token is None:
+        return None
+    return get_current_user(db, token)
+
 # Dependency to get current active user
 def get_current_active_user(
     current_user: User = Depends(get_current_user),
@@ -0,0 +1,131 @@
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from urllib.parse import quote
+import os
+import posixpath
+
+from app.database import get_db
+from app.models.product import Product as ProductModel
+from app.models.quote import Quote as QuoteModel
+from app.routes.auth import get_optional_user
+from app.schemas.user import User
+from app.config import settings
+from app.services.blobs import is_blob_path, derived_source
+from app.utils.file_response import stored_file_response
+
+router = APIRouter(tags=["files"], prefix="/files")
+
+def _sources(file_path: str) -> List[str]:
+    """
+    Stored files whose access rules apply to a requested file: the file
+    itself and, for thumbnails and previews of files in the blob store,
+    the files they may have been built from.
+    """
+    sources = [file_path]
+    derived = derived_source(file_path)
+    if derived and is_blob_path(derived[0] + os.sep):
+        directory, sha256 = derived
+        sources += [os.path.join(directory, f"{sha256}{ext}") for ext in settings.ALLOWED_EXTENSIONS]
+    return sources
+
+def _is_public(db: Session, file_path: str, sources: List[str]) -> bool:
+    """Check whether a file belongs to a product; products are public."""
+    if db.query(ProductModel.id).filter(or_(
+        ProductModel.image.in_(sources),
+        ProductModel.model_file.in_(sources),
+        ProductModel.thumbnail == file_path
+    )).first():
+        return True
+
+    # Previews and image variants, named by the hash of their source file
+    derived = derived_source(file_path)
+    if derived:
+        directory, sha256 = derived
+        products = db.query(ProductModel).filter(or_(
+            ProductModel.model_file.like(f"{directory}/%"),
+            ProductModel.image.like(f"{directory}/%")
+        ))
+        return any(
+            (product.model_analysis or {}).get("sha256") == sha256
+            or any(variant["path"] == file_path for variant in product.image_variants or [])
+            for product in products
+        )
+    return False
+
+def _quote_owners(db: Session, file_path: str, sources: List[str], user: User) -> set:
+    """IDs of the users owning quotes with the file."""
+    owners = {
+        user_id for (user_id,) in db.query(QuoteModel.user_id).filter(
+            or_(*[QuoteModel.files.any(source) for source in sources])
+        )
+    }
+
+    # Thumbnails of models stored before the blob store are only known to their quotes
+    if derived_source(file_path) and not is_blob_path(file_path):
+        for quote in db.query(QuoteModel).filter(QuoteModel.user_id == user.id):
+            if file_path in (quote.metadata or {}).get("thumbnails", {}).values():
+                owners.add(user.id)
+    return owners
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+def get_file(
+    file_path: str,
+    request: Request,
+    current_user: Optional[User] = Depends(get_optional_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download an uploaded file, such as a product image or a quote model.
+
+    Product files, with their image variants, are public. Quote files,
+    their thumbnails and previews follow the rules of GET /quotes/{id}: only the quote's owner and
+    admins may read them. Supports byte ranges for resumable downloads and
+    conditional requests; content-addressed files are cacheable forever.
+    """
+    # Only ever serve files under the uploads directory
+    file_path = posixpath.normpath(file_path)
+    if file_path.startswith(("/", "..")) or file_path == ".":
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # Check access
+    sources = _sources(file_path)
+    public = _is_public(db, file_path, sources)
+    if not public:
+        if current_user is None:
+            raise HTTPException(
+                status_code=401,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"}
+            )
+        owners = _quote_owners(db, file_path, sources, current_user)
+        if not owners and not (current_user.is_admin and derived_source(file_path)):
+            raise HTTPException(status_code=404, detail="File not found")
+        if not current_user.is_admin and current_user.id not in owners:
+            raise HTTPException(status_code=403, detail="Not authorized to access this file")
+
+    # Content-addressed files never change under their name
+    etag = None
+    scope = "public" if public else "private"
+    cache_control = f"{scope}, no-cache"
+    if is_blob_path(file_path) or derived_source(file_path):
+        cache_control = f"{scope}, max-age={settings.FILE_CACHE_MAX_AGE}, immutable"
+        if is_blob_path(file_path) and not derived_source(file_path):
+            etag = os.path.splitext(os.path.basename(file_path))[0]
+
+    accel_path = None
+    if settings.FILE_ACCEL_REDIRECT_PREFIX:
+        accel_path = settings.FILE_ACCEL_REDIRECT_PREFIX + quote(file_path)
+
+    try:
+        return stored_file_response(
+            request,
+            os.path.join(settings.UPLOAD_DIR, file_path),
+            etag=etag,
+            cache_control=cache_control,
+            accel_path=accel_path
+        )
+    except (FileNotFoundError, IsADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
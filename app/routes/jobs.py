@@ -0,0 +1,56 @@
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database import get_db
+from app.models.job import Job as JobModel, JobStatus
+from app.schemas.job import Job, JobStats
+from app.routes.auth import get_current_admin_user
+from app.schemas.user import User
+from app.services.jobs import queue_stats, retry_job
+
+router = APIRouter(tags=["jobs"], prefix="/jobs")
+
+@router.get("/stats", response_model=JobStats)
+def get_job_stats(
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get the depth of the background job queue and the latency of recent jobs (admin only).
+    """
+    return queue_stats(db)
+
+@router.get("/dead", response_model=List[Job])
+def get_dead_jobs(
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    List the jobs that failed every attempt, newest first (admin only).
+    """
+    return db.query(JobModel).filter(
+        JobModel.status == JobStatus.dead
+    ).order_by(JobModel.finished_at.desc()).offset(skip).limit(limit).all()
+
+@router.post("/{job_id}/retry", response_model=Job)
+def retry_dead_job(
+    job_id: int,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Run a dead job again with a fresh set of attempts (admin only).
+    """
+    job = db.query(JobModel).filter(JobModel.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != JobStatus.dead:
+        raise HTTPException(status_code=409, detail="Only dead jobs can be retried")
+    
+    retry_job(db, job)
+    db.refresh(job)
+    return job
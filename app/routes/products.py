@@ -2,13 +2,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import os
+import logging
 from app.database import get_db
 from app.models.product import Product as ProductModel
-from app.schemas.product import Product, ProductCreate, ProductUpdate
+from app.schemas.product import Product, ProductAdmin, ProductCreate, ProductUpdate
 from app.routes.auth import get_current_active_user, get_current_admin_user
 from app.schemas.user import User
 from app.config import settings
+from app.services.analysis import analyze_upload_sync
+from app.services.workers import WorkerPoolSaturated
+from app.services.similarity import index_product, unindex
+from app.services.jobs import notify_job_workers
+from app.services.render_jobs import enqueue_product_model_renders, enqueue_product_image_variants
+from app.services.blobs import save_blob_sync, release_file, release_files
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["products"], prefix="/products")
 
@@ -39,7 +47,21 @@ def get_product(product_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
-@router.post("/", response_model=Product)
+@router.get("/{product_id}/admin", response_model=ProductAdmin)
+def get_product_admin(
+    product_id: int,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get a specific product with its model's full analysis (admin only).
+    """
+    product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+@router.post("/", response_model=ProductAdmin)
 def create_product(
     title: str = Form(...),
     description: str = Form(...),
@@ -61,24 +83,40 @@ def create_product(
         "category": category,
     }
     
-    # Handle image upload
-    if image:
-        image_path = save_upload_file(image, "images")
-        product_data["image"] = image_path
-    
-    # Handle 3D model upload
-    if model_file:
-        model_path = save_upload_file(model_file, "models")
-        product_data["model_file"] = model_path
+    saved = []
+    try:
+        # Handle image upload
+        image_sha256 = None
+        if image:
+            image_path, image_sha256 = save_blob_sync(db, image)
+            saved.append(image_path)
+            product_data["image"] = image_path
+        
+        # Handle 3D model upload
+        if model_file:
+            model_path, sha256 = save_blob_sync(db, model_file, settings.ALLOWED_EXTENSIONS)
+            saved.append(model_path)
+            product_data["model_file"] = model_path
+            product_data["model_analysis"] = analyze_product_model(model_path, sha256)
+    except Exception:
+        # Nothing references the files saved so far
+        release_files(db, saved)
+        raise
     
-    # Create and save product
+    # Create and save product, with the resizing of its image and the rendering of its model
     db_product = ProductModel(**product_data)
     db.add(db_product)
+    db.flush()
+    if image_sha256:
+        enqueue_product_image_variants(db, db_product, image_sha256)
+    enqueue_product_model_renders(db, db_product)
     db.commit()
     db.refresh(db_product)
+    notify_job_workers()
+    index_product(db_product)
     return db_product
 
-@router.put("/{product_id}", response_model=Product)
+@router.put("/{product_id}", response_model=ProductAdmin)
 def update_product(
     product_id: int,
     title: Optional[str] = Form(None),
@@ -108,23 +146,49 @@ def update_product(
     if category:
         db_product.category = category
     
+    # Save the new files first, so a rejected upload keeps the old ones
+    saved = []
+    try:
+        if image:
+            image_path, image_sha256 = save_blob_sync(db, image)
+            saved.append(image_path)
+        if model_file:
+            model_path, sha256 = save_blob_sync(db, model_file, settings.ALLOWED_EXTENSIONS)
+            saved.append(model_path)
+            model_analysis = analyze_product_model(model_path, sha256)
+    except Exception:
+        # Nothing references the files saved so far
+        db.rollback()
+        release_files(db, saved)
+        raise
+    
     # Handle image upload
     if image:
         if db_product.image:
-            delete_file(db_product.image)
-        image_path = save_upload_file(image, "images")
+            delete_file(db, db_product.image)
         db_product.image = image_path
+        # Set by its job once resized
+        db_product.image_variants = None
+        enqueue_product_image_variants(db, db_product, image_sha256)
     
     # Handle 3D model upload
     if model_file:
         if db_product.model_file:
-            delete_file(db_product.model_file)
-        model_path = save_upload_file(model_file, "models")
+            delete_file(db, db_product.model_file)
         db_product.model_file = model_path
+        db_product.model_analysis = model_analysis
+        # Set by their jobs once rendered
+        db_product.thumbnail = None
+        db_product.model_previews = None
+        enqueue_product_model_renders(db, db_product)
     
     # Save changes
     db.commit()
     db.refresh(db_product)
+    if image or model_file:
+        notify_job_workers()
+    if model_file:
+        index_product(db_product)
     return db_product
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -143,32 +207,29 @@ def delete_product(
     
     # Delete associated files
     if db_product.image:
-        delete_file(db_product.image)
+        delete_file(db, db_product.image)
     if db_product.model_file:
-        delete_file(db_product.model_file)
+        delete_file(db, db_product.model_file)
     
     # Delete product
     db.delete(db_product)
     db.commit()
+    unindex("product", product_id)
     return None
 
 # Utility functions for file handling
-def save_upload_file(upload_file: UploadFile, subfolder: str) -> str:
-    """Save an uploaded file and return its path."""
-    upload_dir = os.path.join(settings.UPLOAD_DIR, subfolder)
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    file_path = os.path.join(upload_dir, upload_file.filename)
-    
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        buffer.write(upload_file.file.read())
+def analyze_product_model(model_path: str, sha256: Optional[str] = None) -> Optional[dict]:
+    """Analyze a stored product model, returning None if it cannot be parsed."""
+    try:
+        analysis = analyze_upload_sync(model_path, sha256)
+    except WorkerPoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     
-    # Return the path relative to the upload directory
-    return os.path.join(subfolder, upload_file.filename)
+    if "error" in analysis:
+        logger.warning(f"Could not analyze product model {model_path}: {analysis['error']}")
+        return None
+    return analysis
 
-def delete_file(file_path: str) -> None:
-    """Delete a file if it exists."""
-    full_path = os.path.join(settings.UPLOAD_DIR, file_path)
-    if os.path.exists(full_path):
-        os.remove(full_path)
+def delete_file(db: Session, file_path: str) -> None:
+    """Release a stored file, deleting it and its derived files once the last quote or product using it is saved."""
+    release_file(db, file_path)
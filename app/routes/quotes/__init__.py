@@ -4,6 +4,8 @@ from backend.app.routes.quotes.list import router as list_router
 from backend.app.routes.quotes.details import router as details_router
 from backend.app.routes.quotes.create import router as create_router
 from backend.app.routes.quotes.manage import router as manage_router
+from backend.app.routes.quotes.pricing import router as pricing_router
+from backend.app.routes.quotes.similar import router as similar_router
 
 # Main quotes router
 router = APIRouter(tags=["quotes"], prefix="/quotes")
@@ -13,3 +15,5 @@ router.include_router(list_router)
 router.include_router(details_router)
 router.include_router(create_router)
 router.include_router(manage_router)
+router.include_router(pricing_router)
+router.include_router(similar_router)
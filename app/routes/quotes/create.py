@@ -1,5 +1,6 @@
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import os
@@ -11,10 +12,14 @@ from app.schemas.quote import QuoteResponse
 from app.routes.auth import get_current_active_user
 from app.schemas.user import User
 from app.config import settings
-from app.utils.email import send_quote_notification, send_advanced_quote_notification
-from app.utils.gdrive import create_quote_folder, upload_file_to_drive
-from app.utils.file import save_upload_file
-from app.routes.quotes.utils import handle_file_uploads, setup_drive_folder
+from app.routes.quotes.utils import handle_file_uploads, analyze_uploaded_files, orient_uploaded_files
+from app.services.pricing import price_models
+from app.services.nesting import estimate_plates
+from app.services.similarity import index_quote
+from app.services.jobs import notify_job_workers
+from app.services.quote_jobs import enqueue_quote_side_effects
+from app.services.render_jobs import enqueue_quote_thumbnails
+from app.services.upload_sessions import consume_sessions
 
 router = APIRouter()
 
@@ -22,44 +27,57 @@ router = APIRouter()
 async def create_quote(
     description: str = Form(...),
     files: List[UploadFile] = File([]),
+    file_hashes: List[str] = Form([]),
+    upload_sessions: List[str] = Form([]),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
     Create a new quote request.
+    
+    Files already stored (see GET /uploads/{sha256}) can be passed by hash
+    in file_hashes instead of being uploaded again, and files uploaded
+    through resumable upload sessions by session ID in upload_sessions.
     """
     # Save uploaded files
-    saved_files = await handle_file_uploads(files)
+    uploads = await handle_file_uploads(files, db, file_hashes, upload_sessions, current_user.id)
+    saved_files = list(dict(uploads))
+    models = await analyze_uploaded_files(uploads, db)
     
     # Create quote
     db_quote = QuoteModel(
         user_id=current_user.id,
         description=description,
         files=saved_files,
-        status=QuoteStatus.pending
+        status=QuoteStatus.pending,
+        metadata={"models": models, "thumbnails": {}}
     )
     db.add(db_quote)
-    db.commit()
-    db.refresh(db_quote)
-    
-    # Create Google Drive folder if enabled
-    drive_url = await setup_drive_folder(db_quote, saved_files, db)
+    db.flush()
     
-    # Send email notification
+    # Queue the Google Drive folder, the email notification and the thumbnails with the quote
     quote_data = {
         'id': db_quote.id,
         'description': description,
-        'status': db_quote.status,
+        'status': db_quote.status.value,
         'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'drive_url': drive_url
+        'drive_url': None
     }
-    send_quote_notification(quote_data)
+    enqueue_quote_side_effects(db, db_quote, quote_data)
+    enqueue_quote_thumbnails(db, db_quote)
+    consume_sessions(db, upload_sessions, current_user.id)
+    db.commit()
+    db.refresh(db_quote)
+    notify_job_workers()
+    
+    # Make the files searchable for similar future quotes
+    await run_in_threadpool(index_quote, db_quote)
     
     return {
         "id": db_quote.id,
         "message": "Quote request submitted successfully",
         "status": db_quote.status,
-        "drive_url": drive_url
+        "drive_url": db_quote.drive_url
     }
 
 @router.post("/advanced", response_model=QuoteResponse)
@@ -74,15 +92,37 @@ async def create_advanced_quote(
     deadline: str = Form(...),
     application: str = Form(...),
     comments: str = Form(None),
-    files: List[UploadFile] = File(...),
+    files: List[UploadFile] = File([]),
+    file_hashes: List[str] = Form([]),
+    upload_sessions: List[str] = Form([]),
     current_user: Optional[User] = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
     Create a new advanced quote request with detailed information.
+    
+    Files already stored (see GET /uploads/{sha256}) can be passed by hash
+    in file_hashes instead of being uploaded again, and files uploaded
+    through resumable upload sessions by session ID in upload_sessions.
     """
+    if not files and not file_hashes and not upload_sessions:
+        raise HTTPException(status_code=400, detail="At least one file is required")
+    
     # Save uploaded files
-    saved_files = await handle_file_uploads(files)
+    uploads = await handle_file_uploads(
+        files, db, file_hashes, upload_sessions, current_user.id if current_user else None
+    )
+    saved_files = list(dict(uploads))
+    models = await analyze_uploaded_files(uploads, db)
+    orientation = await orient_uploaded_files(models, db)
+    
+    # Estimate build plates for the requested quantity
+    nesting = None
+    if models and all("dimensions_mm" in analysis for analysis in models.values()):
+        nesting = estimate_plates([analysis["dimensions_mm"] for analysis in models.values()], quantity)
+    
+    # Price the files from their geometry; None leaves pricing to an admin
+    pricing = price_models(models, material, finish, quantity, nesting)
     
     # Prepare description with all the details
     description = f"""
@@ -106,6 +146,7 @@ async def create_advanced_quote(
         description=description,
         files=saved_files,
         status=QuoteStatus.pending,
+        estimated_price=pricing["total"] if pricing else None,
         metadata={
             "name": name,
             "email": email,
@@ -115,17 +156,18 @@ async def create_advanced_quote(
             "finish": finish,
             "quantity": quantity,
             "deadline": deadline,
-            "application": application
+            "application": application,
+            "models": models,
+            "orientation": orientation,
+            "thumbnails": {},
+            "nesting": nesting,
+            "pricing": pricing
         }
     )
     db.add(db_quote)
-    db.commit()
-    db.refresh(db_quote)
-    
-    # Create Google Drive folder if enabled
-    drive_url = await setup_drive_folder(db_quote, saved_files, db)
+    db.flush()
     
-    # Send email notification
+    # Queue the Google Drive folder, the email notification and the thumbnails with the quote
     quote_data = {
         'id': db_quote.id,
         'name': name,
@@ -139,15 +181,23 @@ async def create_advanced_quote(
         'application': application,
         'comments': comments,
         'num_files': len(saved_files),
-        'status': db_quote.status,
+        'status': db_quote.status.value,
         'created_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        'drive_url': drive_url
+        'drive_url': None
     }
-    send_advanced_quote_notification(quote_data)
+    enqueue_quote_side_effects(db, db_quote, quote_data, advanced=True)
+    enqueue_quote_thumbnails(db, db_quote)
+    consume_sessions(db, upload_sessions, current_user.id if current_user else None)
+    db.commit()
+    db.refresh(db_quote)
+    notify_job_workers()
+    
+    # Make the files searchable for similar future quotes
+    await run_in_threadpool(index_quote, db_quote)
     
     return {
         "id": db_quote.id,
         "message": "Quote request submitted successfully",
         "status": db_quote.status,
-        "drive_url": drive_url
+        "drive_url": db_quote.drive_url
     }
@@ -1,15 +1,31 @@
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+import os
 
+from app.config import settings
 from app.database import get_db
 from app.models.quote import Quote as QuoteModel
 from app.schemas.quote import Quote
 from app.routes.auth import get_current_active_user
 from app.schemas.user import User
+from app.utils.zip_stream import stream_zip
 
 router = APIRouter()
 
+def _get_readable_quote(quote_id: int, current_user: User, db: Session) -> QuoteModel:
+    """Get a quote the current user may read: their own, or any for admins."""
+    quote = db.query(QuoteModel).filter(QuoteModel.id == quote_id).first()
+    if not quote:
+        raise HTTPException(status_code=404, detail="Quote not found")
+
+    # Check if user is allowed to view the quote
+    if not current_user.is_admin and quote.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this quote")
+
+    return quote
+
 @router.get("/{quote_id}", response_model=Quote)
 def get_quote(
     quote_id: int,
@@ -19,13 +35,34 @@ def get_quote(
     """
     Get a specific quote by ID.
     """
-    # Get quote
-    quote = db.query(QuoteModel).filter(QuoteModel.id == quote_id).first()
-    if not quote:
-        raise HTTPException(status_code=404, detail="Quote not found")
-    
-    # Check if user is allowed to view the quote
-    if not current_user.is_admin and quote.user_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to access this quote")
-    
-    return quote
+    return _get_readable_quote(quote_id, current_user, db)
+
+@router.get("/{quote_id}/files.zip")
+def download_quote_files(
+    quote_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Download all files of a quote as one ZIP archive.
+
+    The archive is built while it is sent, so the download starts at once
+    and server memory stays constant however large the files are.
+    """
+    quote = _get_readable_quote(quote_id, current_user, db)
+
+    # Name the entries after the stored files, keeping names unique
+    entries = []
+    names = set()
+    for index, file_path in enumerate(quote.files or [], start=1):
+        name = os.path.basename(file_path)
+        if name in names:
+            name = f"{index}-{name}"
+        names.add(name)
+        entries.append((name, os.path.join(settings.UPLOAD_DIR, file_path)))
+
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="quote-{quote.id}-files.zip"'}
+    )
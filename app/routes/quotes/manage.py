@@ -1,5 +1,6 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.database import get_db
@@ -7,7 +8,10 @@ from app.models.quote import Quote as QuoteModel
 from app.schemas.quote import Quote, QuoteUpdate
 from app.routes.auth import get_current_active_user, get_current_admin_user
 from app.schemas.user import User
-from app.utils.file import delete_upload_file
+from app.services.blobs import release_file
+from app.services.analysis import analyze_upload, orient_upload
+from app.services.workers import gather_in_pool, WorkerPoolSaturated
+from app.services.similarity import index_quote, unindex
 
 router = APIRouter()
 
@@ -45,6 +49,45 @@ def update_quote(
     
     return quote
 
+@router.post("/{quote_id}/analysis", response_model=Quote)
+async def reanalyze_quote(
+    quote_id: int,
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Re-run geometry, printability and orientation checks on a quote's files (admin only).
+    """
+    # Get quote
+    quote = db.query(QuoteModel).filter(QuoteModel.id == quote_id).first()
+    if not quote:
+        raise HTTPException(status_code=404, detail="Quote not found")
+    
+    try:
+        files = quote.files or []
+        results = await gather_in_pool(analyze_upload(file_path) for file_path in files)
+        models = dict(zip(files, results))
+        paths = [file_path for file_path, analysis in models.items() if "error" not in analysis]
+        orientations = await gather_in_pool(
+            orient_upload(file_path, models[file_path]["sha256"]) for file_path in paths
+        )
+    except WorkerPoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    # Assign a new dict so the JSON column is marked as changed
+    quote.metadata = {
+        **(quote.metadata or {}),
+        "models": models,
+        "orientation": dict(zip(paths, orientations))
+    }
+    
+    # Save changes
+    db.commit()
+    db.refresh(quote)
+    await run_in_threadpool(index_quote, quote)
+    
+    return quote
+
 @router.delete("/{quote_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_quote(
     quote_id: int,
@@ -63,12 +106,13 @@ def delete_quote(
     if not current_user.is_admin and quote.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this quote")
     
-    # Delete associated files
+    # Release associated files, which are deleted unless shared with another quote or product
     for file_path in quote.files:
-        delete_upload_file(file_path)
+        release_file(db, file_path)
     
     # Delete quote
     db.delete(quote)
     db.commit()
+    unindex("quote", quote_id)
     
     return None
@@ -0,0 +1,77 @@
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.schemas.quote import PriceMatrix
+from app.routes.auth import get_current_active_user
+from app.schemas.user import User
+from app.services.pricing import price_matrix, validate_options, PricingError, CURRENCY
+from app.services.nesting import estimate_plates
+from app.database import get_db
+from app.services.blobs import release_files
+from app.routes.quotes.utils import handle_file_uploads, analyze_uploaded_files
+
+router = APIRouter()
+
+@router.post("/price", response_model=PriceMatrix)
+async def price_files(
+    files: List[UploadFile] = File(...),
+    materials: List[str] = Form(...),
+    finishes: List[str] = Form(...),
+    quantity: int = Form(1),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Price every uploaded file for every material and finish combination.
+    """
+    options = [(material, finish) for material in materials for finish in finishes]
+    # Reject unknown options before storing and analyzing anything
+    try:
+        validate_options(options, quantity)
+    except PricingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Analyze the files, which are only kept for the duration of the request;
+    # a failed analysis releases them itself
+    uploads = await handle_file_uploads(files, db)
+    models = await analyze_uploaded_files(uploads, db)
+    release_files(db, models)
+
+    analyses = [models[file_path] for file_path, _ in uploads]
+    priced = [analysis for analysis in analyses if "volume_cm3" in analysis]
+    
+    # Plates for the requested copies of each file on its best printer
+    nestings = [estimate_plates([analysis["dimensions_mm"]], quantity) for analysis in priced]
+    plates = [nesting["plates"] if nesting else 0 for nesting in nestings]
+    try:
+        prices = price_matrix([analysis["volume_cm3"] for analysis in priced], options, quantity, plates)
+    except PricingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    results = []
+    row = 0
+    for file, analysis in zip(files, analyses):
+        if "volume_cm3" not in analysis:
+            results.append({"filename": file.filename, "error": analysis.get("error")})
+            continue
+        nesting = nestings[row]
+        results.append({
+            "filename": file.filename,
+            "volume_cm3": analysis["volume_cm3"],
+            "plates": nesting["plates"] if nesting else None,
+            "printer": nesting["printer"] if nesting else None,
+            "error": None if nesting else "Part does not fit any printer",
+            "weight_g": prices["weight_g"][row].tolist(),
+            "unit_price": prices["unit_price"][row].tolist(),
+            "total_price": prices["total_price"][row].tolist(),
+        })
+        row += 1
+
+    return {
+        "currency": CURRENCY,
+        "quantity": quantity,
+        "options": [{"material": material, "finish": finish} for material, finish in options],
+        "files": results
+    }
@@ -0,0 +1,43 @@
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List
+
+from app.database import get_db
+from app.models.quote import Quote as QuoteModel
+from app.schemas.quote import SimilarModels
+from app.routes.auth import get_current_admin_user
+from app.schemas.user import User
+from app.services.similarity import similarity_index
+
+router = APIRouter()
+
+@router.get("/{quote_id}/similar", response_model=List[SimilarModels])
+def get_similar_models(
+    quote_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Find past quotes and catalog products similar to each file of a quote (admin only).
+    """
+    # Get quote
+    quote = db.query(QuoteModel).filter(QuoteModel.id == quote_id).first()
+    if not quote:
+        raise HTTPException(status_code=404, detail="Quote not found")
+    
+    models = (quote.metadata or {}).get("models") or {}
+    results = []
+    for file_path in quote.files:
+        analysis = models.get(file_path) or {}
+        if "descriptor" not in analysis:
+            results.append({"file": file_path, "matches": [], "error": "File has no shape descriptor"})
+            continue
+        matches = similarity_index.query(analysis["descriptor"], limit, exclude=("quote", quote_id))
+        results.append({
+            "file": file_path,
+            "matches": [dict(match, file=match.pop("name")) for match in matches]
+        })
+    
+    return results
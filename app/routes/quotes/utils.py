@@ -1,60 +1,124 @@
 
-from fastapi import UploadFile
+from fastapi import UploadFile, HTTPException
 from sqlalchemy.orm import Session
 import os
-from typing import List
+import logging
+from typing import Any, Dict, List, Optional, Tuple
 
-from app.utils.file import save_upload_file
-from app.utils.gdrive import create_quote_folder, upload_file_to_drive
 from app.config import settings
-from app.models.quote import Quote as QuoteModel
+from app.services.analysis import analyze_upload, orient_upload
+from app.services.workers import gather_in_pool, WorkerPoolSaturated
+from app.services.blobs import save_blobs, attach_blob, release_files, SHA256_PATTERN
+from app.services.upload_sessions import claim_sessions
 
-async def handle_file_uploads(files: List[UploadFile]) -> List[str]:
+logger = logging.getLogger(__name__)
+
+async def handle_file_uploads(
+    files: List[UploadFile],
+    db: Session,
+    file_hashes: Optional[List[str]] = None,
+    upload_sessions: Optional[List[str]] = None,
+    user_id: Optional[int] = None
+) -> List[Tuple[str, str]]:
     """
     Process and save uploaded files
     
+    The files are streamed concurrently into the deduplicated store; if any
+    is rejected, none are kept. Files the client did not re-upload because
+    they already stored them (see GET /uploads/{sha256}) are referenced
+    by hash, and files sent through resumable upload sessions are claimed
+    from their finalized sessions. The sessions themselves are only deleted
+    with consume_sessions once the quote is saved, so a request failing
+    before (e.g. with a 503) can be retried with the same sessions.
+    
     Args:
         files: List of uploaded files
+        db: Database session
+        file_hashes: SHA-256 of already stored files to include
+        upload_sessions: IDs of finalized upload sessions to include
+        user_id: Owner of the upload sessions and of the files referenced by hash
         
     Returns:
-        List of saved file paths
+        (path, sha256) of every file, in upload order followed by the
+        referenced files and the sessions' files. Identical files share a
+        path, which holds a single reference however many times it appears.
     """
-    saved_files = []
-    for file in files:
-        file_path = await save_upload_file(
-            file, 
-            "quotes",
-            allowed_extensions=['.stl', '.obj', '.3mf']
+    hashes = [sha256.lower() for sha256 in file_hashes or []]
+    for sha256 in hashes:
+        if not SHA256_PATTERN.match(sha256):
+            raise HTTPException(status_code=400, detail=f"Invalid file hash: {sha256}")
+    
+    saved = await save_blobs(db, files, allowed_extensions=settings.ALLOWED_EXTENSIONS)
+    try:
+        for sha256 in hashes:
+            saved.append((attach_blob(db, sha256, user_id, settings.ALLOWED_EXTENSIONS), sha256))
+        saved.extend(claim_sessions(db, upload_sessions or [], user_id))
+    except HTTPException:
+        release_files(db, [file_path for file_path, _ in saved])
+        raise
+    
+    # Keep one reference per distinct file
+    seen = set()
+    duplicates = []
+    for file_path, _ in saved:
+        if file_path in seen:
+            duplicates.append(file_path)
+        seen.add(file_path)
+    if duplicates:
+        release_files(db, duplicates)
+    
+    return saved
+
+async def analyze_uploaded_files(saved_files: List[Tuple[str, str]], db: Session) -> Dict[str, Dict[str, Any]]:
+    """
+    Compute the geometry of saved model files in the worker pool
+    
+    Args:
+        saved_files: (path, sha256) of the saved files
+        db: Database session, used to release the files on any failure
+        
+    Returns:
+        Mapping of file path to its analysis, or to an error message when
+        the file could not be parsed
+    """
+    files = dict(saved_files)
+    try:
+        results = await gather_in_pool(
+            analyze_upload(file_path, sha256) for file_path, sha256 in files.items()
         )
-        saved_files.append(file_path)
+    except Exception as e:
+        # Nothing references the files yet, so don't leave them behind
+        release_files(db, files)
+        if isinstance(e, WorkerPoolSaturated):
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        raise
     
-    return saved_files
+    models = dict(zip(files, results))
+    for file_path, analysis in models.items():
+        if "error" in analysis:
+            logger.warning(f"Could not analyze {file_path}: {analysis['error']}")
+    
+    return models
 
-async def setup_drive_folder(quote: QuoteModel, saved_files: List[str], db: Session) -> str:
+async def orient_uploaded_files(models: Dict[str, Dict[str, Any]], db: Session) -> Dict[str, Dict[str, Any]]:
     """
-    Set up Google Drive folder for quote files if enabled
+    Search the best build orientations of analyzed model files in the worker pool
     
     Args:
-        quote: The quote model instance
-        saved_files: List of saved file paths
-        db: Database session
+        models: Mapping of file path to its analysis
+        db: Database session, used to release the files on failure
         
     Returns:
-        Google Drive URL or None
+        Mapping of file path to its orientation search, skipping files that
+        could not be analyzed
     """
-    drive_url = None
-    if settings.GDRIVE_ENABLED:
-        folder_info = create_quote_folder(quote.id)
-        if folder_info:
-            drive_url = folder_info['url']
-            quote.drive_url = drive_url
-            
-            # Upload files to the Google Drive folder
-            for file_path in saved_files:
-                full_path = os.path.join(settings.UPLOAD_DIR, file_path)
-                file_name = os.path.basename(file_path)
-                upload_file_to_drive(full_path, file_name)
-            
-            db.commit()
-    
-    return drive_url
+    paths = [file_path for file_path, analysis in models.items() if "error" not in analysis]
+    try:
+        results = await gather_in_pool(
+            orient_upload(file_path, models[file_path].get("sha256")) for file_path in paths
+        )
+    except WorkerPoolSaturated as e:
+        release_files(db, models)
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    
+    return dict(zip(paths, results))
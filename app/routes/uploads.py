@@ -0,0 +1,91 @@
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.schemas.upload import StoredFile, UploadSession, UploadSessionCreate
+from app.routes.auth import get_current_active_user
+from app.schemas.user import User
+from app.services.blobs import find_user_blob, SHA256_PATTERN
+from app.services.upload_sessions import create_session, get_session, write_chunk, finalize_session, delete_session
+
+router = APIRouter(tags=["uploads"], prefix="/uploads")
+
+@router.get("/{sha256}", response_model=StoredFile)
+def check_stored_file(
+    sha256: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Check whether the user already stored a file, by the SHA-256 of its content.
+
+    Clients hash large files before uploading them; stored ones can be
+    passed to the quote routes in file_hashes instead of being uploaded.
+    Only files held by the user's quotes or upload sessions are found.
+    """
+    sha256 = sha256.lower()
+    if not SHA256_PATTERN.match(sha256):
+        raise HTTPException(status_code=400, detail="Invalid SHA-256 hash")
+    
+    blob = find_user_blob(db, sha256, current_user.id)
+    return {"sha256": sha256, "exists": blob is not None, "size": blob.size if blob else None}
+
+@router.post("/sessions", response_model=UploadSession)
+def create_upload_session(
+    session_in: UploadSessionCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Start a resumable upload of a model file.
+
+    The file is then sent in chunks with PUT /uploads/sessions/{id} and
+    finalized; the finalized session can be passed to the quote routes in
+    upload_sessions. Sessions idle for UPLOAD_SESSION_TTL_HOURS expire.
+    """
+    return create_session(db, current_user.id, session_in.filename, session_in.size)
+
+@router.get("/sessions/{session_id}", response_model=UploadSession)
+def get_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get the progress of an upload session; resume uploading at `received`."""
+    return get_session(db, session_id, current_user.id)
+
+@router.put("/sessions/{session_id}", response_model=UploadSession)
+async def upload_chunk(
+    session_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload a chunk of the file as the raw request body.
+
+    The chunk is written at `offset`, which may not be past the bytes
+    received so far. Chunks of any size and retried chunks are accepted.
+    """
+    session = get_session(db, session_id, current_user.id)
+    return await write_chunk(db, session, offset, request.stream())
+
+@router.post("/sessions/{session_id}/finalize", response_model=UploadSession)
+def finalize_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Complete an upload once every byte was received."""
+    return finalize_session(db, session_id, current_user.id)
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Abandon an upload session and discard its file."""
+    delete_session(db, session_id, current_user.id)
@@ -0,0 +1,33 @@
+
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+from datetime import datetime
+from app.models.job import JobStatus
+
+# Background job schemas
+class Job(BaseModel):
+    id: int
+    kind: str
+    payload: Optional[Dict[str, Any]] = None
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        orm_mode = True
+
+class JobLatency(BaseModel):
+    count: int
+    avg_seconds: Optional[float] = None
+    p95_seconds: Optional[float] = None
+
+class JobStats(BaseModel):
+    counts: Dict[str, int]
+    pending_by_kind: Dict[str, int]
+    oldest_due_seconds: Optional[float] = None
+    wait: JobLatency
+    completion: JobLatency
@@ -1,8 +1,21 @@
 
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
+# Resized copy of a product image
+class ImageVariant(BaseModel):
+    path: str
+    width: int
+    height: int
+    type: str
+
+# Size of a product's model shown in the storefront; the full analysis is admin only
+class ModelSummary(BaseModel):
+    dimensions_mm: List[float]
+    volume_cm3: float
+    surface_area_mm2: float
+
 # Shared properties
 class ProductBase(BaseModel):
     title: str
@@ -27,13 +40,24 @@ class ProductUpdate(BaseModel):
 # Properties to return to client
 class Product(ProductBase):
     id: int
+    image_variants: Optional[List[ImageVariant]] = None
     model_file: Optional[str] = None
+    model_analysis: Optional[ModelSummary] = None
+    thumbnail: Optional[str] = None
+    model_previews: Optional[List[Dict[str, Any]]] = None
     rating: float
     created_at: datetime
     
     class Config:
         orm_mode = True
         
+# Properties to return to admins, with the model's full analysis
+class ProductAdmin(Product):
+    model_analysis: Optional[Dict[str, Any]] = None
+    
+    class Config:
+        orm_mode = True
+        
 # Properties to return with rating details
 class ProductWithRating(Product):
     rating_detail: Dict[str, int] = {"rate": 0, "count": 0}
@@ -49,3 +49,34 @@ class QuoteResponse(BaseModel):
     message: str
     status: QuoteStatus
     drive_url: Optional[str] = None
+
+class PriceOption(BaseModel):
+    material: str
+    finish: str
+
+class FilePrices(BaseModel):
+    filename: str
+    volume_cm3: Optional[float] = None
+    plates: Optional[int] = None
+    printer: Optional[str] = None
+    weight_g: List[float] = []
+    unit_price: List[float] = []
+    total_price: List[float] = []
+    error: Optional[str] = None
+
+class PriceMatrix(BaseModel):
+    currency: str
+    quantity: int
+    options: List[PriceOption]
+    files: List[FilePrices]
+
+class SimilarModel(BaseModel):
+    kind: str
+    id: int
+    file: str
+    distance: float
+
+class SimilarModels(BaseModel):
+    file: str
+    matches: List[SimilarModel] = []
+    error: Optional[str] = None
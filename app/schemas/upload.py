@@ -0,0 +1,28 @@
+
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from app.models.upload_session import UploadSessionStatus
+
+# Whether content is already in the upload store
+class StoredFile(BaseModel):
+    sha256: str
+    exists: bool
+    size: Optional[int] = None
+
+# Resumable upload session schemas
+class UploadSessionCreate(BaseModel):
+    filename: str
+    size: int
+
+class UploadSession(BaseModel):
+    id: str
+    filename: str
+    size: int
+    received: int
+    status: UploadSessionStatus
+    sha256: Optional[str] = None
+    expires_at: datetime
+    
+    class Config:
+        orm_mode = True
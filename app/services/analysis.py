@@ -0,0 +1,106 @@
+
+import os
+from typing import Any, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services.mesh import analyze_model_file, load_canonical, optimize_orientation, MeshFormatError
+from app.services.workers import run_in_pool, run_in_pool_sync
+from app.utils.cache import ResultCache
+from app.utils.file import file_sha256
+
+# Bump when analyze_model_file changes its output
+ANALYSIS_VERSION = 4
+
+# Bump when optimize_orientation changes its output
+ORIENTATION_VERSION = 1
+
+analysis_cache = ResultCache("analysis", ANALYSIS_VERSION)
+orientation_cache = ResultCache("orientation", ORIENTATION_VERSION)
+
+def _analyze_or_error(full_path: str) -> Dict[str, Any]:
+    """Pool job: analyze a file, reporting parse failures as a result."""
+    try:
+        # Sliced serially: a slicing pool per worker would multiply the pool's CPU budget
+        return analyze_model_file(full_path, settings.SLICE_LAYER_HEIGHT)
+    except MeshFormatError as e:
+        return {"error": str(e)}
+
+def _orient_or_error(full_path: str) -> Dict[str, Any]:
+    """Pool job: search build orientations, reporting parse failures as a result."""
+    try:
+        vertices, faces = load_canonical(full_path)
+        return optimize_orientation(vertices[faces], settings.ORIENTATION_CANDIDATES)
+    except MeshFormatError as e:
+        return {"error": str(e)}
+
+async def analyze_upload(file_path: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyze a stored model file in the worker pool.
+
+    Results are cached by the file's SHA-256, so re-uploads of the same
+    model return immediately.
+
+    Args:
+        file_path: Path relative to the uploads directory
+        sha256: The file's hash when already known, e.g. from its upload
+
+    Returns:
+        The mesh analysis plus the file's sha256, or an "error" entry if
+        the file could not be parsed
+
+    Raises:
+        WorkerPoolSaturated: If the analysis queue is full
+    """
+    full_path = os.path.join(settings.UPLOAD_DIR, file_path)
+    if sha256 is None:
+        sha256 = await run_in_threadpool(file_sha256, full_path)
+
+    result = analysis_cache.get(sha256)
+    if result is None:
+        result = await run_in_pool(_analyze_or_error, full_path)
+        analysis_cache.set(sha256, result)
+
+    return dict(result, sha256=sha256)
+
+def analyze_upload_sync(file_path: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """Blocking variant of analyze_upload for synchronous routes."""
+    full_path = os.path.join(settings.UPLOAD_DIR, file_path)
+    if sha256 is None:
+        sha256 = file_sha256(full_path)
+
+    result = analysis_cache.get(sha256)
+    if result is None:
+        result = run_in_pool_sync(_analyze_or_error, full_path)
+        analysis_cache.set(sha256, result)
+
+    return dict(result, sha256=sha256)
+
+async def orient_upload(file_path: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Find the best build orientations of a stored model file in the worker pool.
+
+    The search is cached by the file's SHA-256, so re-pricing a quote never
+    reruns it.
+
+    Args:
+        file_path: Path relative to the uploads directory
+        sha256: The file's hash when already known, e.g. from its analysis
+
+    Returns:
+        The current and best orientations with their scores, or an "error"
+        entry if the file could not be parsed
+
+    Raises:
+        WorkerPoolSaturated: If the analysis queue is full
+    """
+    full_path = os.path.join(settings.UPLOAD_DIR, file_path)
+    if sha256 is None:
+        sha256 = await run_in_threadpool(file_sha256, full_path)
+
+    result = orientation_cache.get(sha256)
+    if result is None:
+        result = await run_in_pool(_orient_or_error, full_path)
+        orientation_cache.set(sha256, result)
+
+    return result
@@ -0,0 +1,345 @@
+
+import os
+import re
+import shutil
+import asyncio
+import logging
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.models.blob import Blob as BlobModel
+from app.models.quote import Quote as QuoteModel
+from app.models.upload_session import UploadSession as UploadSessionModel, UploadSessionStatus
+from app.utils.file import check_upload, compress_file, delete_upload_file, should_compress, spool_upload
+
+logger = logging.getLogger(__name__)
+
+# Uploads subfolder of the content-addressed store
+BLOB_SUBFOLDER = "blobs"
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+# Session.info key of the files released in the current transaction
+_RELEASED = "released_files"
+
+# Thumbnails, previews and image variants are stored next to their source
+# file and named by its hash
+DERIVED_PATTERN = re.compile(
+    r"^(?:(?P<directory>.+)/)?"
+    r"(?:thumbnails/(?P<thumbnail>[0-9a-f]{64})\.png|(?:previews|variants)/(?P<derived>[0-9a-f]{64})/[\w.-]+)$"
+)
+
+def blob_path(sha256: str, ext: str) -> str:
+    """
+    Return where content with a given hash is stored.
+
+    Blobs are sharded by the first two hex digits of their hash and keep
+    their extension, which the model loaders dispatch on.
+
+    Returns:
+        Path relative to the uploads directory
+    """
+    return os.path.join(BLOB_SUBFOLDER, sha256[:2], f"{sha256}{ext.lower()}")
+
+def is_blob_path(file_path: str) -> bool:
+    """Check whether a stored path points into the content-addressed store."""
+    return file_path.startswith(BLOB_SUBFOLDER + os.sep)
+
+def derived_source(file_path: str) -> Optional[Tuple[str, str]]:
+    """Return the folder and content hash of the file a thumbnail, preview or image variant was built from."""
+    match = DERIVED_PATTERN.match(file_path)
+    if not match:
+        return None
+    return match["directory"] or "", match["thumbnail"] or match["derived"]
+
+def find_blob(db: Session, sha256: str) -> Optional[BlobModel]:
+    """Return a referenced blob with the given content hash, if one is stored."""
+    return db.query(BlobModel).filter(BlobModel.sha256 == sha256, BlobModel.refcount > 0).first()
+
+def _in_user_quotes(db: Session, path: str, user_id: int) -> bool:
+    """Check whether any quote of a user holds a stored file."""
+    return db.query(QuoteModel.id).filter(
+        QuoteModel.user_id == user_id,
+        QuoteModel.files.any(path)
+    ).first() is not None
+
+def find_user_blob(db: Session, sha256: str, user_id: Optional[int]) -> Optional[BlobModel]:
+    """
+    Return stored content with the given hash that a user already holds.
+
+    Content counts as the user's when one of their quotes or finalized
+    upload sessions holds it, so the store cannot be probed for files
+    other users uploaded.
+    """
+    if user_id is None:
+        return None
+    for blob in db.query(BlobModel).filter(BlobModel.sha256 == sha256, BlobModel.refcount > 0):
+        in_session = db.query(UploadSessionModel.id).filter(
+            UploadSessionModel.user_id == user_id,
+            UploadSessionModel.file_path == blob.path,
+            UploadSessionModel.status == UploadSessionStatus.complete
+        ).first() is not None
+        if in_session or _in_user_quotes(db, blob.path, user_id):
+            return blob
+    return None
+
+def _acquire(db: Session, path: str, sha256: str, size: int) -> BlobModel:
+    """Take a reference on a blob row, creating it if needed; the row stays locked until commit."""
+    blob = db.query(BlobModel).filter(BlobModel.path == path).with_for_update().first()
+    if blob is None:
+        try:
+            with db.begin_nested():
+                blob = BlobModel(path=path, sha256=sha256, size=size, refcount=0)
+                db.add(blob)
+        except IntegrityError:
+            # Another request stored the same content meanwhile
+            blob = db.query(BlobModel).filter(BlobModel.path == path).with_for_update().one()
+    blob.refcount += 1
+    return blob
+
+def _spool_blob(source: BinaryIO, ext: str) -> Tuple[str, str, int]:
+    """
+    Spool an upload next to the store (blocking).
+
+    Content not stored yet is compressed here, off the event loop, when
+    compression is enabled; content already stored is left as is since it
+    will be discarded.
+    """
+    tmp_path, sha256, size = spool_upload(source, os.path.join(settings.UPLOAD_DIR, BLOB_SUBFOLDER))
+    _compress_new(tmp_path, sha256, ext)
+    return tmp_path, sha256, size
+
+def _compress_new(tmp_path: str, sha256: str, ext: str) -> None:
+    """Compress a file about to be stored, unless its content is already stored (blocking)."""
+    if should_compress(BLOB_SUBFOLDER) and not os.path.exists(
+        os.path.join(settings.UPLOAD_DIR, blob_path(sha256, ext))
+    ):
+        try:
+            compress_file(tmp_path, settings.UPLOAD_COMPRESSION_LEVEL)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+def _store_spooled(db: Session, tmp_path: str, sha256: str, size: int, ext: str) -> str:
+    """
+    Reference a spooled upload's blob and commit, moving the file into place if it is new.
+
+    The file operations happen while the blob row is locked, so they cannot
+    interleave with a concurrent release deleting the same blob.
+    """
+    path = blob_path(sha256, ext)
+    full_path = os.path.join(settings.UPLOAD_DIR, path)
+    try:
+        _acquire(db, path, sha256, size)
+        db.flush()
+        if os.path.exists(full_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(tmp_path, full_path)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+async def save_blobs(
+    db: Session,
+    files: List[UploadFile],
+    allowed_extensions: Optional[list] = None
+) -> List[Tuple[str, str]]:
+    """
+    Save uploaded files into the content-addressed store.
+
+    Files are streamed to disk concurrently in the thread pool; content that
+    is already stored is not written again. Every returned path holds one
+    reference, to be handed back with release_file when it is no longer
+    used. If any file is rejected or fails, no references are taken.
+
+    Args:
+        db: Database session, committed once the references are taken
+        files: Uploaded files
+        allowed_extensions: List of allowed file extensions
+
+    Returns:
+        One (path, sha256) tuple per file, in order
+    """
+    for file in files:
+        check_upload(file, allowed_extensions)
+
+    exts = [os.path.splitext(file.filename)[1] for file in files]
+    spooled = await asyncio.gather(
+        *[run_in_threadpool(_spool_blob, file.file, ext) for file, ext in zip(files, exts)],
+        return_exceptions=True
+    )
+    errors = [result for result in spooled if isinstance(result, BaseException)]
+    if errors:
+        for result in spooled:
+            if not isinstance(result, BaseException):
+                os.remove(result[0])
+        raise errors[0]
+
+    saved = []
+    try:
+        for (tmp_path, sha256, size), ext in zip(spooled, exts):
+            saved.append((_store_spooled(db, tmp_path, sha256, size, ext), sha256))
+    except BaseException:
+        for tmp_path, _, _ in spooled:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        release_files(db, [path for path, _ in saved])
+        raise
+    return saved
+
+def save_blob_sync(
+    db: Session,
+    upload_file: UploadFile,
+    allowed_extensions: Optional[list] = None
+) -> Tuple[str, str]:
+    """Blocking variant of save_blobs for one file in synchronous routes."""
+    check_upload(upload_file, allowed_extensions)
+    ext = os.path.splitext(upload_file.filename)[1]
+    tmp_path, sha256, size = _spool_blob(upload_file.file, ext)
+    return _store_spooled(db, tmp_path, sha256, size, ext), sha256
+
+def store_file(db: Session, full_path: str, sha256: str, ext: str) -> str:
+    """
+    Move a complete file into the store and take a reference on it (blocking).
+
+    The file is consumed whether or not its content was already stored.
+    Pending changes of the session are committed with the reference.
+
+    Args:
+        db: Database session
+        full_path: File on disk, on the same filesystem as the uploads directory
+        sha256: SHA-256 of the file's content
+        ext: Extension the blob is stored under
+
+    Returns:
+        The blob's path relative to the uploads directory
+    """
+    size = os.path.getsize(full_path)
+    _compress_new(full_path, sha256, ext)
+    return _store_spooled(db, full_path, sha256, size, ext)
+
+def attach_blob(
+    db: Session,
+    sha256: str,
+    user_id: Optional[int],
+    allowed_extensions: Optional[list] = None
+) -> str:
+    """
+    Take a reference on content a user already stored, so it need not be uploaded again.
+
+    Args:
+        db: Database session, committed once the reference is taken
+        sha256: Content hash, lowercase hex
+        user_id: The user, who must hold the content already (see find_user_blob)
+        allowed_extensions: List of allowed file extensions
+
+    Returns:
+        The blob's path relative to the uploads directory
+
+    Raises:
+        HTTPException: 404 if the user holds no such content
+    """
+    blob = find_user_blob(db, sha256, user_id)
+    if blob is None or (
+        allowed_extensions and os.path.splitext(blob.path)[1].lower() not in allowed_extensions
+    ):
+        raise HTTPException(status_code=404, detail=f"No stored file with hash {sha256}")
+    _acquire(db, blob.path, blob.sha256, blob.size)
+    db.commit()
+    return blob.path
+
+def attach_file(db: Session, file_path: str) -> None:
+    """Take another reference on a stored blob the caller already holds one on; the caller commits."""
+    blob = db.query(BlobModel).filter(BlobModel.path == file_path).with_for_update().one()
+    blob.refcount += 1
+
+def release_file(db: Session, file_path: str) -> None:
+    """
+    Drop a reference to a stored file, deleting the file with its last reference.
+
+    The caller commits, and the file is only deleted once the commit
+    succeeds, so a rolled back release never loses it. A blob's row is
+    kept at zero references until then; the deletion locks it again and
+    skips blobs referenced anew in between. Files saved before the store
+    existed are not shared and are deleted after the commit as well.
+    """
+    if is_blob_path(file_path):
+        blob = db.query(BlobModel).filter(BlobModel.path == file_path).with_for_update().first()
+        if blob is None:
+            logger.warning(f"Released untracked blob {file_path}")
+            return
+        blob.refcount -= 1
+        if blob.refcount > 0:
+            return
+    db.info.setdefault(_RELEASED, []).append(file_path)
+
+def _derived_files(file_path: str) -> List[str]:
+    """The thumbnail, previews and image variants built from a blob."""
+    directory, name = os.path.split(file_path)
+    sha256 = os.path.splitext(name)[0]
+    return [
+        os.path.join(directory, "thumbnails", f"{sha256}.png"),
+        os.path.join(directory, "previews", sha256),
+        os.path.join(directory, "variants", sha256),
+    ]
+
+def _delete_released(db: Session, file_paths: List[str]) -> None:
+    """Delete the released files nothing referenced again, with what was derived from them."""
+    for file_path in file_paths:
+        if not is_blob_path(file_path):
+            delete_upload_file(file_path)
+            continue
+        # Locked, so a concurrent save of the same content waits and stores it anew
+        blob = db.query(BlobModel).filter(BlobModel.path == file_path).with_for_update().first()
+        if blob is None or blob.refcount > 0:
+            db.rollback()
+            continue
+        db.delete(blob)
+        db.flush()
+        delete_upload_file(file_path)
+        # The same content stored under another extension shares them
+        shared = db.query(BlobModel.path).filter(BlobModel.sha256 == blob.sha256).first() is not None
+        for derived in [] if shared else _derived_files(file_path):
+            full_path = os.path.join(settings.UPLOAD_DIR, derived)
+            if os.path.isdir(full_path):
+                shutil.rmtree(full_path, ignore_errors=True)
+            elif os.path.exists(full_path):
+                os.remove(full_path)
+        db.commit()
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(db: Session) -> None:
+    file_paths = db.info.pop(_RELEASED, None)
+    if not file_paths:
+        return
+    # No SQL can run in the committed transaction's hook, so use a new session
+    cleanup = Session(bind=db.get_bind())
+    try:
+        _delete_released(cleanup, file_paths)
+    except Exception as e:
+        # Left at zero references for the orphan collection
+        logger.error(f"Could not delete released files {file_paths}: {str(e)}")
+        cleanup.rollback()
+    finally:
+        cleanup.close()
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(db: Session) -> None:
+    db.info.pop(_RELEASED, None)
+
+def release_files(db: Session, file_paths: Iterable[str]) -> None:
+    """Release several stored files and commit."""
+    for file_path in file_paths:
+        release_file(db, file_path)
+    db.commit()
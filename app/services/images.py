@@ -0,0 +1,147 @@
+
+import io
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.workers import run_in_pool_sync
+from app.utils.file import is_compressed, open_stored_file, write_file_atomic
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+# Pillow format and media type of each variant, by file extension
+VARIANT_FORMATS = {
+    ".webp": ("WEBP", "image/webp"),
+    ".jpg": ("JPEG", "image/jpeg"),
+}
+
+# EXIF orientations showing the image rotated by 90 degrees
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+EXIF_ORIENTATION = 0x0112
+
+def variant_dir(file_path: str, sha256: str) -> str:
+    """Folder, relative to the uploads directory, holding an image's variants."""
+    return os.path.join(os.path.dirname(file_path), "variants", sha256)
+
+def _open_image(full_path: str) -> Image.Image:
+    """Open a stored image lazily; compressed files are inflated in memory since Pillow needs to seek."""
+    if not is_compressed(full_path):
+        return Image.open(full_path)
+    with open_stored_file(full_path) as f:
+        return Image.open(io.BytesIO(f.read()))
+
+def variant_widths(width: int) -> List[int]:
+    """Widths of the variants of an image, never wider than the original."""
+    largest = min(width, max(settings.IMAGE_VARIANT_WIDTHS))
+    return [w for w in sorted(settings.IMAGE_VARIANT_WIDTHS) if w < largest] + [largest]
+
+def plan_image_variants(file_path: str, sha256: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    List the variants an uploaded image will have.
+
+    Only the image header is read; the variants themselves are written
+    by generate_image_variants.
+
+    Args:
+        file_path: Image path relative to the uploads directory
+        sha256: The image file's SHA-256
+
+    Returns:
+        One entry per width and format, narrowest first, with its path
+        relative to the uploads directory, its size in pixels and media
+        type, or None if the file is not an image Pillow can read
+    """
+    try:
+        with _open_image(os.path.join(settings.UPLOAD_DIR, file_path)) as image:
+            width, height = image.size
+            if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.warning(f"Could not read image {file_path}: {str(e)}")
+        return None
+
+    relative_dir = variant_dir(file_path, sha256)
+    return [
+        {
+            "path": os.path.join(relative_dir, f"w{w}{ext}"),
+            "width": w,
+            "height": max(1, round(height * w / width)),
+            "type": media_type,
+        }
+        for w in variant_widths(width)
+        for ext, (_, media_type) in VARIANT_FORMATS.items()
+    ]
+
+def _build_variants(image_path: str, output_dir: str, variants: List[Dict[str, Any]], quality: int) -> None:
+    """Pool job: write every planned variant of an image and then the manifest."""
+    sizes = sorted({(variant["width"], variant["height"]) for variant in variants}, reverse=True)
+    with _open_image(image_path) as image:
+        # Let the JPEG decoder downscale by up to 8x while decoding
+        width, height = sizes[0]
+        if image.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        image.draft(None, (width, height))
+
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        source = image.convert("RGBA" if has_alpha else "RGB")
+
+    # Each width is resized from the previous, larger one
+    for size in sizes:
+        if source.size != size:
+            source = source.resize(size, Image.LANCZOS, reducing_gap=3.0)
+        flat = source
+        if has_alpha:
+            flat = Image.new("RGB", size, "white")
+            flat.paste(source, mask=source.getchannel("A"))
+
+        for variant in variants:
+            if (variant["width"], variant["height"]) != size:
+                continue
+            pillow_format, _ = VARIANT_FORMATS[os.path.splitext(variant["path"])[1]]
+            buffer = io.BytesIO()
+            if pillow_format == "JPEG":
+                flat.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+            else:
+                source.save(buffer, "WEBP", quality=quality, method=4)
+            write_file_atomic(os.path.join(output_dir, os.path.basename(variant["path"])), buffer.getvalue())
+
+    # The manifest goes last, so its presence means the variants are complete
+    write_file_atomic(os.path.join(output_dir, MANIFEST_NAME), json.dumps(variants).encode())
+
+def generate_image_variants(file_path: str, sha256: str, variants: List[Dict[str, Any]]) -> bool:
+    """
+    Write the planned variants of an uploaded image in the worker pool.
+
+    Variants are stored per content hash next to the image, so an image
+    uploaded again reuses the existing files. Meant to run off the request
+    path, e.g. in a background job; images that cannot be resized are
+    logged rather than raised.
+
+    Returns:
+        Whether the variants exist
+
+    Raises:
+        WorkerPoolSaturated: If the worker pool is busy, to try again later
+    """
+    output_dir = os.path.join(settings.UPLOAD_DIR, variant_dir(file_path, sha256))
+    if os.path.exists(os.path.join(output_dir, MANIFEST_NAME)):
+        return True
+
+    try:
+        run_in_pool_sync(
+            _build_variants,
+            os.path.join(settings.UPLOAD_DIR, file_path),
+            output_dir,
+            variants,
+            settings.IMAGE_VARIANT_QUALITY
+        )
+    except (OSError, Image.DecompressionBombError) as e:
+        logger.error(f"Could not build image variants for {file_path}: {str(e)}")
+        return False
+    return True
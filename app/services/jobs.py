@@ -0,0 +1,377 @@
+
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job as JobModel, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Session, Dict[str, Any]], None]
+
+# Handlers by job kind
+_handlers: Dict[str, JobHandler] = {}
+
+# Worker threads running jobs, fed by a dispatcher thread claiming them
+_executor: Optional[ThreadPoolExecutor] = None
+_dispatcher: Optional[threading.Thread] = None
+_idle_workers = threading.Semaphore(settings.JOB_WORKERS)
+_wake = threading.Event()
+_stopping = threading.Event()
+
+# Jobs running in this process, whose leases the dispatcher renews
+_running: Set[int] = set()
+_running_lock = threading.Lock()
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """
+    Register the function running jobs of a kind.
+
+    Handlers get a database session and the job's payload. They run in a
+    worker thread, so they may block; raising marks the attempt failed.
+    Whatever they leave uncommitted is committed with the job's completion.
+    """
+    def register(handler: JobHandler) -> JobHandler:
+        _handlers[kind] = handler
+        return handler
+    return register
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Dict[str, Any],
+    depends_on: Optional[int] = None,
+    max_attempts: Optional[int] = None
+) -> JobModel:
+    """
+    Add a job to the queue.
+
+    The job is only durable once the caller commits, so it is saved
+    atomically with the rows it is about; call notify_job_workers after
+    committing to have it start right away.
+
+    Args:
+        db: Database session
+        kind: Kind of job, naming its handler
+        payload: JSON-serializable arguments of the handler
+        depends_on: ID of a job that must finish first, successfully or not
+        max_attempts: Attempts before the job is dead; JOB_MAX_ATTEMPTS if not given
+
+    Returns:
+        The job, flushed so it has an ID
+    """
+    job = JobModel(
+        kind=kind,
+        payload=payload,
+        status=JobStatus.pending,
+        depends_on=depends_on,
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=_now()
+    )
+    db.add(job)
+    db.flush()
+    return job
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retrying a job failed this many times: exponential, capped, with jitter."""
+    delay = min(settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_MAX_SECONDS)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+def claim_jobs(db: Session, limit: int) -> List[int]:
+    """
+    Claim due jobs for this worker, oldest first.
+
+    Rows locked by other workers are skipped, so any number of workers
+    across processes can claim concurrently without getting the same job.
+
+    Returns:
+        IDs of the claimed jobs, now running
+    """
+    now = _now()
+    jobs = db.query(JobModel).filter(
+        JobModel.status == JobStatus.pending,
+        JobModel.run_at <= now
+    ).order_by(JobModel.run_at, JobModel.id).limit(limit).with_for_update(skip_locked=True).all()
+    for job in jobs:
+        job.status = JobStatus.running
+        job.attempts += 1
+        job.locked_at = now
+        job.started_at = job.started_at or now
+    db.commit()
+    return [job.id for job in jobs]
+
+def renew_leases(db: Session, job_ids: List[int]) -> int:
+    """
+    Extend the lease of jobs still running, so they are not taken for lost.
+
+    Returns:
+        Number of leases renewed
+    """
+    if not job_ids:
+        return 0
+    renewed = db.query(JobModel).filter(
+        JobModel.id.in_(job_ids),
+        JobModel.status == JobStatus.running
+    ).update({JobModel.locked_at: _now()}, synchronize_session=False)
+    db.commit()
+    return renewed
+
+def _fail(job: JobModel, error: Exception) -> None:
+    job.last_error = f"{type(error).__name__}: {str(error)}"
+    job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = JobStatus.dead
+        job.finished_at = _now()
+        logger.error(f"Job {job.id} ({job.kind}) failed for good after {job.attempts} attempts: {job.last_error}")
+    else:
+        job.status = JobStatus.pending
+        job.run_at = _now() + timedelta(seconds=retry_delay(job.attempts))
+        logger.warning(f"Job {job.id} ({job.kind}) failed, attempt {job.attempts}: {job.last_error}")
+
+def run_job(db: Session, job_id: int) -> None:
+    """
+    Run a claimed job and record the outcome.
+
+    Failed jobs are rescheduled with backoff until their last attempt, and
+    then marked dead. Jobs whose dependency has not finished are put back
+    without using up an attempt.
+    """
+    job = db.get(JobModel, job_id)
+    if job.depends_on:
+        dependency = db.get(JobModel, job.depends_on)
+        if dependency and dependency.status in (JobStatus.pending, JobStatus.running):
+            job.status = JobStatus.pending
+            job.attempts -= 1
+            job.locked_at = None
+            if job.attempts == 0:
+                job.started_at = None
+            job.run_at = max(_aware(dependency.run_at), _now()) + timedelta(seconds=settings.JOB_POLL_SECONDS)
+            db.commit()
+            return
+
+    try:
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            raise LookupError(f"No handler for jobs of kind {job.kind}")
+        handler(db, dict(job.payload or {}))
+        job.status = JobStatus.done
+        job.finished_at = _now()
+        job.locked_at = None
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        _fail(db.get(JobModel, job_id), e)
+        db.commit()
+
+def _work(job_id: int) -> None:
+    with _running_lock:
+        _running.add(job_id)
+    db = SessionLocal()
+    try:
+        run_job(db, job_id)
+    except Exception as e:
+        logger.error(f"Could not run job {job_id}: {str(e)}")
+    finally:
+        db.close()
+        with _running_lock:
+            _running.discard(job_id)
+        _idle_workers.release()
+        # A finished job may let a dependent one run
+        _wake.set()
+
+def _renew_running_leases() -> None:
+    with _running_lock:
+        job_ids = list(_running)
+    db = SessionLocal()
+    try:
+        renew_leases(db, job_ids)
+    except Exception as e:
+        logger.error(f"Could not renew the leases of running jobs: {str(e)}")
+    finally:
+        db.close()
+
+def _dispatch() -> None:
+    """Dispatcher thread: claim a job whenever a worker is idle, and keep the leases of running jobs."""
+    # Renewed well within the lease, so a slow renewal never lets one expire
+    renew_every = settings.JOB_LEASE_MINUTES * 60 / 3
+    renewed_at = time.monotonic()
+    while not _stopping.is_set():
+        if time.monotonic() - renewed_at >= renew_every:
+            _renew_running_leases()
+            renewed_at = time.monotonic()
+
+        if not _idle_workers.acquire(timeout=settings.JOB_POLL_SECONDS):
+            continue
+
+        _wake.clear()
+        db = SessionLocal()
+        try:
+            job_ids = claim_jobs(db, 1)
+        except Exception as e:
+            logger.error(f"Could not claim jobs: {str(e)}")
+            job_ids = []
+        finally:
+            db.close()
+
+        if job_ids:
+            _executor.submit(_work, job_ids[0])
+        else:
+            _idle_workers.release()
+            _wake.wait(settings.JOB_POLL_SECONDS)
+
+def notify_job_workers() -> None:
+    """Have the workers look for jobs now rather than at their next poll."""
+    _wake.set()
+
+def start_job_workers() -> None:
+    """Start the workers of this process."""
+    global _executor, _dispatcher
+    # Registers the handlers
+    import app.services.quote_jobs  # noqa: F401
+    import app.services.render_jobs  # noqa: F401
+
+    _stopping.clear()
+    _executor = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="job")
+    _dispatcher = threading.Thread(target=_dispatch, name="job-dispatcher", daemon=True)
+    _dispatcher.start()
+
+def stop_job_workers() -> None:
+    """
+    Stop claiming jobs without waiting for running ones.
+
+    Jobs cut short stay running until their lease expires and are then
+    run again, so handlers must tolerate running twice.
+    """
+    _stopping.set()
+    _wake.set()
+    if _dispatcher is not None:
+        _dispatcher.join(timeout=settings.JOB_POLL_SECONDS)
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+
+def requeue_stale_jobs(db: Session) -> int:
+    """
+    Put back the running jobs whose worker was lost, e.g. to a restart.
+
+    Running jobs have their lease renewed by their process's dispatcher,
+    so jobs whose lease was last renewed more than JOB_LEASE_MINUTES ago
+    were lost. They count as a failed attempt and are retried, or marked
+    dead after their last attempt.
+
+    Returns:
+        Number of jobs put back
+    """
+    cutoff = _now() - timedelta(minutes=settings.JOB_LEASE_MINUTES)
+    jobs = db.query(JobModel).filter(
+        JobModel.status == JobStatus.running,
+        JobModel.locked_at < cutoff
+    ).with_for_update(skip_locked=True).all()
+    for job in jobs:
+        _fail(job, TimeoutError("Worker lost before the job finished"))
+    db.commit()
+    return len(jobs)
+
+def purge_finished_jobs(db: Session) -> int:
+    """
+    Delete jobs done for more than JOB_RETENTION_DAYS; dead jobs are kept.
+
+    Returns:
+        Number of jobs deleted
+    """
+    cutoff = _now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    # Dependencies of jobs still waiting are needed to release them
+    waiting = db.query(JobModel.depends_on).filter(
+        JobModel.status.in_([JobStatus.pending, JobStatus.running]),
+        JobModel.depends_on.isnot(None)
+    )
+    count = db.query(JobModel).filter(
+        JobModel.status == JobStatus.done,
+        JobModel.finished_at < cutoff,
+        JobModel.id.notin_(waiting)
+    ).delete(synchronize_session=False)
+    db.commit()
+    return count
+
+def retry_job(db: Session, job: JobModel) -> None:
+    """Give a dead job a fresh set of attempts."""
+    job.status = JobStatus.pending
+    job.attempts = 0
+    job.run_at = _now()
+    # Measured again from the next claim
+    job.locked_at = None
+    job.started_at = None
+    job.finished_at = None
+    db.commit()
+    notify_job_workers()
+
+def _latency(durations: List[float]) -> Dict[str, Any]:
+    durations = sorted(durations)
+    if not durations:
+        return {"count": 0, "avg_seconds": None, "p95_seconds": None}
+    return {
+        "count": len(durations),
+        "avg_seconds": sum(durations) / len(durations),
+        "p95_seconds": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+    }
+
+def queue_stats(db: Session) -> Dict[str, Any]:
+    """
+    Measure the job queue.
+
+    Returns:
+        Jobs by status, pending jobs by kind, how overdue the oldest due
+        job is, and for the jobs finished within JOB_STATS_WINDOW_MINUTES
+        the wait from enqueueing to the first attempt and the time to
+        completion, retries included
+    """
+    now = _now()
+    counts = {status.value: 0 for status in JobStatus}
+    for status, count in db.query(JobModel.status, func.count(JobModel.id)).group_by(JobModel.status):
+        counts[status.value] = count
+
+    pending_by_kind = dict(
+        db.query(JobModel.kind, func.count(JobModel.id)).filter(
+            JobModel.status == JobStatus.pending
+        ).group_by(JobModel.kind).all()
+    )
+
+    oldest_due = db.query(JobModel.run_at).filter(
+        JobModel.status == JobStatus.pending,
+        JobModel.run_at <= now
+    ).order_by(JobModel.run_at).first()
+
+    since = now - timedelta(minutes=settings.JOB_STATS_WINDOW_MINUTES)
+    finished = db.query(JobModel.created_at, JobModel.started_at, JobModel.finished_at).filter(
+        JobModel.status.in_([JobStatus.done, JobStatus.dead]),
+        JobModel.finished_at >= since
+    ).all()
+
+    return {
+        "counts": counts,
+        "pending_by_kind": pending_by_kind,
+        "oldest_due_seconds": (now - _aware(oldest_due[0])).total_seconds() if oldest_due else None,
+        "wait": _latency([
+            (_aware(started_at) - _aware(created_at)).total_seconds()
+            for created_at, started_at, _ in finished if started_at
+        ]),
+        "completion": _latency([
+            (_aware(finished_at) - _aware(created_at)).total_seconds()
+            for created_at, _, finished_at in finished
+        ]),
+    }
@@ -0,0 +1,9 @@
+
+# Import mesh helpers to make them available from the mesh package
+from app.services.mesh.loader import load_mesh, MeshFormatError
+from app.services.mesh.canonical import load_canonical
+from app.services.mesh.analysis import analyze_triangles, analyze_model_file
+from app.services.mesh.printability import check_printability
+from app.services.mesh.slicer import slice_layers, slice_and_estimate
+from app.services.mesh.orientation import optimize_orientation
+from app.services.mesh.descriptor import shape_descriptor
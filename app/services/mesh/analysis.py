@@ -0,0 +1,105 @@
+
+import numpy as np
+from typing import Any, Dict
+
+from app.services.mesh.loader import MeshFormatError
+from app.services.mesh.canonical import load_canonical
+from app.services.mesh.printability import check_printability
+from app.services.mesh.slicer import slice_and_estimate
+from app.services.mesh.descriptor import shape_descriptor
+
+# Triangles are processed in blocks so float64 temporaries stay bounded
+# even for meshes with millions of faces
+CHUNK_SIZE = 262_144
+
+def analyze_triangles(triangles: np.ndarray) -> Dict[str, Any]:
+    """
+    Compute the basic geometry of a triangle mesh.
+
+    Model units are assumed to be millimetres, as is the convention for STL.
+    The volume is the signed volume of the tetrahedra spanned by each face and
+    the origin, so it is only meaningful for closed meshes.
+
+    Args:
+        triangles: Array of shape (n, 3, 3)
+
+    Returns:
+        Dictionary with volume, surface area, bounding box, triangle count
+        and center of mass
+    """
+    if triangles.ndim != 3 or triangles.shape[1:] != (3, 3):
+        raise MeshFormatError("Triangles must have shape (n, 3, 3)")
+    count = len(triangles)
+    if count == 0:
+        raise MeshFormatError("Mesh has no triangles")
+
+    # Reducing one strided column at a time is much faster than reducing
+    # the (n, 3) view along its first axis
+    bbox_min = np.array([triangles[:, :, axis].min() for axis in range(3)], dtype=np.float64)
+    bbox_max = np.array([triangles[:, :, axis].max() for axis in range(3)], dtype=np.float64)
+
+    # Working relative to the bbox center keeps the volume sum well
+    # conditioned for parts placed far from the origin
+    origin = (bbox_min + bbox_max) / 2
+
+    area = 0.0
+    volume6 = 0.0
+    moment = np.zeros(3)
+    for start in range(0, count, CHUNK_SIZE):
+        chunk = triangles[start:start + CHUNK_SIZE]
+        a = chunk[:, 0].astype(np.float64) - origin
+        b = chunk[:, 1].astype(np.float64) - origin
+        c = chunk[:, 2].astype(np.float64) - origin
+
+        normals = np.cross(b - a, c - a)
+        area += np.sqrt(np.einsum("ij,ij->i", normals, normals)).sum()
+
+        # Six times the signed volume of each tetrahedron (origin, a, b, c);
+        # a . ((b - a) x (c - a)) equals a . (b x c), so the face normals
+        # computed above can be reused
+        tet6 = np.einsum("ij,ij->i", a, normals)
+        volume6 += tet6.sum()
+        moment += tet6 @ (a + b + c)
+
+    volume = volume6 / 6
+    if volume6 != 0:
+        # Tetrahedron centroids sit at (a + b + c) / 4
+        center = moment / (4 * volume6) + origin
+    else:
+        center = origin
+
+    return {
+        "triangle_count": int(count),
+        "volume_mm3": float(abs(volume)),
+        "volume_cm3": float(abs(volume) / 1000),
+        "inverted": bool(volume < 0),
+        "surface_area_mm2": float(area / 2),
+        "bbox_min": bbox_min.tolist(),
+        "bbox_max": bbox_max.tolist(),
+        "dimensions_mm": (bbox_max - bbox_min).tolist(),
+        "center_of_mass": center.tolist(),
+    }
+
+def analyze_model_file(file_path: str, layer_height: float = 0.2, slice_workers: int = 1) -> Dict[str, Any]:
+    """
+    Load a model file from disk and analyze its geometry and printability.
+
+    The model is read through its canonical indexed copy (see
+    load_canonical), so only the first analysis parses the original file.
+
+    Args:
+        file_path: Path of the STL, OBJ or 3MF file
+        layer_height: Layer height used to slice the model in mm
+        slice_workers: Processes to spread the slicing across
+
+    Returns:
+        The mesh analysis with "printability" and "slicing" estimates and
+        the shape "descriptor" used for similarity search
+    """
+    vertices, faces = load_canonical(file_path)
+    triangles = vertices[faces]
+    result = analyze_triangles(triangles)
+    result["printability"] = check_printability(triangles, vertices, faces)
+    result["slicing"] = slice_and_estimate(triangles, layer_height, slice_workers)
+    result["descriptor"] = np.round(shape_descriptor(triangles), 5).tolist()
+    return result
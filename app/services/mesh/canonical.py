@@ -0,0 +1,125 @@
+
+import os
+import struct
+import tempfile
+import numpy as np
+from typing import Optional, Tuple
+
+from app.services.mesh.loader import load_mesh
+from app.services.mesh.topology import weld_vertices
+
+# Canonical meshes are stored beside the original upload under its name
+# plus this suffix, e.g. "quotes/part.stl.mesh"
+CANONICAL_SUFFIX = ".mesh"
+
+# Bump when the layout or the normalization changes; older files are rebuilt
+CANONICAL_VERSION = 1
+
+# Layout, little-endian: magic "MESH", format version, vertex count, face
+# count, and the size and mtime (ns) of the source file it was built from,
+# padded to 64 bytes so the float32 vertices (3 per vertex) and uint32
+# faces (3 per face) that follow stay aligned for memory mapping
+CANONICAL_MAGIC = b"MESH"
+CANONICAL_HEADER = struct.Struct("<4sIQQQq")
+CANONICAL_HEADER_SIZE = 64
+
+def canonical_path(file_path: str) -> str:
+    """Path of the canonical mesh built from a model file."""
+    return file_path + CANONICAL_SUFFIX
+
+def write_canonical(path: str, vertices: np.ndarray, faces: np.ndarray, source: os.stat_result) -> None:
+    """
+    Write an indexed mesh in the canonical format.
+
+    The file goes through a temporary sibling and is renamed into place, so
+    concurrent readers see either the old file or the complete new one.
+
+    Args:
+        path: Destination path
+        vertices: Vertices of shape (v, 3)
+        faces: Faces of shape (n, 3) indexing into vertices
+        source: Stat of the model file the mesh was built from
+    """
+    header = CANONICAL_HEADER.pack(
+        CANONICAL_MAGIC, CANONICAL_VERSION, len(vertices), len(faces), source.st_size, source.st_mtime_ns
+    )
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.ljust(CANONICAL_HEADER_SIZE, b"\0"))
+            np.ascontiguousarray(vertices, dtype="<f4").tofile(f)
+            np.ascontiguousarray(faces, dtype="<u4").tofile(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def read_canonical(path: str, source: Optional[os.stat_result] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Memory-map a canonical mesh.
+
+    Args:
+        path: Path of the canonical file
+        source: Stat of the model file; if given, a mesh built from a
+            different size or modification time counts as stale
+
+    Returns:
+        Tuple of read-only float32 vertices (v, 3) and uint32 faces (n, 3),
+        or None if the file is missing, stale, truncated or of another
+        format version
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(CANONICAL_HEADER.size)
+            size = os.fstat(f.fileno()).st_size
+    except OSError:
+        return None
+    if len(header) < CANONICAL_HEADER.size:
+        return None
+
+    magic, version, vertex_count, face_count, source_size, source_mtime = CANONICAL_HEADER.unpack(header)
+    if magic != CANONICAL_MAGIC or version != CANONICAL_VERSION:
+        return None
+    if source is not None and (source_size, source_mtime) != (source.st_size, source.st_mtime_ns):
+        return None
+    if size != CANONICAL_HEADER_SIZE + 12 * (vertex_count + face_count) or not vertex_count or not face_count:
+        return None
+
+    vertices = np.memmap(path, dtype="<f4", mode="r", offset=CANONICAL_HEADER_SIZE, shape=(vertex_count, 3))
+    faces = np.memmap(
+        path, dtype="<u4", mode="r", offset=CANONICAL_HEADER_SIZE + 12 * vertex_count, shape=(face_count, 3)
+    )
+    return vertices, faces
+
+def load_canonical(file_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load a model file as an indexed mesh through its canonical copy.
+
+    The first call parses the model, welds its corners and writes the
+    canonical file beside it; later calls only map that file, skipping both
+    the parse and the weld. A missing, stale or outdated canonical file is
+    rebuilt. If it cannot be written (e.g. a read-only directory) the parsed
+    mesh is still returned.
+
+    Args:
+        file_path: Path to an .stl, .obj or .3mf file
+
+    Returns:
+        Tuple of float32 vertices (v, 3) and uint32 faces (n, 3); use
+        vertices[faces] for the triangle array
+    """
+    # Stat before parsing, so a model replaced mid-parse leaves a stale file
+    source = os.stat(file_path)
+    cached_path = canonical_path(file_path)
+    mesh = read_canonical(cached_path, source)
+    if mesh is not None:
+        return mesh
+
+    vertices, faces = weld_vertices(load_mesh(file_path))
+    try:
+        write_canonical(cached_path, vertices, faces, source)
+    except OSError:
+        pass
+    return vertices, faces
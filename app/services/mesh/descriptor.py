@@ -0,0 +1,65 @@
+
+import numpy as np
+
+# D2 shape distribution: distances between random surface point pairs,
+# normalized by their mean and binned into a histogram
+D2_POINTS = 4096
+D2_PAIRS = 65_536
+D2_BINS = 64
+D2_RANGE = 4.0
+
+# Weight of the overall size so same-shaped parts of very different scale
+# are further apart, without overwhelming the shape terms
+SIZE_WEIGHT = 0.25
+
+DESCRIPTOR_SIZE = D2_BINS + 3
+
+def sample_surface(triangles: np.ndarray, count: int, rng: np.random.Generator) -> np.ndarray:
+    """Sample points uniformly by area over a mesh's surface."""
+    tri = triangles.astype(np.float64)
+    areas = np.linalg.norm(np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]), axis=1)
+    if areas.sum() <= 0:
+        return tri[:, 0][rng.integers(0, len(tri), count)]
+
+    faces = rng.choice(len(tri), count, p=areas / areas.sum())
+    # Reflect barycentric samples that fall outside the triangle back in
+    u, v = rng.random(count), rng.random(count)
+    outside = u + v > 1
+    u[outside], v[outside] = 1 - u[outside], 1 - v[outside]
+    a, b, c = tri[faces, 0], tri[faces, 1], tri[faces, 2]
+    return a + u[:, None] * (b - a) + v[:, None] * (c - a)
+
+def shape_descriptor(triangles: np.ndarray) -> np.ndarray:
+    """
+    Compute a compact shape descriptor for similarity search.
+
+    The vector holds the square root of the D2 histogram, so the Euclidean
+    distance between descriptors is the Hellinger distance between shape
+    distributions, followed by the two smaller bounding box dimensions
+    relative to the largest one and a weighted log10 of the largest one.
+    Sampling is seeded, so a mesh always gets the same descriptor.
+
+    Args:
+        triangles: Array of shape (n, 3, 3)
+
+    Returns:
+        float32 vector of DESCRIPTOR_SIZE values
+    """
+    rng = np.random.default_rng(0)
+    points = sample_surface(triangles, D2_POINTS, rng)
+
+    pairs = rng.integers(0, D2_POINTS, (D2_PAIRS, 2))
+    distances = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+    mean = distances.mean()
+    scaled = distances / mean if mean > 0 else distances
+    histogram = np.bincount(
+        np.minimum((scaled * D2_BINS / D2_RANGE).astype(np.int64), D2_BINS - 1),
+        minlength=D2_BINS
+    ) / D2_PAIRS
+
+    dimensions = np.sort(np.ptp(triangles.reshape(-1, 3), axis=0).astype(np.float64))[::-1]
+    largest = dimensions[0]
+    ratios = dimensions[1:] / largest if largest > 0 else np.zeros(2)
+    size = SIZE_WEIGHT * np.log10(max(largest, 1e-3))
+
+    return np.concatenate([np.sqrt(histogram), ratios, [size]]).astype(np.float32)
@@ -0,0 +1,429 @@
+
+import os
+import re
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+import numpy as np
+from typing import Optional
+
+class MeshFormatError(ValueError):
+    """Raised when a model file cannot be parsed into triangles."""
+
+# Binary STL layout: 80 byte header, uint32 triangle count, then 50 byte records
+STL_HEADER_SIZE = 84
+STL_RECORD = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attributes", "<u2"),
+])
+
+_ASCII_VERTEX = re.compile(rb"vertex\s+(\S+\s+\S+\s+\S+)")
+
+# Frame magic number of zstd-compressed files
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# ASCII files are parsed in blocks of this many bytes
+ASCII_CHUNK_SIZE = 4 * 1024 * 1024
+
+# OBJ vertex lines, face lines, and the vertex index of every face corner
+# ("v", "v/vt", "v//vn" or "v/vt/vn") plus a marker for each line end
+_OBJ_VERTEX = re.compile(rb"^v[ \t]+(\S+[ \t]+\S+[ \t]+\S+)", re.MULTILINE)
+_OBJ_FACE = re.compile(rb"^f[ \t]+([^\n]*)", re.MULTILINE)
+_OBJ_FACE_INDEX = re.compile(rb"(?<![/\w.-])-?\d+|\n")
+
+# 3MF vertices and triangles are converted in batches of this many elements
+XML_BATCH_SIZE = 65_536
+
+# Deepest chain of 3MF components (objects built from other objects) followed
+MAX_COMPONENT_DEPTH = 16
+
+# Most triangles a 3MF may place once its components are expanded, as a few
+# kilobytes of nested components can instance an object billions of times
+MAX_3MF_TRIANGLES = 10_000_000
+
+class GrowableArray:
+    """
+    Append-only NumPy buffer that grows geometrically.
+
+    Parsers append decoded blocks as they go, so peak memory is bounded by
+    the final array (plus growth slack) instead of the source text.
+    """
+
+    def __init__(self, row_shape: tuple = (), dtype=np.float32, capacity: int = 1024):
+        self._data = np.empty((capacity,) + tuple(row_shape), dtype=dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, rows: np.ndarray) -> None:
+        needed = self._size + len(rows)
+        if needed > len(self._data):
+            capacity = max(needed, 2 * len(self._data))
+            grown = np.empty((capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size:needed] = rows
+        self._size = needed
+
+    def view(self) -> np.ndarray:
+        """Return the filled part of the buffer without copying."""
+        return self._data[:self._size]
+
+def load_mesh(file_path: str) -> np.ndarray:
+    """
+    Load a 3D model file as a triangle array.
+
+    Files stored zstd-compressed (see UPLOAD_COMPRESSION) are recognized by
+    their magic number and read like their uncompressed originals.
+
+    Args:
+        file_path: Path to an .stl, .obj or .3mf file
+
+    Returns:
+        Array of shape (n, 3, 3) holding the three vertices of each triangle
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in _READERS:
+        raise MeshFormatError(f"Unsupported model format: {ext}")
+
+    with open(file_path, "rb") as f:
+        compressed = f.read(len(ZSTD_MAGIC)) == ZSTD_MAGIC
+    if compressed:
+        return _load_compressed(file_path, ext)
+    return _READERS[ext](file_path)
+
+def _load_compressed(file_path: str, ext: str) -> np.ndarray:
+    """
+    Load a zstd-compressed model file.
+
+    The file is inflated as a stream into a temporary file, since binary STL
+    is memory-mapped and 3MF needs a seekable zip, so memory stays bounded
+    by the mesh arrays as for uncompressed files.
+    """
+    import zstandard
+
+    with tempfile.NamedTemporaryFile(suffix=ext) as inflated:
+        with open(file_path, "rb") as source:
+            try:
+                zstandard.ZstdDecompressor().copy_stream(source, inflated)
+            except zstandard.ZstdError as e:
+                raise MeshFormatError(f"Invalid compressed model file: {str(e)}")
+        inflated.flush()
+        triangles = _READERS[ext](inflated.name)
+        # Mapped STL records must be read before the temporary file goes away
+        if isinstance(triangles, np.memmap):
+            triangles = np.array(triangles)
+    return triangles
+
+def read_stl(file_path: str) -> np.ndarray:
+    """
+    Read a binary or ASCII STL file.
+
+    Binary files are memory-mapped and the vertices are returned as a view
+    into the mapped triangle records, so nothing is copied until the data
+    is used. ASCII files are parsed in fixed-size chunks.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        header = f.read(STL_HEADER_SIZE)
+
+    # A binary file's size is fully determined by its triangle count; ASCII
+    # files may also start with "solid", so check the size first
+    if len(header) == STL_HEADER_SIZE:
+        count = int(np.frombuffer(header, dtype="<u4", count=1, offset=80)[0])
+        if size == STL_HEADER_SIZE + count * STL_RECORD.itemsize:
+            if count == 0:
+                raise MeshFormatError("STL file has no triangles")
+            records = np.memmap(
+                file_path,
+                dtype=STL_RECORD,
+                mode="r",
+                offset=STL_HEADER_SIZE,
+                shape=(count,)
+            )
+            return records["vertices"]
+
+    if header.lstrip().startswith(b"solid"):
+        return read_ascii_stl(file_path)
+
+    raise MeshFormatError("File is neither a valid binary nor ASCII STL")
+
+def read_ascii_stl(file_path: str, chunk_size: int = ASCII_CHUNK_SIZE) -> np.ndarray:
+    """Parse an ASCII STL file chunk by chunk into a triangle array."""
+    vertices = GrowableArray((3,))
+    remainder = b""
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            data = remainder + chunk
+            if chunk:
+                # Keep the trailing partial line for the next block
+                cut = data.rfind(b"\n") + 1
+                data, remainder = data[:cut], data[cut:]
+            coords = _ASCII_VERTEX.findall(data)
+            if coords:
+                try:
+                    values = np.array(b" ".join(coords).split(), dtype=np.float32)
+                except ValueError:
+                    raise MeshFormatError("ASCII STL has an invalid vertex")
+                vertices.extend(values.reshape(-1, 3))
+            if not chunk:
+                break
+
+    if len(vertices) == 0 or len(vertices) % 3:
+        raise MeshFormatError("ASCII STL has no facets or an incomplete facet")
+    return vertices.view().reshape(-1, 3, 3)
+
+def read_obj(file_path: str, chunk_size: int = ASCII_CHUNK_SIZE) -> np.ndarray:
+    """
+    Read a Wavefront OBJ file, triangulating polygon faces as fans.
+
+    The file is tokenized chunk by chunk: vertex coordinates are parsed in
+    bulk like ASCII STL, and the first index of every face corner ("v",
+    "v/vt", "v//vn" or "v/vt/vn") is extracted together with an end-of-line
+    marker so whole polygons can be fanned without a loop per face.
+    """
+    vertices = GrowableArray((3,))
+    faces = GrowableArray((3,), dtype=np.int64)
+    remainder = b""
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            data = remainder + chunk
+            if chunk:
+                cut = data.rfind(b"\n") + 1
+                data, remainder = data[:cut], data[cut:]
+            else:
+                data += b"\n"
+            _read_obj_block(data, vertices, faces)
+            if not chunk:
+                break
+
+    if len(faces) == 0:
+        raise MeshFormatError("OBJ file has no faces")
+
+    vertex_array = vertices.view()
+    face_array = faces.view()
+    if face_array.min() < 0 or face_array.max() >= len(vertex_array):
+        raise MeshFormatError("OBJ face references a missing vertex")
+    return vertex_array[face_array]
+
+def _read_obj_block(data: bytes, vertices: GrowableArray, faces: GrowableArray) -> None:
+    """Append the vertices and fan-triangulated faces of a block of whole OBJ lines."""
+    vertex_base = len(vertices)
+    coords = _OBJ_VERTEX.findall(data)
+    if coords:
+        try:
+            values = np.array(b" ".join(coords).split(), dtype=np.float32)
+        except ValueError:
+            raise MeshFormatError("OBJ file has an invalid vertex")
+        vertices.extend(values.reshape(-1, 3))
+
+    polygons = _OBJ_FACE.findall(data)
+    if not polygons:
+        return
+    tokens = np.array(_OBJ_FACE_INDEX.findall(b"\n".join(polygons) + b"\n"))
+    breaks = tokens == b"\n"
+    indices = tokens[~breaks].astype(np.int64)
+    line = (np.cumsum(breaks) - breaks)[~breaks]
+
+    # Negative indices are relative to the vertices read before their face
+    negative = indices < 0
+    if negative.any():
+        vertex_starts = [m.start() for m in _OBJ_VERTEX.finditer(data)]
+        face_starts = [m.start() for m in _OBJ_FACE.finditer(data)]
+        seen = vertex_base + np.searchsorted(vertex_starts, face_starts)
+        indices[negative] += seen[line[negative]]
+    # Positive indices are 1-based and absolute
+    indices[~negative] -= 1
+
+    # Corner k of an n-gon (1 <= k <= n - 2) starts the fan triangle (0, k, k + 1)
+    counts = np.bincount(line, minlength=len(polygons))
+    starts = np.cumsum(counts) - counts
+    position = np.arange(len(indices)) - starts[line]
+    fan = np.flatnonzero((position >= 1) & (position <= counts[line] - 2))
+    if len(fan):
+        faces.extend(np.column_stack([indices[starts[line[fan]]], indices[fan], indices[fan + 1]]))
+
+def read_3mf(file_path: str) -> np.ndarray:
+    """
+    Read every build item of a 3MF package into one triangle array.
+
+    The model part is streamed out of the zip with iterparse and each vertex
+    and triangle element is discarded once read, so the XML document is
+    never held in memory; coordinates and indices are collected in batches
+    into growable arrays. Objects may be meshes or assemblies of other
+    objects (components), and every build item is placed with its transform.
+    """
+    try:
+        with zipfile.ZipFile(file_path) as archive:
+            model_name = next(
+                (name for name in archive.namelist() if name.lower().endswith(".model")),
+                None
+            )
+            if model_name is None:
+                raise MeshFormatError("3MF package has no model part")
+            with archive.open(model_name) as stream:
+                meshes, components, items = _parse_3mf_model(stream)
+    except (zipfile.BadZipFile, ET.ParseError) as e:
+        raise MeshFormatError(f"Invalid 3MF file: {str(e)}")
+
+    # Packages without build items still carry printable objects
+    if not items:
+        referenced = {objectid for parts in components.values() for objectid, _ in parts}
+        items = [(objectid, None) for objectid in meshes if objectid not in referenced]
+
+    counts = {}
+    total = sum(_count_3mf_triangles(objectid, meshes, components, counts) for objectid, _ in items)
+    if total > MAX_3MF_TRIANGLES:
+        raise MeshFormatError(f"3MF file places {total} triangles, more than {MAX_3MF_TRIANGLES}")
+
+    triangles = GrowableArray((3, 3))
+    for objectid, transform in items:
+        for part in _resolve_3mf_object(objectid, transform, meshes, components):
+            triangles.extend(part)
+    if len(triangles) == 0:
+        raise MeshFormatError("3MF file has no meshes")
+    return triangles.view()
+
+def _parse_3mf_model(stream) -> tuple:
+    """
+    Stream the objects and build items out of a 3MF model part.
+
+    Returns:
+        Tuple of meshes {object id: (vertices, triangle indices)},
+        components {object id: [(object id, transform)]} and build items
+        [(object id, transform)], transforms being 4x4 matrices or None
+    """
+    meshes = {}
+    components = {}
+    items = []
+
+    object_id = None
+    container = None
+    batch = []
+    vertices = triangles = None
+
+    def flush() -> None:
+        if not batch:
+            return
+        try:
+            if container.tag == VERTICES:
+                vertices.extend(np.array(batch, dtype=np.float32).reshape(-1, 3))
+            else:
+                triangles.extend(np.array(batch, dtype=np.int64).reshape(-1, 3))
+        except (TypeError, ValueError):
+            raise MeshFormatError(f"3MF object {object_id} has an invalid vertex or triangle")
+        batch.clear()
+        # Drop the elements already read so the tree never grows
+        container.clear()
+
+    events = ET.iterparse(stream, events=("start", "end"))
+    _, root = next(events)
+    namespace = root.tag[:root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+    # Tags are compared once per element, so build them up front
+    VERTEX, TRIANGLE = f"{namespace}vertex", f"{namespace}triangle"
+    VERTICES, TRIANGLES = f"{namespace}vertices", f"{namespace}triangles"
+    OBJECT, MESH = f"{namespace}object", f"{namespace}mesh"
+    COMPONENT, ITEM = f"{namespace}component", f"{namespace}item"
+
+    for event, element in events:
+        tag = element.tag
+        if event == "end":
+            if tag == VERTEX:
+                get = element.get
+                batch.extend((get("x"), get("y"), get("z")))
+            elif tag == TRIANGLE:
+                get = element.get
+                batch.extend((get("v1"), get("v2"), get("v3")))
+            else:
+                if tag == VERTICES or tag == TRIANGLES:
+                    flush()
+                    container = None
+                elif tag == MESH:
+                    if len(triangles):
+                        meshes[object_id] = (vertices.view(), triangles.view())
+                elif tag == COMPONENT:
+                    components.setdefault(object_id, []).append(
+                        (element.get("objectid"), _parse_3mf_transform(element.get("transform")))
+                    )
+                elif tag == OBJECT:
+                    element.clear()
+                elif tag == ITEM:
+                    items.append((element.get("objectid"), _parse_3mf_transform(element.get("transform"))))
+                continue
+            if len(batch) >= 3 * XML_BATCH_SIZE:
+                flush()
+        elif tag == OBJECT:
+            object_id = element.get("id")
+        elif tag == MESH:
+            vertices = GrowableArray((3,))
+            triangles = GrowableArray((3,), dtype=np.int64)
+        elif tag == VERTICES or tag == TRIANGLES:
+            container = element
+
+    return meshes, components, items
+
+def _count_3mf_triangles(objectid: str, meshes: dict, components: dict, counts: dict, depth: int = 0) -> int:
+    """Count the triangles an object places, without expanding its components."""
+    if depth > MAX_COMPONENT_DEPTH:
+        raise MeshFormatError("3MF components are nested too deeply")
+    if objectid not in counts:
+        count = len(meshes[objectid][1]) if objectid in meshes else 0
+        for child, _ in components.get(objectid, ()):
+            count += _count_3mf_triangles(child, meshes, components, counts, depth + 1)
+        counts[objectid] = count
+    return counts[objectid]
+
+def _resolve_3mf_object(
+    objectid: str,
+    transform: Optional[np.ndarray],
+    meshes: dict,
+    components: dict,
+    depth: int = 0
+):
+    """Yield the placed triangles of an object, expanding its components."""
+    if depth > MAX_COMPONENT_DEPTH:
+        raise MeshFormatError("3MF components are nested too deeply")
+
+    if objectid in meshes:
+        vertices, indices = meshes[objectid]
+        if indices.min() < 0 or indices.max() >= len(vertices):
+            raise MeshFormatError(f"3MF object {objectid} references a missing vertex")
+        triangles = vertices[indices]
+        if transform is not None:
+            triangles = (triangles @ transform[:3, :3] + transform[3, :3]).astype(np.float32)
+        yield triangles
+
+    for child, child_transform in components.get(objectid, ()):
+        # Component transforms apply before the parent's
+        if child_transform is None:
+            combined = transform
+        elif transform is None:
+            combined = child_transform
+        else:
+            combined = child_transform @ transform
+        yield from _resolve_3mf_object(child, combined, meshes, components, depth + 1)
+
+def _parse_3mf_transform(transform: Optional[str]) -> Optional[np.ndarray]:
+    """Parse a 3MF affine transform ("m00 m01 m02 m10 ... m32") into a 4x4 row-vector matrix."""
+    if not transform:
+        return None
+    try:
+        values = np.array(transform.split(), dtype=np.float64)
+    except ValueError:
+        values = np.empty(0)
+    if values.size != 12:
+        raise MeshFormatError(f"Invalid 3MF transform: {transform}")
+    matrix = np.eye(4)
+    matrix[:, :3] = values.reshape(4, 3)
+    return matrix
+
+# Model readers by file extension
+_READERS = {
+    ".stl": read_stl,
+    ".obj": read_obj,
+    ".3mf": read_3mf,
+}
@@ -0,0 +1,181 @@
+
+import numpy as np
+from typing import Any, Dict, List
+
+# Faces whose normal points further down than this from the build direction
+# (measured from the vertical) need support
+OVERHANG_ANGLE = 45.0
+
+# Flat orientations are always candidates, the model's own one first
+AXIS_DIRECTIONS = np.array([
+    [0.0, 0.0, 1.0], [0.0, 0.0, -1.0],
+    [1.0, 0.0, 0.0], [-1.0, 0.0, 0.0],
+    [0.0, 1.0, 0.0], [0.0, -1.0, 0.0],
+])
+
+# Relative weight of each normalized metric in an orientation's score
+SCORE_WEIGHTS = {"support_volume": 0.6, "height": 0.3, "overhang_area": 0.1}
+
+# Faces whose centroid is this close to the plate (in mm) rest on it
+BED_TOLERANCE = 0.1
+
+# Faces and vertices are scored in blocks so the (rows, candidates)
+# products stay bounded
+CHUNK_SIZE = 65_536
+
+# Meshes with more faces are scored on an area-weighted sample
+SAMPLE_FACES = 131_072
+
+def fibonacci_sphere(count: int) -> np.ndarray:
+    """
+    Return `count` nearly uniform unit vectors on the sphere.
+
+    Points follow a golden-angle spiral from the north to the south pole,
+    so the first one is always close to straight up.
+    """
+    i = np.arange(count) + 0.5
+    z = 1 - 2 * i / count
+    radius = np.sqrt(1 - z * z)
+    theta = np.pi * (3 - np.sqrt(5)) * i
+    return np.column_stack([radius * np.cos(theta), radius * np.sin(theta), z])
+
+def rotation_to_z(up: np.ndarray) -> np.ndarray:
+    """Return the rotation matrix that turns the direction `up` into +Z."""
+    up = up / np.linalg.norm(up)
+    axis = np.cross(up, [0.0, 0.0, 1.0])
+    sin = np.linalg.norm(axis)
+    cos = up[2]
+    if sin < 1e-12:
+        # Already vertical: identity, or a half turn about X when upside down
+        return np.eye(3) if cos > 0 else np.diag([1.0, -1.0, -1.0])
+
+    # Rodrigues' formula
+    k = axis / sin
+    cross = np.array([[0, -k[2], k[1]], [k[2], 0, -k[0]], [-k[1], k[0], 0]])
+    return np.eye(3) + sin * cross + (1 - cos) * cross @ cross
+
+def _face_normals(triangles: np.ndarray) -> np.ndarray:
+    """Unnormalized float32 face normals, whose length is twice the face area."""
+    normals = np.empty((len(triangles), 3), dtype=np.float32)
+    for offset in range(0, len(triangles), CHUNK_SIZE):
+        tri = triangles[offset:offset + CHUNK_SIZE].astype(np.float32)
+        normals[offset:offset + CHUNK_SIZE] = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    return normals
+
+def score_orientations(triangles: np.ndarray, directions: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Measure overhang area, support volume and height for every build direction.
+
+    A candidate is the direction in model space that ends up pointing up.
+    All candidates are scored together: the face normals, centroids and
+    vertices are multiplied by the (3, K) direction matrix, so each metric is
+    a masked reduction over a (faces, K) product. Support volume is the
+    downward projected area of every overhanging face times its height above
+    the plate, which ignores supports landing on the part itself. Meshes
+    above SAMPLE_FACES faces are scored on an area-weighted sample of faces,
+    while heights always use every vertex.
+
+    Args:
+        triangles: Array of shape (n, 3, 3)
+        directions: Unit build directions of shape (K, 3)
+
+    Returns:
+        Dictionary of (K,) arrays: overhang_area (mm²), support_volume (mm³)
+        and height (mm)
+    """
+    # float32 products are plenty for ranking orientations and twice as fast
+    directions_t = np.ascontiguousarray(directions.T, dtype=np.float32)
+    count = len(directions)
+    threshold = -np.cos(np.radians(OVERHANG_ANGLE))
+
+    # Extent along each direction; the lowest point lands on the plate
+    low = np.full(count, np.inf, dtype=np.float32)
+    high = np.full(count, -np.inf, dtype=np.float32)
+    corners = triangles.reshape(-1, 3)
+    for offset in range(0, len(corners), CHUNK_SIZE):
+        heights = corners[offset:offset + CHUNK_SIZE].astype(np.float32) @ directions_t
+        np.minimum(low, heights.min(axis=0), out=low)
+        np.maximum(high, heights.max(axis=0), out=high)
+
+    # Large meshes are scored on an area-weighted sample of their faces,
+    # each standing in for an equal share of the total surface area
+    normals = _face_normals(triangles)
+    doubled_area = np.linalg.norm(normals, axis=1)
+    if len(triangles) > SAMPLE_FACES:
+        weights = doubled_area.astype(np.float64)
+        total_area = weights.sum() / 2
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(len(triangles), SAMPLE_FACES, p=weights / weights.sum()))
+        triangles, normals = triangles[sample], normals[sample]
+        doubled_area = np.full(SAMPLE_FACES, 2 * total_area / SAMPLE_FACES, dtype=np.float32)
+
+    overhang_area = np.zeros(count)
+    support_volume = np.zeros(count)
+    for offset in range(0, len(triangles), CHUNK_SIZE):
+        block = slice(offset, offset + CHUNK_SIZE)
+        valid = doubled_area[block] > 0
+        unit = normals[block][valid] / doubled_area[block][valid, None]
+        area = doubled_area[block][valid] / 2
+
+        # Height of each face centroid above the plate, for every direction
+        height = triangles[block][valid].astype(np.float32).mean(axis=1) @ directions_t
+        height -= low
+        facing = unit @ directions_t
+
+        # Down-facing faces resting on the plate need no support
+        overhang = (facing < threshold) & (height > BED_TOLERANCE)
+        overhang_area += area @ overhang
+
+        # Support column: projected area on the plate times the height
+        facing *= height
+        support_volume -= area @ np.where(overhang, facing, 0.0)
+
+    return {
+        "overhang_area": overhang_area,
+        "support_volume": support_volume,
+        "height": high - low,
+    }
+
+def optimize_orientation(triangles: np.ndarray, candidates: int = 256, top: int = 3) -> Dict[str, Any]:
+    """
+    Search build orientations that minimize support volume and print height.
+
+    Metrics are normalized by their largest value among the candidates and
+    combined with SCORE_WEIGHTS; lower scores are better. The model's own
+    orientation and the other axis-aligned ones are always among the
+    candidates, so the best options can be compared to how the part arrived.
+
+    Args:
+        triangles: Array of shape (n, 3, 3)
+        candidates: Number of build directions sampled on the sphere
+        top: Number of best orientations to return
+
+    Returns:
+        Dictionary with the scores of the current orientation and the best
+        `top` orientations, each with its up vector and rotation matrix
+    """
+    directions = np.vstack([AXIS_DIRECTIONS, fibonacci_sphere(candidates)])
+    metrics = score_orientations(triangles, directions)
+
+    score = np.zeros(len(directions))
+    for name, weight in SCORE_WEIGHTS.items():
+        values = metrics[name]
+        largest = values.max()
+        if largest > 0:
+            score += weight * values / largest
+
+    def describe(i: int) -> Dict[str, Any]:
+        return {
+            "up": [round(float(v), 6) for v in directions[i]],
+            "rotation": np.round(rotation_to_z(directions[i]), 6).tolist(),
+            "overhang_area_mm2": round(float(metrics["overhang_area"][i]), 2),
+            "support_volume_cm3": round(float(metrics["support_volume"][i]) / 1000, 3),
+            "height_mm": round(float(metrics["height"][i]), 3),
+            "score": round(float(score[i]), 4),
+        }
+
+    best: List[int] = np.argsort(score, kind="stable")[:top].tolist()
+    return {
+        "current": describe(0),
+        "best": [describe(i) for i in best],
+    }
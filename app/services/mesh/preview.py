@@ -0,0 +1,160 @@
+
+import struct
+import numpy as np
+from typing import List, Optional, Tuple
+
+from app.services.mesh.topology import weld_vertices
+
+# Face budgets of the levels of detail, finest first
+LOD_FACE_TARGETS = (100_000, 20_000, 4_000)
+
+# Binary preview layout, little-endian:
+#   magic "PVW1", vertex count, index count, flags (bit 0: 32-bit indices),
+#   float32 origin[3] and scale[3], then uint16 positions (3 per vertex),
+#   int8 oct-encoded normals (2 per vertex) and the triangle indices, each
+#   block padded to 4 bytes. A position is origin + q / 65535 * scale.
+PREVIEW_MAGIC = b"PVW1"
+PREVIEW_HEADER = struct.Struct("<4sIII6f")
+
+def cluster_vertices(vertices: np.ndarray, faces: np.ndarray, grid: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Decimate a mesh by vertex clustering.
+
+    Vertices are snapped to a uniform grid with `grid` cells along the
+    longest side of the bounding box; every occupied cell becomes one vertex
+    at the mean of its members. Faces collapsing to an edge or point, and
+    duplicates, are dropped.
+
+    Args:
+        vertices: Welded vertices of shape (v, 3)
+        faces: Faces of shape (n, 3) indexing into vertices
+
+    Returns:
+        Tuple of decimated float32 vertices and faces
+    """
+    low = vertices.min(axis=0)
+    extent = float((vertices.max(axis=0) - low).max()) or 1.0
+    cell = extent / grid
+    cells = np.minimum(((vertices - low) / cell).astype(np.int64), grid)
+    keys = (cells[:, 0] * (grid + 1) + cells[:, 1]) * (grid + 1) + cells[:, 2]
+    _, cluster = np.unique(keys, return_inverse=True)
+    cluster = cluster.ravel()
+
+    # Mean position of every cluster
+    counts = np.bincount(cluster)
+    centers = np.stack([np.bincount(cluster, weights=vertices[:, axis]) for axis in range(3)], axis=1)
+    centers /= counts[:, None]
+
+    f = cluster[faces]
+    f = f[(f[:, 0] != f[:, 1]) & (f[:, 1] != f[:, 2]) & (f[:, 2] != f[:, 0])]
+    # Faces over the same three clusters collapse into one, whatever their winding
+    _, unique = np.unique(np.sort(f, axis=1), axis=0, return_index=True)
+    f = f[np.sort(unique)]
+
+    # Drop clusters no longer used by any face
+    used, f = np.unique(f, return_inverse=True)
+    return centers[used].astype(np.float32), f.reshape(-1, 3)
+
+def vertex_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Area-weighted unit vertex normals."""
+    tri = vertices[faces].astype(np.float64)
+    face_normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    corners = faces.ravel()
+    normals = np.stack([
+        np.bincount(corners, weights=np.repeat(face_normals[:, axis], 3), minlength=len(vertices))
+        for axis in range(3)
+    ], axis=1)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+def oct_encode(normals: np.ndarray) -> np.ndarray:
+    """Encode unit normals as two signed bytes with octahedral mapping."""
+    n = normals / np.maximum(np.abs(normals).sum(axis=1, keepdims=True), 1e-12)
+    xy = n[:, :2].copy()
+    lower = n[:, 2] < 0
+    # Fold the lower hemisphere over the diagonals of the octahedron
+    signs = np.where(xy[lower] >= 0, 1.0, -1.0)
+    xy[lower] = (1 - np.abs(xy[lower][:, ::-1])) * signs
+    return np.round(np.clip(xy, -1, 1) * 127).astype(np.int8)
+
+def oct_decode(encoded: np.ndarray) -> np.ndarray:
+    """Decode octahedral normals back to unit vectors."""
+    xy = encoded.astype(np.float64) / 127
+    z = 1 - np.abs(xy).sum(axis=1)
+    lower = z < 0
+    signs = np.where(xy[lower] >= 0, 1.0, -1.0)
+    xy[lower] = (1 - np.abs(xy[lower][:, ::-1])) * signs
+    normals = np.column_stack([xy, z])
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+def _pad(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 4)
+
+def encode_preview(vertices: np.ndarray, faces: np.ndarray) -> bytes:
+    """Pack a mesh into the quantized binary preview format."""
+    origin = vertices.min(axis=0).astype(np.float64)
+    scale = vertices.max(axis=0).astype(np.float64) - origin
+    safe_scale = np.where(scale > 0, scale, 1.0)
+    positions = np.round((vertices - origin) / safe_scale * 65535).astype("<u2")
+    normals = oct_encode(vertex_normals(vertices, faces))
+
+    wide = len(vertices) > 65536
+    indices = faces.astype("<u4" if wide else "<u2")
+    header = PREVIEW_HEADER.pack(PREVIEW_MAGIC, len(vertices), indices.size, int(wide), *origin, *scale)
+    return header + _pad(positions.tobytes()) + _pad(normals.tobytes()) + indices.tobytes()
+
+def decode_preview(data: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Unpack a binary preview into vertices, unit normals and faces."""
+    magic, vertex_count, index_count, flags, *bounds = PREVIEW_HEADER.unpack_from(data)
+    if magic != PREVIEW_MAGIC:
+        raise ValueError("Not a preview mesh")
+    origin, scale = np.array(bounds[:3]), np.array(bounds[3:])
+
+    offset = PREVIEW_HEADER.size
+    positions = np.frombuffer(data, "<u2", vertex_count * 3, offset).reshape(-1, 3)
+    offset += vertex_count * 6 + (-vertex_count * 6 % 4)
+    normals = np.frombuffer(data, np.int8, vertex_count * 2, offset).reshape(-1, 2)
+    offset += vertex_count * 2 + (-vertex_count * 2 % 4)
+    indices = np.frombuffer(data, "<u4" if flags & 1 else "<u2", index_count, offset)
+
+    vertices = origin + positions / 65535 * scale
+    return vertices, oct_decode(normals), indices.reshape(-1, 3).astype(np.int64)
+
+def build_lods(
+    triangles: np.ndarray,
+    targets: Tuple[int, ...] = LOD_FACE_TARGETS,
+    vertices: Optional[np.ndarray] = None,
+    faces: Optional[np.ndarray] = None
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Build successively coarser meshes, each within its face budget.
+
+    Each level is decimated from the previous one. The grid size is first
+    guessed from the budget, as clustered surfaces keep roughly twice as
+    many faces as the occupied cells on each side, then shrunk until the
+    level fits.
+
+    Args:
+        triangles: Array of shape (n, 3, 3)
+        targets: Face budget of each level, finest first
+        vertices: Welded vertices, computed from triangles if not given
+        faces: Faces indexing into vertices
+
+    Returns:
+        List of (vertices, faces), one per target
+    """
+    if vertices is None or faces is None:
+        vertices, faces = weld_vertices(triangles)
+    faces = faces.astype(np.int64)
+
+    lods = []
+    for target in targets:
+        grid = max(4, int(np.sqrt(target / 2) * 2))
+        while len(faces) > target and grid >= 4:
+            decimated = cluster_vertices(vertices, faces, grid)
+            if len(decimated[1]) <= target:
+                vertices, faces = decimated
+                break
+            grid = int(grid * min(0.9, np.sqrt(target / len(decimated[1]))))
+        lods.append((vertices, faces))
+    return lods
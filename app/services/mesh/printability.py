@@ -0,0 +1,205 @@
+
+import numpy as np
+from typing import Any, Dict, Optional
+
+from app.services.mesh.topology import weld_vertices, count_sorted_runs
+
+# Walls thinner than this (in mm) are unlikely to print reliably
+MIN_WALL_THICKNESS = 0.8
+
+# Number of rays per side of the grid cast along each axis for wall checks
+THICKNESS_GRID = 128
+
+def check_printability(
+    triangles: np.ndarray,
+    vertices: Optional[np.ndarray] = None,
+    faces: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Check a mesh for defects that prevent or degrade printing.
+
+    Edge adjacency is built by sorting integer edge keys rather than filling
+    a dictionary: an undirected edge shared by exactly two faces is manifold,
+    one face means an open (boundary) edge and more than two a non-manifold
+    edge. A manifold edge traversed in the same direction by both faces
+    means one of them has a flipped normal.
+
+    Args:
+        triangles: Array of shape (n, 3, 3)
+        vertices: Welded vertices, computed from triangles if not given
+        faces: Faces indexing into vertices
+
+    Returns:
+        Dictionary with edge defect counts, wall thickness estimates and an
+        overall printable flag
+    """
+    if vertices is None or faces is None:
+        vertices, faces = weld_vertices(triangles)
+
+    f = faces.astype(np.int64)
+    vertex_count = np.int64(len(vertices))
+
+    degenerate = (f[:, 0] == f[:, 1]) | (f[:, 1] == f[:, 2]) | (f[:, 2] == f[:, 0])
+    f = f[~degenerate]
+
+    # Directed edges a -> b of every face, encoded as a * V + b
+    a = f.ravel()
+    b = f[:, [1, 2, 0]].ravel()
+    directed = a * vertex_count + b
+    undirected = np.minimum(a, b) * vertex_count + np.maximum(a, b)
+
+    undirected.sort()
+    edge_uses = count_sorted_runs(undirected)
+    directed.sort()
+    direction_uses = count_sorted_runs(directed)
+
+    open_edges = int(np.count_nonzero(edge_uses == 1))
+    non_manifold_edges = int(np.count_nonzero(edge_uses > 2))
+    # Repeated directed edges come from neighbours with opposite winding
+    inconsistent_edges = int((direction_uses[direction_uses > 1] - 1).sum())
+
+    thickness = estimate_wall_thickness(triangles)
+    watertight = open_edges == 0 and non_manifold_edges == 0
+
+    return {
+        "watertight": watertight,
+        "open_edges": open_edges,
+        "non_manifold_edges": non_manifold_edges,
+        "inconsistent_edges": inconsistent_edges,
+        "degenerate_faces": int(np.count_nonzero(degenerate)),
+        "min_wall_thickness_mm": thickness["min_wall_thickness_mm"],
+        "thin_wall_fraction": thickness["thin_wall_fraction"],
+        "printable": (
+            watertight
+            and inconsistent_edges == 0
+            and (thickness["min_wall_thickness_mm"] or np.inf) >= MIN_WALL_THICKNESS
+        ),
+    }
+
+def estimate_wall_thickness(
+    triangles: np.ndarray,
+    resolution: int = THICKNESS_GRID
+) -> Dict[str, Optional[float]]:
+    """
+    Estimate the thinnest wall by casting a grid of rays along each axis.
+
+    Every ray records where it enters and leaves the solid; the distance
+    between an entry and the following exit, scaled by how squarely the ray
+    meets the surface, approximates the wall thickness there. Hits at
+    grazing angles are skipped because chords near a silhouette say nothing
+    about thickness; every surface orientation is within 55 degrees of one
+    of the axes, so no wall is missed entirely.
+
+    Returns:
+        Dictionary with the minimum thickness in mm (None if no ray hit the
+        mesh) and the fraction of solid spans thinner than MIN_WALL_THICKNESS
+    """
+    spans = []
+    for axis in range(3):
+        spans.append(_axis_spans(triangles, axis, resolution))
+    spans = np.concatenate(spans)
+    # Zero-length spans come from duplicated or coincident faces
+    spans = spans[spans > 1e-6]
+
+    if len(spans) == 0:
+        return {"min_wall_thickness_mm": None, "thin_wall_fraction": None}
+    return {
+        "min_wall_thickness_mm": float(spans.min()),
+        "thin_wall_fraction": float(np.count_nonzero(spans < MIN_WALL_THICKNESS) / len(spans)),
+    }
+
+# Hits whose surface normal is further than ~55 degrees from the ray are ignored
+_MIN_ALIGNMENT = 0.57
+
+# Candidate (face, ray) pairs tested at once, bounding the memory of a thickness check
+_MAX_PAIRS = 1 << 20
+
+def _axis_spans(triangles: np.ndarray, axis: int, resolution: int) -> np.ndarray:
+    """Return the solid span lengths of rays cast along +axis."""
+    # Cyclic (u, v, w) axes make the 2D cross product equal the normal's w
+    u_axis, v_axis = (axis + 1) % 3, (axis + 2) % 3
+    u = triangles[:, :, u_axis]
+    v = triangles[:, :, v_axis]
+
+    u_min = np.minimum(np.minimum(u[:, 0], u[:, 1]), u[:, 2])
+    u_max = np.maximum(np.maximum(u[:, 0], u[:, 1]), u[:, 2])
+    v_min = np.minimum(np.minimum(v[:, 0], v[:, 1]), v[:, 2])
+    v_max = np.maximum(np.maximum(v[:, 0], v[:, 1]), v[:, 2])
+
+    origin_u, origin_v = float(u_min.min()), float(v_min.min())
+    step = max(float(u_max.max()) - origin_u, float(v_max.max()) - origin_v) / resolution
+    if step <= 0:
+        return np.zeros(0)
+
+    # Range of ray indices whose center falls inside each face's 2D bbox
+    i0 = np.ceil((u_min - origin_u) / step - 0.5).astype(np.int64)
+    i1 = np.floor((u_max - origin_u) / step - 0.5).astype(np.int64)
+    j0 = np.ceil((v_min - origin_v) / step - 0.5).astype(np.int64)
+    j1 = np.floor((v_max - origin_v) / step - 0.5).astype(np.int64)
+    width = np.clip(i1 - i0 + 1, 0, None)
+    counts = width * np.clip(j1 - j0 + 1, 0, None)
+
+    # Most faces of a dense mesh contain no ray center at all
+    hit_faces = np.flatnonzero(counts)
+    if len(hit_faces) == 0:
+        return np.zeros(0)
+    tri = triangles[hit_faces].astype(np.float64)
+    counts, width, i0, j0 = counts[hit_faces], width[hit_faces], i0[hit_faces], j0[hit_faces]
+
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    length = np.sqrt(np.einsum("ij,ij->i", normals, normals))
+    area2 = normals[:, axis]
+    alignment = np.abs(area2) / np.where(length > 0, length, np.inf)
+    counts[alignment < _MIN_ALIGNMENT] = 0
+
+    if not counts.any():
+        return np.zeros(0)
+
+    # Expand (face, candidate ray) pairs without a Python loop per pair, a
+    # bounded batch of faces at a time: the pair count grows with the
+    # faces' projected area over the grid, not with what they actually hit
+    ends = np.cumsum(counts)
+    hits = []
+    first = 0
+    while first < len(tri):
+        last = max(int(np.searchsorted(ends, ends[first] - counts[first] + _MAX_PAIRS, side="right")), first + 1)
+        batch = np.arange(first, last)
+        first = last
+        batch_counts = counts[batch]
+        total = int(batch_counts.sum())
+        if total == 0:
+            continue
+
+        pair_face = np.repeat(batch, batch_counts)
+        local = np.arange(total) - np.repeat(np.cumsum(batch_counts) - batch_counts, batch_counts)
+        ray_i = i0[pair_face] + local % width[pair_face]
+        ray_j = j0[pair_face] + local // width[pair_face]
+        pu = origin_u + (ray_i + 0.5) * step
+        pv = origin_v + (ray_j + 0.5) * step
+
+        fu, fv, fw = tri[pair_face, :, u_axis], tri[pair_face, :, v_axis], tri[pair_face, :, axis]
+        d = area2[pair_face]
+        b1 = ((pu - fu[:, 0]) * (fv[:, 2] - fv[:, 0]) - (fu[:, 2] - fu[:, 0]) * (pv - fv[:, 0])) / d
+        b2 = ((fu[:, 1] - fu[:, 0]) * (pv - fv[:, 0]) - (pu - fu[:, 0]) * (fv[:, 1] - fv[:, 0])) / d
+        b0 = 1 - b1 - b2
+        inside = (b0 >= 0) & (b1 >= 0) & (b2 >= 0)
+
+        hits.append((
+            (b0 * fw[:, 0] + b1 * fw[:, 1] + b2 * fw[:, 2])[inside],
+            # Faces whose normal points against the ray are where it enters
+            (d < 0)[inside],
+            alignment[pair_face][inside],
+            (ray_i * resolution + ray_j)[inside],
+        ))
+
+    depth, entering, cosine, ray = (np.concatenate(column) for column in zip(*hits))
+
+    # Sorted by ray then depth, each entry is paired with the exit right
+    # after it, in one linear pass
+    order = np.lexsort((depth, ray))
+    depth, entering, cosine, ray = depth[order], entering[order], cosine[order], ray[order]
+
+    pairs = (ray[1:] == ray[:-1]) & entering[:-1] & ~entering[1:]
+    # A slab crossed at an angle is thicker along the ray than across it
+    scale = (cosine[1:] + cosine[:-1]) / 2
+    return ((depth[1:] - depth[:-1]) * scale)[pairs]
@@ -0,0 +1,184 @@
+
+import zlib
+import struct
+import numpy as np
+
+# Camera: orthographic view from the front-right, looking down
+VIEW_AZIMUTH = 45.0
+VIEW_ELEVATION = 30.0
+
+# Lambert shading from a light over the viewer's shoulder
+LIGHT_DIRECTION = np.array([-0.4, 0.5, 0.77])
+AMBIENT = 0.25
+BASE_COLOR = np.array([70, 130, 200])
+
+# Fraction of the image left empty around the model
+MARGIN = 0.05
+
+# (triangle, pixel) candidate pairs are expanded in batches of this size;
+# meshes needing more than MAX_PAIRS in total (large overlapping faces) are
+# rendered at a lower resolution and scaled up
+PAIR_BATCH = 2_000_000
+MAX_PAIRS = 16_000_000
+
+# Bits of the packed z-buffer key: pixel index, depth and shade
+DEPTH_BITS = 24
+SHADE_BITS = 8
+
+def view_matrix(azimuth: float = VIEW_AZIMUTH, elevation: float = VIEW_ELEVATION) -> np.ndarray:
+    """Rotation taking model coordinates (z up) to view coordinates (x right, y up, z towards the viewer)."""
+    a, e = np.radians(azimuth), np.radians(elevation)
+    spin = np.array([[np.cos(a), -np.sin(a), 0], [np.sin(a), np.cos(a), 0], [0, 0, 1]])
+    # Turn z up into y up, then tilt the camera down by the elevation
+    upright = np.array([[1, 0, 0], [0, 0, 1], [0, -1, 0]])
+    tilt = np.array([[1, 0, 0], [0, np.cos(e), -np.sin(e)], [0, np.sin(e), np.cos(e)]])
+    return tilt @ upright @ spin
+
+def render_mesh(triangles: np.ndarray, size: int = 512) -> np.ndarray:
+    """
+    Render a flat-shaded view of a mesh with a vectorized z-buffer.
+
+    Every triangle is paired with the pixel centres inside its screen
+    bounding box, in batches, and the pairs inside the triangle are kept.
+    Each covered pixel packs its index, quantized depth and shade into one
+    integer key, so sorting the keys puts the nearest surface of every pixel
+    first in its run; no per-pixel loop or scatter-min is needed. Faces are
+    lit from both sides so meshes with flipped normals still render.
+
+    Args:
+        triangles: Array of shape (n, 3, 3), z pointing up
+        size: Width and height of the image in pixels
+
+    Returns:
+        RGBA image of shape (size, size, 4) with a transparent background
+    """
+    image = np.zeros((size, size, 4), dtype=np.uint8)
+    if len(triangles) == 0:
+        return image
+
+    # Project and fit the model into the image, keeping its aspect ratio
+    view = triangles.reshape(-1, 3).astype(np.float32) @ view_matrix().T.astype(np.float32)
+    low, high = view.min(axis=0), view.max(axis=0)
+    extent = float(max(high[0] - low[0], high[1] - low[1])) or 1.0
+    scale = size * (1 - 2 * MARGIN) / extent
+    center = (low + high) / 2
+    screen = np.empty_like(view)
+    screen[:, 0] = (view[:, 0] - center[0]) * scale + size / 2
+    screen[:, 1] = size / 2 - (view[:, 1] - center[1]) * scale
+    # Depth in [0, 1], 0 nearest the viewer
+    depth_range = float(high[2] - low[2]) or 1.0
+    screen[:, 2] = (high[2] - view[:, 2]) / depth_range
+    screen = screen.reshape(-1, 3, 3)
+
+    # Two-sided Lambert shading per face, in view space
+    faces = view.reshape(-1, 3, 3)
+    normals = np.cross(faces[:, 1] - faces[:, 0], faces[:, 2] - faces[:, 0])
+    light = (LIGHT_DIRECTION / np.linalg.norm(LIGHT_DIRECTION)).astype(np.float32)
+    lit = np.abs(normals @ light)
+    lengths = np.linalg.norm(normals, axis=1)
+    shade = np.divide(lit, lengths, out=np.zeros_like(lit), where=lengths > 0)
+    shade_levels = np.round((AMBIENT + (1 - AMBIENT) * shade) * (2 ** SHADE_BITS - 1)).astype(np.int64)
+
+    # Pixel centres (i + 0.5) covered by each triangle's bounding box; the
+    # corner-wise minimum/maximum is much faster than a strided reduction
+    xs, ys = screen[:, :, 0], screen[:, :, 1]
+    x0 = np.clip(np.ceil(np.minimum(np.minimum(xs[:, 0], xs[:, 1]), xs[:, 2]) - 0.5), 0, size).astype(np.int64)
+    x1 = np.clip(np.floor(np.maximum(np.maximum(xs[:, 0], xs[:, 1]), xs[:, 2]) - 0.5), -1, size - 1).astype(np.int64)
+    y0 = np.clip(np.ceil(np.minimum(np.minimum(ys[:, 0], ys[:, 1]), ys[:, 2]) - 0.5), 0, size).astype(np.int64)
+    y1 = np.clip(np.floor(np.maximum(np.maximum(ys[:, 0], ys[:, 1]), ys[:, 2]) - 0.5), -1, size - 1).astype(np.int64)
+    widths = np.clip(x1 - x0 + 1, 0, None)
+    heights = np.clip(y1 - y0 + 1, 0, None)
+    counts = widths * heights
+
+    winners = []
+    ends = np.cumsum(counts)
+    if ends[-1] == 0:
+        return image
+    if ends[-1] > MAX_PAIRS and size > 16:
+        # Pairs grow with the square of the resolution
+        reduced = max(16, int(size * np.sqrt(MAX_PAIRS / ends[-1])))
+        pixels = np.arange(size) * reduced // size
+        return render_mesh(triangles, reduced)[pixels][:, pixels]
+    cuts = np.searchsorted(ends, np.arange(PAIR_BATCH, ends[-1], PAIR_BATCH), side="right")
+    bounds = [0, *np.unique(cuts).tolist(), len(screen)]
+    for lower, upper in zip(bounds[:-1], bounds[1:]):
+        batch = slice(lower, upper)
+        if upper > lower and counts[batch].any():
+            keys = _rasterize(
+                screen[batch], x0[batch], y0[batch], widths[batch], counts[batch], shade_levels[batch], size
+            )
+            winners.append(_nearest(keys))
+
+    keys = _nearest(np.concatenate(winners))
+    pixels = keys >> (DEPTH_BITS + SHADE_BITS)
+    shades = (keys & (2 ** SHADE_BITS - 1)).astype(np.float32) / (2 ** SHADE_BITS - 1)
+
+    flat = image.reshape(-1, 4)
+    flat[pixels, :3] = np.clip(BASE_COLOR * shades[:, None], 0, 255).astype(np.uint8)
+    flat[pixels, 3] = 255
+    return image
+
+def _rasterize(
+    screen: np.ndarray,
+    x0: np.ndarray,
+    y0: np.ndarray,
+    widths: np.ndarray,
+    counts: np.ndarray,
+    shade_levels: np.ndarray,
+    size: int
+) -> np.ndarray:
+    """Packed (pixel, depth, shade) keys of the pixels covered by a batch of triangles."""
+    total = int(counts.sum())
+    face = np.repeat(np.arange(len(screen)), counts)
+    offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    width = widths[face]
+    dy = offset // width
+    px = x0[face] + (offset - dy * width)
+    py = y0[face] + dy
+    cx = px.astype(np.float32) + 0.5
+    cy = py.astype(np.float32) + 0.5
+
+    a, b, c = screen[face, 0], screen[face, 1], screen[face, 2]
+    # Edge functions; a pixel is inside when all three share the triangle's sign
+    w0 = (c[:, 0] - b[:, 0]) * (cy - b[:, 1]) - (c[:, 1] - b[:, 1]) * (cx - b[:, 0])
+    w1 = (a[:, 0] - c[:, 0]) * (cy - c[:, 1]) - (a[:, 1] - c[:, 1]) * (cx - c[:, 0])
+    w2 = (b[:, 0] - a[:, 0]) * (cy - a[:, 1]) - (b[:, 1] - a[:, 1]) * (cx - a[:, 0])
+    area = w0 + w1 + w2
+    inside = (area != 0) & (
+        ((w0 >= 0) & (w1 >= 0) & (w2 >= 0)) | ((w0 <= 0) & (w1 <= 0) & (w2 <= 0))
+    )
+
+    w0, w1, w2, area = w0[inside], w1[inside], w2[inside], area[inside]
+    depth = (w0 * a[inside, 2] + w1 * b[inside, 2] + w2 * c[inside, 2]) / area
+    depth_levels = np.clip(depth * (2 ** DEPTH_BITS - 1), 0, 2 ** DEPTH_BITS - 1).astype(np.int64)
+
+    pixel = py[inside] * size + px[inside]
+    return (pixel << (DEPTH_BITS + SHADE_BITS)) | (depth_levels << SHADE_BITS) | shade_levels[face[inside]]
+
+def _nearest(keys: np.ndarray) -> np.ndarray:
+    """Keep the nearest key of every pixel."""
+    keys = np.sort(keys)
+    pixels = keys >> (DEPTH_BITS + SHADE_BITS)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = pixels[1:] != pixels[:-1]
+    return keys[first]
+
+def encode_png(image: np.ndarray) -> bytes:
+    """Encode an RGBA or RGB uint8 image as PNG."""
+    height, width, channels = image.shape
+    color_type = {3: 2, 4: 6}[channels]
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xFFFFFFFF)
+
+    # Every scanline starts with filter type 0 (none)
+    rows = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    rows[:, 1:] = image.reshape(height, -1)
+    header = struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+        + chunk(b"IEND", b"")
+    )
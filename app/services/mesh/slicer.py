@@ -0,0 +1,208 @@
+
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Tuple
+
+# Triangles are sliced in blocks, and each block's (triangle, layer) pairs
+# are expanded in batches, so temporaries stay bounded even for triangles
+# spanning hundreds of layers
+CHUNK_SIZE = 200_000
+PAIR_BATCH = 1_000_000
+
+# FDM profile used for time and material estimates
+WALL_COUNT = 2
+LINE_WIDTH = 0.4  # mm
+INFILL_DENSITY = 0.2
+WALL_SPEED = 40.0  # mm/s
+INFILL_SPEED = 80.0  # mm/s
+LAYER_OVERHEAD = 2.0  # s per layer for travel and layer change
+FILAMENT_DIAMETER = 1.75  # mm
+
+# Support material is printed sparsely under unsupported overhangs
+SUPPORT_DENSITY = 0.15
+
+# Resin printers expose whole layers at once
+RESIN_LAYER_HEIGHT = 0.05  # mm
+RESIN_SECONDS_PER_LAYER = 8.0
+
+def slice_layers(triangles: np.ndarray, layer_height: float, workers: int = 1) -> Dict[str, np.ndarray]:
+    """
+    Compute the cross-section area and perimeter of every layer.
+
+    Each layer plane sits in the middle of its layer. All (triangle, layer)
+    pairs are expanded at once and cut into segments; summing the shoelace
+    terms of segments oriented by their face normal gives the enclosed area
+    without ever joining segments into loops.
+
+    Args:
+        triangles: Array of shape (n, 3, 3), z pointing up
+        layer_height: Layer height in mm
+        workers: Processes to spread the layers across
+
+    Returns:
+        Dictionary of per-layer arrays: z, area (mm²) and perimeter (mm)
+    """
+    z_min = float(triangles[:, :, 2].min())
+    z_max = float(triangles[:, :, 2].max())
+    layer_count = max(1, int(np.ceil((z_max - z_min) / layer_height)))
+
+    # Centering in XY keeps the shoelace sums well conditioned
+    center = np.array([
+        (triangles[:, :, 0].min() + triangles[:, :, 0].max()) / 2,
+        (triangles[:, :, 1].min() + triangles[:, :, 1].max()) / 2,
+        z_min,
+    ])
+
+    if workers <= 1 or layer_count < 2 * workers:
+        area, perimeter = _slice_range(triangles, center, layer_height, 0, layer_count)
+    else:
+        bounds = np.linspace(0, layer_count, workers + 1).astype(int)
+        low = triangles[:, :, 2].min(axis=1) - z_min
+        high = triangles[:, :, 2].max(axis=1) - z_min
+        jobs = []
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                # Only ship the triangles that cross this band of layers
+                band = (high >= start * layer_height) & (low <= stop * layer_height)
+                jobs.append(pool.submit(
+                    _slice_range, np.ascontiguousarray(triangles[band]), center, layer_height, start, stop
+                ))
+            results = [job.result() for job in jobs]
+        area = np.concatenate([result[0] for result in results])
+        perimeter = np.concatenate([result[1] for result in results])
+
+    return {
+        "z": z_min + (np.arange(layer_count) + 0.5) * layer_height,
+        "area": area,
+        "perimeter": perimeter,
+    }
+
+def _slice_range(
+    triangles: np.ndarray,
+    center: np.ndarray,
+    layer_height: float,
+    start: int,
+    stop: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Slice layers [start, stop) and return their areas and perimeters."""
+    area = np.zeros(stop - start)
+    perimeter = np.zeros(stop - start)
+
+    for offset in range(0, len(triangles), CHUNK_SIZE):
+        tri = triangles[offset:offset + CHUNK_SIZE].astype(np.float64) - center
+
+        # Sort each triangle's corners by height: lo <= mid <= hi
+        order = np.argsort(tri[:, :, 2], axis=1)
+        sorted_tri = np.take_along_axis(tri, order[:, :, None], axis=1)
+        lo, mid, hi = sorted_tri[:, 0], sorted_tri[:, 1], sorted_tri[:, 2]
+
+        # Layers whose mid-plane lies within the triangle's height range
+        first = np.maximum(np.ceil(lo[:, 2] / layer_height - 0.5), start).astype(np.int64)
+        last = np.minimum(np.floor(hi[:, 2] / layer_height - 0.5), stop - 1).astype(np.int64)
+        counts = np.clip(last - first + 1, 0, None)
+        counts[hi[:, 2] <= lo[:, 2]] = 0
+
+        # Batch boundaries that keep each batch near PAIR_BATCH pairs
+        ends = np.cumsum(counts)
+        cuts = np.searchsorted(ends, np.arange(PAIR_BATCH, ends[-1], PAIR_BATCH), side="right")
+        bounds = [0, *np.unique(cuts).tolist(), len(tri)]
+        for lower, upper in zip(bounds[:-1], bounds[1:]):
+            batch = slice(lower, upper)
+            if upper > lower and counts[batch].any():
+                _slice_pairs(
+                    tri[batch], lo[batch], mid[batch], hi[batch], first[batch], counts[batch],
+                    layer_height, area, perimeter, start
+                )
+
+    return area, perimeter
+
+def _slice_pairs(
+    tri: np.ndarray,
+    lo: np.ndarray,
+    mid: np.ndarray,
+    hi: np.ndarray,
+    first: np.ndarray,
+    counts: np.ndarray,
+    layer_height: float,
+    area: np.ndarray,
+    perimeter: np.ndarray,
+    start: int
+) -> None:
+    """Cut every (triangle, layer) pair into a segment and accumulate it."""
+    total = int(counts.sum())
+    face = np.repeat(np.arange(len(tri)), counts)
+    layer = np.repeat(first, counts) + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    z = (layer + 0.5) * layer_height
+
+    lo, mid, hi = lo[face], mid[face], hi[face]
+    # One end lies on the long lo-hi edge, the other on lo-mid or mid-hi
+    p = lo + ((z - lo[:, 2]) / (hi[:, 2] - lo[:, 2]))[:, None] * (hi - lo)
+    lower = z < mid[:, 2]
+    a = np.where(lower[:, None], lo, mid)
+    b = np.where(lower[:, None], mid, hi)
+    span = b[:, 2] - a[:, 2]
+    t = np.divide(z - a[:, 2], span, out=np.zeros_like(span), where=span > 0)
+    q = a + t[:, None] * (b - a)
+
+    # Orient each segment so the solid lies to its left (counter-clockwise
+    # outer contours), using the face normal of the original winding
+    raw = tri[face]
+    normal = np.cross(raw[:, 1] - raw[:, 0], raw[:, 2] - raw[:, 0])
+    dx, dy = q[:, 0] - p[:, 0], q[:, 1] - p[:, 1]
+    direction = np.sign(dx * -normal[:, 1] + dy * normal[:, 0])
+
+    shoelace = 0.5 * (p[:, 0] * q[:, 1] - q[:, 0] * p[:, 1]) * direction
+    index = layer - start
+    area += np.bincount(index, weights=shoelace, minlength=len(area))
+    perimeter += np.bincount(index, weights=np.hypot(dx, dy), minlength=len(area))
+
+def estimate_print(layers: Dict[str, np.ndarray], layer_height: float) -> Dict[str, Any]:
+    """
+    Estimate print time, material use and support needs from sliced layers.
+
+    Returns:
+        Dictionary with FDM time and filament use, resin time and volume,
+        and the estimated support volume
+    """
+    area = np.clip(layers["area"], 0, None)
+    perimeter = layers["perimeter"]
+    heights = (np.arange(len(area)) + 0.5) * layer_height
+
+    wall_length = perimeter * WALL_COUNT
+    wall_area = np.minimum(area, wall_length * LINE_WIDTH)
+    infill_area = (area - wall_area) * INFILL_DENSITY
+    seconds = (
+        wall_length / WALL_SPEED
+        + infill_area / LINE_WIDTH / INFILL_SPEED
+        + LAYER_OVERHEAD * (area > 0)
+    )
+    extruded_mm3 = float((wall_area + infill_area).sum() * layer_height)
+
+    # Growth of a layer beyond what a 45 degree overhang from the previous
+    # perimeter can carry needs support down to the plate
+    grown = area[1:] - area[:-1] - perimeter[:-1] * layer_height
+    unsupported = np.clip(grown, 0, None)
+    support_mm3 = float((unsupported * heights[1:]).sum() * SUPPORT_DENSITY)
+    support_seconds = support_mm3 / layer_height / LINE_WIDTH / INFILL_SPEED
+
+    filament_area = np.pi * (FILAMENT_DIAMETER / 2) ** 2
+    layer_count = len(area)
+    resin_layers = np.ceil(layer_count * layer_height / RESIN_LAYER_HEIGHT)
+
+    return {
+        "layer_height_mm": layer_height,
+        "layer_count": layer_count,
+        "max_layer_area_mm2": float(area.max()),
+        "print_time_hours": round(float(seconds.sum() + support_seconds) / 3600, 3),
+        "filament_volume_cm3": round((extruded_mm3 + support_mm3) / 1000, 3),
+        "filament_length_m": round((extruded_mm3 + support_mm3) / filament_area / 1000, 3),
+        "resin_volume_cm3": round(float(area.sum() * layer_height + support_mm3) / 1000, 3),
+        "resin_print_time_hours": round(float(resin_layers) * RESIN_SECONDS_PER_LAYER / 3600, 3),
+        "support_volume_cm3": round(support_mm3 / 1000, 3),
+        "needs_support": bool(support_mm3 > 0),
+    }
+
+def slice_and_estimate(triangles: np.ndarray, layer_height: float, workers: int = 1) -> Dict[str, Any]:
+    """Slice a mesh and summarize print time, material and support needs."""
+    return estimate_print(slice_layers(triangles, layer_height, workers), layer_height)
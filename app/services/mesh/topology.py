@@ -0,0 +1,72 @@
+
+import numpy as np
+from typing import Tuple
+
+# Odd 64-bit constants for mixing the coordinate bit patterns into one key
+_HASH_MULTIPLIERS = (
+    np.uint64(0x9E3779B97F4A7C15),
+    np.uint64(0xC2B2AE3D27D4EB4F),
+    np.uint64(0x165667B19E3779F9),
+)
+
+def weld_vertices(triangles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge identical corners of a triangle soup into an indexed mesh.
+
+    Each corner's coordinate bits are hashed into the high bits of a 64-bit
+    key whose low bits hold the corner's position, so one plain sort (much
+    faster than argsort) both groups equal corners and records where they
+    came from. Hash collisions are detected by comparing every corner with
+    the first corner of its group and are resolved exactly.
+
+    Args:
+        triangles: Array of shape (n, 3, 3)
+
+    Returns:
+        Tuple of unique float32 vertices (v, 3) and uint32 faces (n, 3)
+    """
+    # Adding zero turns -0.0 into 0.0 so both bit patterns weld together
+    corners = np.ascontiguousarray(triangles.reshape(-1, 3), dtype=np.float32) + np.float32(0)
+    count = len(corners)
+    index_bits = max(1, int(count - 1).bit_length())
+
+    bits = corners.view(np.uint32).astype(np.uint64)
+    keys = bits[:, 0] * _HASH_MULTIPLIERS[0]
+    keys ^= bits[:, 1] * _HASH_MULTIPLIERS[1]
+    keys ^= bits[:, 2] * _HASH_MULTIPLIERS[2]
+    keys >>= np.uint64(index_bits)
+    keys <<= np.uint64(index_bits)
+    keys |= np.arange(count, dtype=np.uint64)
+    keys.sort()
+
+    order = (keys & np.uint64((1 << index_bits) - 1)).astype(np.int64)
+    keys >>= np.uint64(index_bits)
+    starts = np.empty(count, dtype=bool)
+    starts[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=starts[1:])
+    del keys
+
+    group = np.cumsum(starts) - 1
+    vertices = np.take(corners, order[starts], axis=0)
+    inverse = np.empty(count, dtype=np.uint32)
+    inverse[order] = group
+    del order, group
+
+    # Gathering from the (much smaller) vertex table keeps this check cheap
+    rebuilt = np.take(vertices, inverse, axis=0)
+    if not np.array_equal(rebuilt.view(np.uint32), corners.view(np.uint32)):
+        mismatch = np.any(rebuilt != corners, axis=1)
+        # Corners that only share a hash with their group get their own
+        # vertices; np.unique on this small subset keeps them exact
+        extra, extra_inverse = np.unique(corners[mismatch], axis=0, return_inverse=True)
+        inverse[mismatch] = len(vertices) + extra_inverse.reshape(-1)
+        vertices = np.concatenate([vertices, extra])
+
+    return vertices, inverse.reshape(-1, 3)
+
+def count_sorted_runs(keys: np.ndarray) -> np.ndarray:
+    """Return the length of each run of equal values in a sorted array."""
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return np.diff(np.append(starts, len(keys)))
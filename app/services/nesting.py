@@ -0,0 +1,130 @@
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.config import settings
+
+def _orient(part: Tuple[float, float], plate: Tuple[float, float]) -> Optional[Tuple[float, float]]:
+    """Pick the in-plane rotation of a footprint that fits most copies per plate."""
+    width, depth = plate
+    best = None
+    best_count = 0
+    for w, d in (part, part[::-1]):
+        if w > width or d > depth:
+            continue
+        count = int(width // w) * int(depth // d)
+        # Prefer shallower rows on ties so shelves stack tighter
+        if count > best_count or (count == best_count and best is not None and d < best[1]):
+            best, best_count = (w, d), count
+    return best
+
+def pack_plates(
+    parts: Sequence[Tuple[float, float, float, int]],
+    plate: Tuple[float, float, float],
+    spacing: float = 0.0
+) -> Optional[Dict[str, Any]]:
+    """
+    Estimate how many build plates a set of parts needs with shelf packing.
+
+    Footprints are packed as rectangles in rows ("shelves") across the plate,
+    tallest shelves first, in the spirit of next-fit decreasing height.
+    Identical copies are placed a whole row or plate at a time, so the cost
+    grows with the number of shelves rather than the number of copies.
+
+    Args:
+        parts: (width, depth, height, quantity) of each distinct part in mm
+        plate: (width, depth, height) of the build volume in mm
+        spacing: Gap kept between neighbouring parts in mm
+
+    Returns:
+        Dictionary with the plate count, copies per full plate of each part
+        and footprint utilization, or None if some part does not fit
+    """
+    # Adding the gap to both the parts and the plate puts it only between parts
+    width, depth, height = plate[0] + spacing, plate[1] + spacing, plate[2]
+
+    groups = []
+    for part_width, part_depth, part_height, quantity in parts:
+        if quantity <= 0:
+            continue
+        footprint = _orient((part_width + spacing, part_depth + spacing), (width, depth))
+        if footprint is None or part_height > height:
+            return None
+        groups.append((footprint, quantity, part_width * part_depth))
+    if not groups:
+        return {"plates": 0, "parts_per_plate": [], "utilization": 0.0}
+
+    plates = 0
+    used_depth = depth  # Forces a fresh plate for the first shelf
+    shelf_depth = 0.0
+    shelf_left = 0.0
+    for (w, d), remaining, _ in sorted(groups, key=lambda g: g[0][1], reverse=True):
+        per_row = int(width // w)
+        rows_per_plate = int(depth // d)
+        while remaining:
+            # Top up the open shelf if this part is no deeper than it
+            if d <= shelf_depth and shelf_left >= w:
+                placed = min(remaining, int(shelf_left // w))
+                remaining -= placed
+                shelf_left -= placed * w
+                continue
+
+            rows_left = int((depth - used_depth) // d)
+            if rows_left == 0:
+                # Whole plates of this part alone, then a fresh plate
+                full_plates = remaining // (per_row * rows_per_plate)
+                plates += full_plates
+                remaining -= full_plates * per_row * rows_per_plate
+                if not remaining:
+                    used_depth = depth
+                    shelf_left = 0.0
+                    break
+                plates += 1
+                used_depth = 0.0
+                rows_left = rows_per_plate
+
+            full_rows = min(remaining // per_row, rows_left)
+            used_depth += full_rows * d
+            remaining -= full_rows * per_row
+            shelf_depth, shelf_left = d, 0.0
+            if remaining and full_rows < rows_left:
+                # Open a partial shelf for the leftover copies
+                used_depth += d
+                shelf_depth, shelf_left = d, width
+
+    footprint_area = sum(area * quantity for _, quantity, area in groups)
+    return {
+        "plates": plates,
+        "parts_per_plate": [int(width // w) * int(depth // d) for (w, d), _, _ in groups],
+        "utilization": round(footprint_area / (plates * plate[0] * plate[1]), 4),
+    }
+
+def estimate_plates(
+    dimensions: Sequence[Sequence[float]],
+    quantity: int,
+    printers: Optional[List[Dict[str, Any]]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Estimate plates for `quantity` copies of each part on every printer.
+
+    Args:
+        dimensions: Bounding box dimensions (x, y, z) of each part in mm
+        quantity: Number of copies of each part
+        printers: Build volumes to consider, defaults to settings.PRINTERS
+
+    Returns:
+        The printer needing the fewest plates plus every option, or None if
+        no printer can fit all parts
+    """
+    printers = settings.PRINTERS if printers is None else printers
+    parts = [(x, y, z, quantity) for x, y, z in dimensions]
+
+    options = []
+    for printer in printers:
+        result = pack_plates(parts, (printer["x"], printer["y"], printer["z"]), settings.PLATE_SPACING_MM)
+        if result is not None:
+            options.append(dict(result, printer=printer["name"]))
+    if not options:
+        return None
+
+    best = min(options, key=lambda option: (option["plates"], -option["utilization"]))
+    return dict(best, options=options)
@@ -0,0 +1,72 @@
+
+import logging
+from typing import Optional
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.notification import AdminNotification as AdminNotificationModel
+from app.utils.email import send_email, render_admin_digest
+
+logger = logging.getLogger(__name__)
+
+def notify_admins(
+    db: Session,
+    subject: str,
+    html_content: str,
+    link: Optional[str] = None,
+    high_priority: bool = False
+) -> bool:
+    """
+    Notify the admins of an event, by email now or in the next digest.
+
+    In digest mode (ADMIN_NOTIFICATION_MODE) the notification is buffered
+    until flush_admin_digest sends all buffered ones as a single email;
+    high-priority notifications skip the buffer.
+
+    Args:
+        db: Database session; a buffered notification is saved when it is committed
+        subject: Subject of the notification
+        html_content: The email sent when the notification is not buffered
+        link: Admin page of what the notification is about, listed in the digest
+        high_priority: Send the notification now whatever the mode
+
+    Returns:
+        False if the email could not be sent
+    """
+    if settings.ADMIN_NOTIFICATION_MODE == "digest" and not high_priority:
+        db.add(AdminNotificationModel(subject=subject, link=link))
+        return True
+    return send_email(subject, settings.ADMIN_EMAIL, html_content)
+
+def flush_admin_digest(db: Session) -> int:
+    """
+    Send the buffered admin notifications as one digest email.
+
+    Notifications are only deleted once the digest is sent, so a failed
+    send is retried in the next window. Rows being flushed by another
+    process are skipped.
+
+    Returns:
+        Number of notifications sent
+    """
+    notifications = db.query(AdminNotificationModel).order_by(
+        AdminNotificationModel.created_at, AdminNotificationModel.id
+    ).with_for_update(skip_locked=True).all()
+    if not notifications:
+        db.rollback()
+        return 0
+
+    subject, html_content = render_admin_digest([
+        (notification.subject, notification.link, notification.created_at)
+        for notification in notifications
+    ])
+    # With email disabled, the digest is logged and dropped like any email
+    if not send_email(subject, settings.ADMIN_EMAIL, html_content) and settings.EMAIL_ENABLED:
+        db.rollback()
+        logger.error(f"Could not send the digest of {len(notifications)} admin notifications")
+        return 0
+
+    for notification in notifications:
+        db.delete(notification)
+    db.commit()
+    return len(notifications)
@@ -0,0 +1,273 @@
+
+import os
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+from sqlalchemy import String, func, type_coerce
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.blob import Blob as BlobModel
+from app.models.product import Product as ProductModel
+from app.models.quote import Quote as QuoteModel
+from app.models.upload_session import UploadSession as UploadSessionModel, UploadSessionStatus
+from app.services.blobs import is_blob_path, derived_source
+from app.services.mesh.canonical import CANONICAL_SUFFIX
+from app.services.upload_sessions import SESSION_SUBFOLDER
+from app.utils.file import delete_upload_file
+
+logger = logging.getLogger(__name__)
+
+# Files are checked against the database this many at a time
+GC_BATCH_SIZE = 1000
+
+def _scan(directory: str) -> Iterator[os.DirEntry]:
+    """Yield the files under a directory, reading each directory listing as a stream."""
+    stack = [directory]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+def _batches(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _quote_files(db: Session, paths: List[str]) -> Iterator[List[str]]:
+    """Yield the file lists of the quotes holding any of the paths, in one indexed && query."""
+    files = type_coerce(QuoteModel.files, ARRAY(String))
+    for (quote_files,) in db.query(QuoteModel.files).filter(files.overlap(paths)):
+        yield quote_files
+
+def _referenced_uploads(db: Session, paths: List[str]) -> Set[str]:
+    """Paths used by a quote or product, among files stored outside the blob store."""
+    wanted = set(paths)
+    referenced = set()
+    for quote_files in _quote_files(db, paths):
+        referenced.update(wanted.intersection(quote_files))
+    for column in (ProductModel.image, ProductModel.model_file, ProductModel.thumbnail):
+        referenced.update(path for (path,) in db.query(column).filter(column.in_(paths)))
+    return referenced
+
+def _classify(path: str) -> str:
+    """Tell the kind of a stored file, which decides what keeps it alive."""
+    if path.endswith(".tmp"):
+        return "tmp"
+    if path.endswith(CANONICAL_SUFFIX):
+        return "canonical"
+    if path.startswith(SESSION_SUBFOLDER + os.sep) and path.endswith(".part"):
+        return "part"
+    derived = derived_source(path)
+    if derived:
+        return "derived" if is_blob_path(derived[0] + os.sep) else "legacy_derived"
+    return "blob" if is_blob_path(path) else "upload"
+
+def _orphans(db: Session, paths: List[str]) -> List[Tuple[str, str]]:
+    """
+    Select the orphaned files among a batch of paths relative to the uploads directory.
+
+    Each kind of file is checked with one set query per batch: blobs
+    against their rows, partial files against their upload sessions,
+    thumbnails, previews and variants of blobs against the blob hashes,
+    canonical meshes against their source file, and other uploads against
+    the quotes and products using them. Temporary files past the grace
+    period are leftovers of interrupted writes. Derived files of uploads
+    stored before the blob store cannot be traced to their source and are
+    kept.
+
+    Returns:
+        (path, kind) of every orphan
+    """
+    groups = {}
+    for path in paths:
+        groups.setdefault(_classify(path), []).append(path)
+
+    orphans = [(path, "tmp") for path in groups.get("tmp", [])]
+    orphans += [
+        (path, "canonical") for path in groups.get("canonical", [])
+        if not os.path.exists(os.path.join(settings.UPLOAD_DIR, path[:-len(CANONICAL_SUFFIX)]))
+    ]
+    if "blob" in groups:
+        live = {
+            path for (path,) in db.query(BlobModel.path).filter(
+                BlobModel.path.in_(groups["blob"]), BlobModel.refcount > 0
+            )
+        }
+        orphans += [(path, "blob") for path in groups["blob"] if path not in live]
+    if "part" in groups:
+        parts = {os.path.splitext(os.path.basename(path))[0]: path for path in groups["part"]}
+        live = {
+            session_id for (session_id,) in db.query(UploadSessionModel.id).filter(
+                UploadSessionModel.id.in_(list(parts)),
+                UploadSessionModel.status == UploadSessionStatus.open
+            )
+        }
+        orphans += [(path, "part") for session_id, path in parts.items() if session_id not in live]
+    if "derived" in groups:
+        hashes = {path: derived_source(path)[1] for path in groups["derived"]}
+        live = {
+            sha256 for (sha256,) in db.query(BlobModel.sha256).filter(
+                BlobModel.sha256.in_(set(hashes.values())), BlobModel.refcount > 0
+            )
+        }
+        orphans += [(path, "derived") for path, sha256 in hashes.items() if sha256 not in live]
+    if "upload" in groups:
+        referenced = _referenced_uploads(db, groups["upload"])
+        orphans += [(path, "upload") for path in groups["upload"] if path not in referenced]
+    return orphans
+
+def _delete_orphan_blob(db: Session, path: str) -> bool:
+    """
+    Delete a blob file unless it gained a reference, holding its row lock.
+
+    A file without a row gets a placeholder row for the duration, so a
+    concurrent upload of the same content waits and then stores it anew.
+    """
+    try:
+        blob = db.query(BlobModel).filter(BlobModel.path == path).with_for_update().first()
+        if blob is None:
+            try:
+                with db.begin_nested():
+                    blob = BlobModel(path=path, sha256=os.path.splitext(os.path.basename(path))[0], size=0, refcount=0)
+                    db.add(blob)
+            except IntegrityError:
+                # Being stored right now
+                db.rollback()
+                return False
+        if blob.refcount > 0:
+            db.rollback()
+            return False
+        db.delete(blob)
+        db.flush()
+        os.remove(os.path.join(settings.UPLOAD_DIR, path))
+        db.commit()
+        return True
+    except BaseException:
+        db.rollback()
+        raise
+
+def _reconcile_refcounts(db: Session, cutoff: datetime, dry_run: bool, stats: Dict[str, int]) -> None:
+    """
+    Correct blob reference counts against the quotes, products and upload
+    sessions actually using the blobs, deleting blobs nobody uses.
+
+    Counts drift when a request dies between taking a reference and
+    saving the row holding it. Rows changed within the grace period are
+    skipped, as their requests may still be running. The table is walked
+    in path order, one locked batch at a time.
+    """
+    last_path = ""
+    while True:
+        rows = db.query(BlobModel).filter(
+            BlobModel.path > last_path,
+            func.coalesce(BlobModel.updated_at, BlobModel.created_at) < cutoff
+        ).order_by(BlobModel.path).limit(GC_BATCH_SIZE).with_for_update(skip_locked=True).all()
+        if not rows:
+            break
+        last_path = rows[-1].path
+        paths = [blob.path for blob in rows]
+
+        counts = Counter()
+        wanted = set(paths)
+        for quote_files in _quote_files(db, paths):
+            counts.update(wanted.intersection(quote_files))
+        for column in (ProductModel.image, ProductModel.model_file):
+            counts.update(path for (path,) in db.query(column).filter(column.in_(paths)))
+        counts.update(
+            path for (path,) in db.query(UploadSessionModel.file_path).filter(
+                UploadSessionModel.file_path.in_(paths),
+                UploadSessionModel.status == UploadSessionStatus.complete
+            )
+        )
+
+        for blob in rows:
+            if blob.refcount == counts[blob.path]:
+                continue
+            logger.warning(f"Blob {blob.path} has {blob.refcount} references, {counts[blob.path]} in use")
+            stats["refcounts_fixed"] += 1
+            if dry_run:
+                continue
+            blob.refcount = counts[blob.path]
+            if blob.refcount == 0:
+                full_path = os.path.join(settings.UPLOAD_DIR, blob.path)
+                stats["bytes_reclaimed"] += os.path.getsize(full_path) if os.path.exists(full_path) else 0
+                stats["deleted"] += 1
+                db.delete(blob)
+                db.flush()
+                delete_upload_file(blob.path)
+        db.commit()
+
+def collect_orphans(db: Session, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Delete the uploaded and derived files nothing uses anymore.
+
+    The upload subfolders are scanned as a stream and checked in batches
+    of GC_BATCH_SIZE, so memory stays flat however many files are stored.
+    Files modified within GC_GRACE_HOURS are never touched, which covers
+    requests still between saving a file and committing the row using it.
+
+    Args:
+        db: Database session
+        dry_run: Only count what would be deleted
+
+    Returns:
+        Counts of files scanned and deleted, bytes reclaimed and blob
+        reference counts corrected
+    """
+    stats = {"scanned": 0, "deleted": 0, "bytes_reclaimed": 0, "refcounts_fixed": 0}
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.GC_GRACE_HOURS)
+    _reconcile_refcounts(db, cutoff, dry_run, stats)
+
+    entries = (
+        entry
+        for subfolder in settings.GC_SUBFOLDERS
+        for entry in _scan(os.path.join(settings.UPLOAD_DIR, subfolder))
+    )
+    for batch in _batches(entries, GC_BATCH_SIZE):
+        stats["scanned"] += len(batch)
+        sizes = {}
+        for entry in batch:
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime < cutoff.timestamp():
+                sizes[os.path.relpath(entry.path, settings.UPLOAD_DIR)] = stat.st_size
+        if not sizes:
+            continue
+
+        for path, kind in _orphans(db, list(sizes)):
+            full_path = os.path.join(settings.UPLOAD_DIR, path)
+            try:
+                if dry_run:
+                    pass
+                elif kind == "blob":
+                    if not _delete_orphan_blob(db, path):
+                        continue
+                else:
+                    os.remove(full_path)
+                    # Drop preview and variant folders left empty
+                    if kind == "derived":
+                        try:
+                            os.rmdir(os.path.dirname(full_path))
+                        except OSError:
+                            pass
+            except FileNotFoundError:
+                continue
+            stats["deleted"] += 1
+            stats["bytes_reclaimed"] += sizes[path]
+        db.commit()
+
+    return stats
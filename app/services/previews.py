@@ -0,0 +1,79 @@
+
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.services.mesh import load_canonical, MeshFormatError
+from app.services.mesh.preview import build_lods, encode_preview
+from app.services.workers import run_in_pool_sync
+from app.utils.file import write_file_atomic
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+def preview_dir(file_path: str, sha256: str) -> str:
+    """Folder, relative to the uploads directory, holding a model's previews."""
+    return os.path.join(os.path.dirname(file_path), "previews", sha256)
+
+def _build_previews(model_path: str, output_dir: str, relative_dir: str) -> List[Dict[str, Any]]:
+    """Pool job: write every level of detail of a model and then its manifest."""
+    manifest = []
+    vertices, faces = load_canonical(model_path)
+    for lod, (vertices, faces) in enumerate(build_lods(vertices[faces], vertices=vertices, faces=faces)):
+        data = encode_preview(vertices, faces)
+        name = f"lod{lod}.bin"
+        write_file_atomic(os.path.join(output_dir, name), data)
+        manifest.append({
+            "lod": lod,
+            "path": os.path.join(relative_dir, name),
+            "vertices": len(vertices),
+            "faces": len(faces),
+            "bytes": len(data),
+        })
+
+    # The manifest goes last, so its presence means the previews are complete
+    write_file_atomic(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest).encode())
+    return manifest
+
+def generate_previews(file_path: str, sha256: str) -> Optional[List[Dict[str, Any]]]:
+    """
+    Build decimated, quantized preview meshes of an uploaded model.
+
+    Previews are stored per content hash next to the upload, so a model
+    uploaded again reuses the existing files. Meant to run off the request
+    path, e.g. in a background job; models that cannot be decimated are
+    logged rather than raised.
+
+    Args:
+        file_path: Model path relative to the uploads directory
+        sha256: The model file's SHA-256
+
+    Returns:
+        One entry per level of detail, finest first, with its path relative
+        to the uploads directory and its size, or None if the previews
+        could not be built
+
+    Raises:
+        WorkerPoolSaturated: If the worker pool is busy, to try again later
+    """
+    relative_dir = preview_dir(file_path, sha256)
+    output_dir = os.path.join(settings.UPLOAD_DIR, relative_dir)
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        return run_in_pool_sync(
+            _build_previews,
+            os.path.join(settings.UPLOAD_DIR, file_path),
+            output_dir,
+            relative_dir
+        )
+    except (MeshFormatError, OSError) as e:
+        logger.error(f"Could not build previews for {file_path}: {str(e)}")
+    return None
@@ -0,0 +1,194 @@
+
+import numpy as np
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+CURRENCY = "BRL"
+
+# Material table: density in g/cm³ and printing cost per cm³ of part volume
+MATERIALS = {
+    "pla": {"name": "PLA", "density": 1.24, "cost_per_cm3": 0.35},
+    "petg": {"name": "PETG", "density": 1.27, "cost_per_cm3": 0.45},
+    "abs": {"name": "ABS", "density": 1.04, "cost_per_cm3": 0.40},
+    "tpu": {"name": "TPU", "density": 1.21, "cost_per_cm3": 0.90},
+    "nylon": {"name": "Nylon", "density": 1.14, "cost_per_cm3": 1.20},
+    "resin": {"name": "Resina", "density": 1.10, "cost_per_cm3": 1.50},
+}
+
+# Finish table: multiplier applied to the material cost
+FINISHES = {
+    "standard": {"name": "Padrão", "multiplier": 1.0},
+    "sanded": {"name": "Lixado", "multiplier": 1.25},
+    "polished": {"name": "Polido", "multiplier": 1.4},
+    "painted": {"name": "Pintado", "multiplier": 1.6},
+}
+
+# Names the frontend may send in place of the table keys
+ALIASES = {
+    "resina": "resin",
+    "padrao": "standard",
+    "padrão": "standard",
+    "lixado": "sanded",
+    "polido": "polished",
+    "pintado": "painted",
+}
+
+# Quantity breaks: (minimum quantity, unit price multiplier), ascending
+QUANTITY_BREAKS = [(1, 1.0), (10, 0.9), (50, 0.8), (100, 0.7)]
+
+# Per-file setup fee and the lowest price charged for a single part
+SETUP_FEE = 15.0
+MINIMUM_UNIT_PRICE = 10.0
+
+# Fee per build plate for machine preparation and part removal
+PLATE_FEE = 8.0
+
+# Lead time model: fallback deposition rate for files without a sliced
+# print time, plate changeover and machine hours per day
+PRINT_RATE_CM3_PER_HOUR = 15.0
+PLATE_CHANGE_HOURS = 0.25
+PRINT_HOURS_PER_DAY = 20.0
+BASE_LEAD_TIME_DAYS = 2
+
+class PricingError(ValueError):
+    """Raised when a material, finish or quantity cannot be priced."""
+
+def _lookup(table: Dict[str, dict], name: str, kind: str) -> str:
+    key = name.strip().lower()
+    key = ALIASES.get(key, key)
+    if key not in table:
+        raise PricingError(f"Unknown {kind}: {name}. Available: {', '.join(table)}")
+    return key
+
+def quantity_multiplier(quantity: int) -> float:
+    """Return the unit price multiplier for an order quantity."""
+    if quantity < 1:
+        raise PricingError("Quantity must be at least 1")
+    multiplier = QUANTITY_BREAKS[0][1]
+    for minimum, value in QUANTITY_BREAKS:
+        if quantity >= minimum:
+            multiplier = value
+    return multiplier
+
+def validate_options(options: Sequence[Tuple[str, str]], quantity: int) -> None:
+    """Raise PricingError unless every (material, finish) option and the quantity can be priced."""
+    for material, finish in options:
+        _lookup(MATERIALS, material, "material")
+        _lookup(FINISHES, finish, "finish")
+    quantity_multiplier(quantity)
+
+def estimate_print_hours(analysis: Dict[str, Any], material: str) -> float:
+    """
+    Return the machine hours to print one copy of an analyzed file.
+
+    Uses the sliced print time for the material's process when the analysis
+    has one, and falls back to a flat deposition rate otherwise.
+    """
+    slicing = analysis.get("slicing")
+    if not slicing:
+        return analysis["volume_cm3"] / PRINT_RATE_CM3_PER_HOUR
+    if _lookup(MATERIALS, material, "material") == "resin":
+        return slicing["resin_print_time_hours"]
+    return slicing["print_time_hours"]
+
+def estimate_lead_time_days(print_hours: float, plates: int) -> int:
+    """Estimate working days for the given machine hours spread over plates."""
+    hours = print_hours + plates * PLATE_CHANGE_HOURS
+    return BASE_LEAD_TIME_DAYS + int(np.ceil(hours / PRINT_HOURS_PER_DAY))
+
+def price_matrix(
+    volumes_cm3: Sequence[float],
+    options: Sequence[Tuple[str, str]],
+    quantity: int = 1,
+    plates: Optional[Sequence[int]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Price every file against every (material, finish) option in one pass.
+
+    Args:
+        volumes_cm3: Part volume of each of the N files
+        options: The M (material, finish) combinations to price
+        quantity: Number of copies of each file
+        plates: Build plates needed for each file, adding PLATE_FEE per plate
+
+    Returns:
+        Dictionary of (N, M) arrays: weight_g, unit_price and total_price
+    """
+    materials = [MATERIALS[_lookup(MATERIALS, m, "material")] for m, _ in options]
+    finishes = [FINISHES[_lookup(FINISHES, f, "finish")] for _, f in options]
+
+    volumes = np.asarray(volumes_cm3, dtype=np.float64)[:, None]
+    density = np.array([m["density"] for m in materials])[None, :]
+    rate = np.array([m["cost_per_cm3"] * f["multiplier"] for m, f in zip(materials, finishes)])[None, :]
+
+    unit_price = np.maximum(volumes * rate, MINIMUM_UNIT_PRICE) * quantity_multiplier(quantity)
+    total_price = unit_price * quantity + SETUP_FEE
+    if plates is not None:
+        total_price += PLATE_FEE * np.asarray(plates, dtype=np.float64)[:, None]
+
+    return {
+        "weight_g": np.round(volumes * density, 2),
+        "unit_price": np.round(unit_price, 2),
+        "total_price": np.round(total_price, 2),
+    }
+
+def price_models(
+    models: Dict[str, Dict[str, Any]],
+    material: str,
+    finish: str,
+    quantity: int,
+    nesting: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Price the analyzed files of a quote for one material and finish.
+
+    Args:
+        models: Mapping of file path to its mesh analysis
+        material: Material requested by the customer
+        finish: Finish requested by the customer
+        quantity: Number of copies of each file
+        nesting: Plate estimate for the whole quote, adding plate fees and
+            a lead time
+
+    Returns:
+        Price breakdown with the total, or None if any file could not be
+        analyzed or the request cannot be priced automatically
+    """
+    if not models or any("volume_cm3" not in analysis for analysis in models.values()):
+        return None
+
+    paths = list(models)
+    try:
+        prices = price_matrix(
+            [models[path]["volume_cm3"] for path in paths],
+            [(material, finish)],
+            quantity
+        )
+    except PricingError:
+        return None
+
+    files = {
+        path: {
+            "weight_g": float(prices["weight_g"][i, 0]),
+            "unit_price": float(prices["unit_price"][i, 0]),
+            "total_price": float(prices["total_price"][i, 0]),
+            "print_time_hours": round(estimate_print_hours(models[path], material), 2),
+        }
+        for i, path in enumerate(paths)
+    }
+    total = float(prices["total_price"][:, 0].sum())
+    result = {
+        "currency": CURRENCY,
+        "quantity": quantity,
+        "files": files,
+    }
+    if nesting:
+        plates = nesting["plates"]
+        print_hours = sum(files[path]["print_time_hours"] for path in paths) * quantity
+        total += PLATE_FEE * plates
+        result["plates"] = plates
+        result["plate_fee"] = round(PLATE_FEE * plates, 2)
+        result["print_time_hours"] = round(print_hours, 2)
+        result["lead_time_days"] = estimate_lead_time_days(print_hours, plates)
+
+    result["total"] = round(total, 2)
+    return result
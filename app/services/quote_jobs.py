@@ -0,0 +1,98 @@
+
+import os
+from typing import Any, Dict
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.quote import Quote as QuoteModel
+from app.services.jobs import job_handler, enqueue
+from app.services.notifications import notify_admins
+from app.utils.email import render_quote_notification, render_advanced_quote_notification
+from app.utils.gdrive import create_quote_folder, list_folder_files, upload_files_to_drive
+
+DRIVE_FOLDER_JOB = "quote_drive_folder"
+NOTIFICATION_JOB = "quote_notification"
+
+def enqueue_quote_side_effects(db: Session, quote: QuoteModel, quote_data: Dict[str, Any], advanced: bool = False) -> None:
+    """
+    Queue the Google Drive folder and the admin notification of a new quote.
+
+    The notification waits for the folder, so it can link to it, but is
+    sent without the link if the folder cannot be created.
+
+    Args:
+        db: Database session; the jobs are saved when it is committed
+        quote: The new quote, flushed so it has an ID
+        quote_data: Details of the quote for the notification
+        advanced: Whether the quote came from the advanced form
+    """
+    drive_job = None
+    if settings.GDRIVE_ENABLED:
+        drive_job = enqueue(db, DRIVE_FOLDER_JOB, {"quote_id": quote.id})
+    enqueue(
+        db,
+        NOTIFICATION_JOB,
+        {"quote_id": quote.id, "quote": quote_data, "advanced": advanced},
+        depends_on=drive_job.id if drive_job else None
+    )
+
+@job_handler(DRIVE_FOLDER_JOB)
+def setup_drive_folder(db: Session, payload: Dict[str, Any]) -> None:
+    """
+    Job: create the Google Drive folder of a quote and upload its files into it.
+
+    The folder is saved on the quote as soon as it exists, and files
+    already in it are skipped, so a retry resumes where a failed attempt
+    stopped.
+    """
+    quote = db.get(QuoteModel, payload["quote_id"])
+    if not quote or not settings.GDRIVE_ENABLED:
+        return
+
+    folder_id = (quote.metadata or {}).get("drive_folder_id")
+    if not folder_id:
+        folder_info = create_quote_folder(quote.id)
+        if not folder_info:
+            raise RuntimeError(f"Could not create the Google Drive folder of quote {quote.id}")
+        folder_id = folder_info['id']
+        # Other jobs write the quote's metadata too
+        db.refresh(quote, with_for_update=True)
+        quote.drive_url = folder_info['url']
+        quote.metadata = {**(quote.metadata or {}), "drive_folder_id": folder_id}
+        db.commit()
+
+    uploaded = list_folder_files(folder_id)
+    if uploaded is None:
+        raise RuntimeError(f"Could not list the Google Drive folder of quote {quote.id}")
+    files = [
+        (os.path.join(settings.UPLOAD_DIR, file_path), os.path.basename(file_path))
+        for file_path in quote.files or []
+        if os.path.basename(file_path) not in uploaded
+    ]
+    failed = [name for name, link in upload_files_to_drive(files, folder_id).items() if link is None]
+    if failed:
+        raise RuntimeError(f"Could not upload {', '.join(failed)} to Google Drive")
+
+@job_handler(NOTIFICATION_JOB)
+def send_notification(db: Session, payload: Dict[str, Any]) -> None:
+    """Job: notify the admins of a new quote, by email or in their next digest."""
+    quote_data = payload["quote"]
+    quote = db.get(QuoteModel, payload["quote_id"])
+    if quote and quote.drive_url:
+        quote_data["drive_url"] = quote.drive_url
+
+    render = render_advanced_quote_notification if payload.get("advanced") else render_quote_notification
+    subject, html_content = render(quote_data)
+    high_priority = bool(
+        settings.ADMIN_PRIORITY_QUOTE_PRICE and quote and quote.estimated_price
+        and quote.estimated_price >= settings.ADMIN_PRIORITY_QUOTE_PRICE
+    )
+    sent = notify_admins(
+        db,
+        subject,
+        html_content,
+        link=f"{settings.FRONTEND_URL}/admin/quotes/{payload['quote_id']}",
+        high_priority=high_priority
+    )
+    if not sent and settings.EMAIL_ENABLED:
+        raise RuntimeError(f"Could not send the notification of quote {payload['quote_id']}")
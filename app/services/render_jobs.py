@@ -0,0 +1,110 @@
+
+from typing import Any, Dict
+from sqlalchemy.orm import Session
+
+from app.models.product import Product as ProductModel
+from app.models.quote import Quote as QuoteModel
+from app.services.jobs import job_handler, enqueue
+from app.services.thumbnails import generate_thumbnail
+from app.services.images import plan_image_variants, generate_image_variants
+from app.services.previews import generate_previews
+
+QUOTE_THUMBNAILS_JOB = "quote_thumbnails"
+PRODUCT_THUMBNAIL_JOB = "product_thumbnail"
+PRODUCT_IMAGE_VARIANTS_JOB = "product_image_variants"
+PRODUCT_PREVIEWS_JOB = "product_previews"
+
+def enqueue_quote_thumbnails(db: Session, quote: QuoteModel) -> None:
+    """Queue the thumbnails of a quote's analyzed models; saved when the caller commits."""
+    enqueue(db, QUOTE_THUMBNAILS_JOB, {"quote_id": quote.id})
+
+def enqueue_product_model_renders(db: Session, product: ProductModel) -> None:
+    """Queue the thumbnail and web viewer previews of a product's analyzed model; saved when the caller commits."""
+    analysis = product.model_analysis or {}
+    if product.model_file and "sha256" in analysis:
+        payload = {"product_id": product.id, "model_file": product.model_file, "sha256": analysis["sha256"]}
+        enqueue(db, PRODUCT_THUMBNAIL_JOB, payload)
+        enqueue(db, PRODUCT_PREVIEWS_JOB, payload)
+
+def enqueue_product_image_variants(db: Session, product: ProductModel, sha256: str) -> None:
+    """Queue the resized copies of a product's image; saved when the caller commits."""
+    if product.image:
+        enqueue(db, PRODUCT_IMAGE_VARIANTS_JOB, {"product_id": product.id, "image": product.image, "sha256": sha256})
+
+@job_handler(QUOTE_THUMBNAILS_JOB)
+def render_quote_thumbnails(db: Session, payload: Dict[str, Any]) -> None:
+    """
+    Job: render the thumbnails of a quote's models and record them on the quote.
+
+    Only rendered thumbnails are recorded, so the quote never links to a
+    missing file. A busy worker pool fails the attempt to retry it later;
+    thumbnails already rendered are kept.
+    """
+    quote = db.get(QuoteModel, payload["quote_id"])
+    if not quote:
+        return
+
+    thumbnails = {}
+    for file_path, analysis in ((quote.metadata or {}).get("models") or {}).items():
+        if "sha256" in analysis and "error" not in analysis:
+            thumbnail = generate_thumbnail(file_path, analysis["sha256"])
+            if thumbnail:
+                thumbnails[file_path] = thumbnail
+
+    # Other jobs write the quote's metadata too
+    db.refresh(quote, with_for_update=True)
+    metadata = quote.metadata or {}
+    quote.metadata = {**metadata, "thumbnails": {**(metadata.get("thumbnails") or {}), **thumbnails}}
+
+@job_handler(PRODUCT_THUMBNAIL_JOB)
+def render_product_thumbnail(db: Session, payload: Dict[str, Any]) -> None:
+    """
+    Job: render the thumbnail of a product's model and record it on the product.
+
+    Skipped when the product was deleted or its model replaced since; a
+    busy worker pool fails the attempt to retry it later.
+    """
+    product = db.get(ProductModel, payload["product_id"])
+    if not product or product.model_file != payload["model_file"]:
+        return
+
+    thumbnail = generate_thumbnail(payload["model_file"], payload["sha256"])
+    db.refresh(product, with_for_update=True)
+    if thumbnail and product.model_file == payload["model_file"]:
+        product.thumbnail = thumbnail
+
+@job_handler(PRODUCT_PREVIEWS_JOB)
+def build_product_previews(db: Session, payload: Dict[str, Any]) -> None:
+    """
+    Job: build the web viewer's levels of detail of a product's model and record them on the product.
+
+    Skipped when the product was deleted or its model replaced since; a
+    busy worker pool fails the attempt to retry it later.
+    """
+    product = db.get(ProductModel, payload["product_id"])
+    if not product or product.model_file != payload["model_file"]:
+        return
+
+    previews = generate_previews(payload["model_file"], payload["sha256"])
+    db.refresh(product, with_for_update=True)
+    if previews and product.model_file == payload["model_file"]:
+        product.model_previews = previews
+
+@job_handler(PRODUCT_IMAGE_VARIANTS_JOB)
+def build_product_image_variants(db: Session, payload: Dict[str, Any]) -> None:
+    """
+    Job: resize a product's image and record its variants on the product.
+
+    Skipped when the product was deleted or its image replaced since; a
+    busy worker pool fails the attempt to retry it later.
+    """
+    product = db.get(ProductModel, payload["product_id"])
+    if not product or product.image != payload["image"]:
+        return
+
+    variants = plan_image_variants(payload["image"], payload["sha256"])
+    if not variants or not generate_image_variants(payload["image"], payload["sha256"], variants):
+        return
+    db.refresh(product, with_for_update=True)
+    if product.image == payload["image"]:
+        product.image_variants = variants
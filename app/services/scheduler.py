@@ -0,0 +1,133 @@
+
+import logging
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.config import settings
+from app.database import SessionLocal
+from app.services.upload_sessions import expire_sessions
+from app.services.orphans import collect_orphans
+from app.services.jobs import requeue_stale_jobs, purge_finished_jobs
+from app.services.notifications import flush_admin_digest
+from app.services.similarity import sync_similarity_index
+
+logger = logging.getLogger(__name__)
+
+# Periodic maintenance jobs, run in a background thread of each application process
+scheduler = BackgroundScheduler(timezone="UTC")
+
+def expire_upload_sessions() -> None:
+    """Job: delete idle upload sessions and what they hold."""
+    db = SessionLocal()
+    try:
+        count = expire_sessions(db)
+        if count:
+            logger.info(f"Expired {count} upload sessions")
+    except Exception as e:
+        logger.error(f"Could not expire upload sessions: {str(e)}")
+    finally:
+        db.close()
+
+def collect_upload_garbage() -> None:
+    """Job: delete orphaned uploads and report the space reclaimed."""
+    db = SessionLocal()
+    try:
+        stats = collect_orphans(db)
+        logger.info(
+            f"Scanned {stats['scanned']} uploads, deleted {stats['deleted']} orphans "
+            f"({stats['bytes_reclaimed'] / (1024 * 1024):.1f} MB reclaimed), "
+            f"fixed {stats['refcounts_fixed']} reference counts"
+        )
+    except Exception as e:
+        logger.error(f"Could not collect orphaned uploads: {str(e)}")
+    finally:
+        db.close()
+
+def maintain_job_queue() -> None:
+    """Job: retry the background jobs of lost workers and delete old finished ones."""
+    db = SessionLocal()
+    try:
+        requeued = requeue_stale_jobs(db)
+        if requeued:
+            logger.warning(f"Requeued {requeued} background jobs of lost workers")
+        purge_finished_jobs(db)
+    except Exception as e:
+        logger.error(f"Could not maintain the job queue: {str(e)}")
+    finally:
+        db.close()
+
+def send_admin_digest() -> None:
+    """Job: email the admin notifications buffered in digest mode."""
+    db = SessionLocal()
+    try:
+        count = flush_admin_digest(db)
+        if count:
+            logger.info(f"Sent a digest of {count} admin notifications")
+    except Exception as e:
+        logger.error(f"Could not send the admin digest: {str(e)}")
+    finally:
+        db.close()
+
+def sync_similarity() -> None:
+    """Job: pick up the quotes and products changed by other processes in the similarity index."""
+    db = SessionLocal()
+    try:
+        sync_similarity_index(db)
+    except Exception as e:
+        logger.error(f"Could not sync the similarity index: {str(e)}")
+    finally:
+        db.close()
+
+def start_scheduler() -> None:
+    """Register the maintenance jobs and start running them."""
+    scheduler.add_job(
+        expire_upload_sessions,
+        "interval",
+        minutes=settings.UPLOAD_SESSION_SWEEP_MINUTES,
+        id="expire_upload_sessions",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1
+    )
+    scheduler.add_job(
+        collect_upload_garbage,
+        "interval",
+        hours=settings.GC_INTERVAL_HOURS,
+        id="collect_upload_garbage",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1
+    )
+    scheduler.add_job(
+        maintain_job_queue,
+        "interval",
+        minutes=settings.JOB_LEASE_MINUTES,
+        id="maintain_job_queue",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1
+    )
+    # Also runs in immediate mode, to send what was buffered before a switch
+    scheduler.add_job(
+        send_admin_digest,
+        "interval",
+        minutes=settings.ADMIN_DIGEST_MINUTES,
+        id="send_admin_digest",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1
+    )
+    scheduler.add_job(
+        sync_similarity,
+        "interval",
+        minutes=settings.SIMILARITY_SYNC_MINUTES,
+        id="sync_similarity",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1
+    )
+    scheduler.start()
+
+def shutdown_scheduler() -> None:
+    """Stop the scheduler without waiting for running jobs."""
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
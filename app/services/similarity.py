@@ -0,0 +1,112 @@
+
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from typing import List, Tuple
+
+from app.config import settings
+from app.models.product import Product as ProductModel
+from app.models.quote import Quote as QuoteModel
+from app.services.mesh.descriptor import DESCRIPTOR_SIZE
+from app.utils.vector_index import VectorIndex, Entry
+
+logger = logging.getLogger(__name__)
+
+# Shape descriptors of quote files and product models, loaded at startup
+# and kept in sync with the database by each process
+similarity_index = VectorIndex(
+    os.path.join(settings.CACHE_DIR, "similarity", "index.npz"),
+    DESCRIPTOR_SIZE,
+    kinds=("quote", "product")
+)
+
+# Changes are looked for this far before the last sync
+SYNC_OVERLAP_SECONDS = 600
+
+def _quote_entries(quote: QuoteModel) -> List[Tuple[Entry, List[float]]]:
+    models = (quote.metadata or {}).get("models") or {}
+    return [
+        (("quote", quote.id, file_path), analysis["descriptor"])
+        for file_path, analysis in models.items()
+        if "descriptor" in analysis
+    ]
+
+def _product_entries(product: ProductModel) -> List[Tuple[Entry, List[float]]]:
+    analysis = product.model_analysis or {}
+    if not product.model_file or "descriptor" not in analysis:
+        return []
+    return [(("product", product.id, product.model_file), analysis["descriptor"])]
+
+def index_quote(quote: QuoteModel) -> None:
+    """Add or refresh a quote's files in this process's similarity index."""
+    similarity_index.remove("quote", quote.id)
+    similarity_index.add(_quote_entries(quote))
+
+def index_product(product: ProductModel) -> None:
+    """Add or refresh a product's model in this process's similarity index."""
+    similarity_index.remove("product", product.id)
+    similarity_index.add(_product_entries(product))
+
+def unindex(kind: str, item_id: int) -> None:
+    """Remove a quote's or product's entries from this process's similarity index."""
+    similarity_index.remove(kind, item_id)
+
+def sync_similarity_index(db: Session) -> int:
+    """
+    Bring the similarity index up to date with the database and save it.
+
+    Changes made through other processes reach this one here: quotes and
+    products created or updated since the last sync are indexed again,
+    and ones deleted are removed. Without a previous sync everything is
+    indexed. The index is saved when any were, at most once per sync;
+    every process converges on the database, so whichever saves last
+    writes a valid file.
+
+    Returns:
+        Number of quotes and products indexed or removed
+    """
+    synced_at = time.time()
+    since = None
+    if similarity_index.synced_at is not None:
+        # Rows committed late keep the time their transaction started
+        since = datetime.fromtimestamp(similarity_index.synced_at - SYNC_OVERLAP_SECONDS, timezone.utc)
+
+    changed = 0
+    for model, kind, entries in (
+        (QuoteModel, "quote", _quote_entries),
+        (ProductModel, "product", _product_entries),
+    ):
+        query = db.query(model)
+        if since is not None:
+            query = query.filter(or_(model.created_at >= since, model.updated_at >= since))
+        for item in query.yield_per(500):
+            similarity_index.remove(kind, item.id)
+            similarity_index.add(entries(item))
+            changed += 1
+
+        existing = {item_id for item_id, in db.query(model.id)}
+        for item_id in similarity_index.owners(kind) - existing:
+            similarity_index.remove(kind, item_id)
+            changed += 1
+
+    similarity_index.synced_at = synced_at
+    if changed:
+        similarity_index.save()
+    return changed
+
+def load_similarity_index(db: Session) -> None:
+    """
+    Load the similarity index from disk at startup.
+
+    The saved index is brought up to date with the changes made since it
+    was written; when no usable file exists it is rebuilt from the
+    descriptors already stored with quotes and products, without
+    reanalyzing files.
+    """
+    if similarity_index.load():
+        logger.info(f"Loaded similarity index with {len(similarity_index)} models")
+    changed = sync_similarity_index(db)
+    logger.info(f"Synced {changed} quotes and products into the similarity index of {len(similarity_index)} models")
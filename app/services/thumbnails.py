@@ -0,0 +1,69 @@
+
+import os
+import logging
+from typing import Optional
+
+from app.config import settings
+from app.services.mesh import load_canonical, MeshFormatError
+from app.services.mesh.render import render_mesh, encode_png
+from app.services.workers import run_in_pool_sync
+from app.utils.file import write_file_atomic
+
+logger = logging.getLogger(__name__)
+
+def thumbnail_path(file_path: str, sha256: str) -> str:
+    """
+    Return where the thumbnail of an upload is stored.
+
+    Thumbnails live in a "thumbnails" folder next to the upload and are
+    named by the model's content hash, so identical models share one.
+
+    Args:
+        file_path: Model path relative to the uploads directory
+        sha256: The model file's SHA-256
+
+    Returns:
+        Thumbnail path relative to the uploads directory
+    """
+    return os.path.join(os.path.dirname(file_path), "thumbnails", f"{sha256}.png")
+
+def _render_thumbnail(model_path: str, output_path: str, size: int) -> None:
+    """Pool job: render a model file to a PNG, writing it atomically."""
+    vertices, faces = load_canonical(model_path)
+    write_file_atomic(output_path, encode_png(render_mesh(vertices[faces], size)))
+
+def generate_thumbnail(file_path: str, sha256: str) -> Optional[str]:
+    """
+    Render the thumbnail of an uploaded model unless it already exists.
+
+    Meant to run off the request path, e.g. in a background job; models
+    that cannot be rendered are logged rather than raised.
+
+    Args:
+        file_path: Model path relative to the uploads directory
+        sha256: The model file's SHA-256
+
+    Returns:
+        Thumbnail path relative to the uploads directory, or None if it
+        could not be rendered
+
+    Raises:
+        WorkerPoolSaturated: If the worker pool is busy, to try again later
+    """
+    output = thumbnail_path(file_path, sha256)
+    output_path = os.path.join(settings.UPLOAD_DIR, output)
+    if os.path.exists(output_path):
+        return output
+
+    try:
+        run_in_pool_sync(
+            _render_thumbnail,
+            os.path.join(settings.UPLOAD_DIR, file_path),
+            output_path,
+            settings.THUMBNAIL_SIZE
+        )
+    except (MeshFormatError, OSError) as e:
+        logger.error(f"Could not render thumbnail for {file_path}: {str(e)}")
+        return None
+
+    return output
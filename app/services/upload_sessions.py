@@ -0,0 +1,308 @@
+
+import os
+import hashlib
+import logging
+import secrets
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from starlette.requests import ClientDisconnect
+from typing import AsyncIterator, List, Tuple
+
+from app.config import settings
+from app.models.upload_session import UploadSession as UploadSessionModel, UploadSessionStatus
+from app.services.blobs import attach_file, blob_path, release_file, store_file
+from app.utils.file import check_upload_name, UPLOAD_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Uploads subfolder holding the partial files of open sessions
+SESSION_SUBFOLDER = "sessions"
+
+def part_path(session_id: str) -> str:
+    """Path on disk of the partial file an open session writes to."""
+    return os.path.join(settings.UPLOAD_DIR, SESSION_SUBFOLDER, f"{session_id}.part")
+
+def _expiry() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+
+def create_session(db: Session, user_id: int, filename: str, size: int) -> UploadSessionModel:
+    """
+    Open an upload session for a file of known size.
+
+    Args:
+        db: Database session
+        user_id: Owner of the session
+        filename: Name of the file, whose extension must be allowed
+        size: Total size of the file in bytes
+
+    Returns:
+        The new session, with an empty partial file on disk
+    """
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="File size must be positive")
+    check_upload_name(filename, size, settings.ALLOWED_EXTENSIONS)
+
+    session = UploadSessionModel(
+        id=secrets.token_hex(16),
+        user_id=user_id,
+        filename=os.path.basename(filename),
+        size=size,
+        received=0,
+        status=UploadSessionStatus.open,
+        expires_at=_expiry()
+    )
+    path = part_path(session.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "xb").close()
+
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+    return session
+
+def get_session(db: Session, session_id: str, user_id: int) -> UploadSessionModel:
+    """
+    Return an upload session of a user.
+
+    Raises:
+        HTTPException: 404 if the session does not exist, expired or
+            belongs to someone else
+    """
+    session = db.query(UploadSessionModel).filter(UploadSessionModel.id == session_id).first()
+    if session is None or session.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+async def write_chunk(
+    db: Session,
+    session: UploadSessionModel,
+    offset: int,
+    chunks: AsyncIterator[bytes]
+) -> UploadSessionModel:
+    """
+    Write a chunk of an open session's file at a given offset.
+
+    The body is streamed straight into the partial file in the thread
+    pool. A chunk may start anywhere up to the bytes received so far, so a
+    client unsure whether its last chunk arrived can simply send it again.
+    If the client disconnects midway, the bytes that did arrive are kept
+    and the session's progress tells it where to resume. Every chunk
+    pushes back the session's expiry.
+
+    Args:
+        db: Database session
+        session: The upload session
+        offset: Position of the chunk in the file
+        chunks: Body of the request
+
+    Returns:
+        The session with its progress updated
+
+    Raises:
+        HTTPException: 409 if the session is finalized or the offset is
+            past the bytes received, 400 if the chunk extends past the
+            declared size
+    """
+    if session.status != UploadSessionStatus.open:
+        raise HTTPException(status_code=409, detail="Upload session is already finalized")
+    if offset > session.received:
+        raise HTTPException(status_code=409, detail=f"Expected a chunk at offset {session.received} or before")
+
+    size = session.size
+    written = 0
+    buffer = bytearray()
+    error = None
+    f = await run_in_threadpool(open, part_path(session.id), "r+b")
+    try:
+        await run_in_threadpool(f.seek, offset)
+        try:
+            async for chunk in chunks:
+                if offset + written + len(buffer) + len(chunk) > size:
+                    raise HTTPException(status_code=400, detail=f"Chunk extends past the file size of {size} bytes")
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    await run_in_threadpool(f.write, buffer)
+                    written += len(buffer)
+                    buffer = bytearray()
+        except ClientDisconnect:
+            logger.info(f"Upload session {session.id} interrupted at {offset + written + len(buffer)} bytes")
+        except HTTPException as e:
+            error = e
+        if buffer:
+            await run_in_threadpool(f.write, buffer)
+            written += len(buffer)
+    finally:
+        await run_in_threadpool(f.close)
+
+    # Only ever advance, as retried chunks may overlap bytes already counted
+    end = offset + written
+    updated = db.query(UploadSessionModel).filter(
+        UploadSessionModel.id == session.id,
+        UploadSessionModel.status == UploadSessionStatus.open
+    ).update({
+        UploadSessionModel.received: case(
+            (UploadSessionModel.received < end, end), else_=UploadSessionModel.received
+        ),
+        UploadSessionModel.expires_at: _expiry()
+    }, synchronize_session=False)
+    db.commit()
+    if not updated:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if error is not None:
+        raise error
+
+    db.refresh(session)
+    return session
+
+def _hash_file(full_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def finalize_session(db: Session, session_id: str, user_id: int) -> UploadSessionModel:
+    """
+    Move a fully received file into the upload store (blocking).
+
+    The session then holds a reference on the stored file until a quote
+    claims it or it expires. Finalizing a finalized session returns it
+    unchanged, so the call can be retried safely.
+
+    Raises:
+        HTTPException: 404 if the session is not found, 409 if bytes are
+            still missing
+    """
+    session = db.query(UploadSessionModel).filter(UploadSessionModel.id == session_id).with_for_update().first()
+    if session is None or session.user_id != user_id:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session.status == UploadSessionStatus.complete:
+        db.commit()
+        return session
+    if session.received < session.size:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: received {session.received} of {session.size} bytes"
+        )
+
+    full_path = part_path(session.id)
+    os.truncate(full_path, session.size)
+    sha256 = _hash_file(full_path)
+    ext = os.path.splitext(session.filename)[1]
+    session.sha256 = sha256
+    session.file_path = blob_path(sha256, ext)
+    session.status = UploadSessionStatus.complete
+    session.expires_at = _expiry()
+    # Commits the session together with its reference on the blob
+    store_file(db, full_path, sha256, ext)
+
+    db.refresh(session)
+    return session
+
+def _finalized_sessions(db: Session, session_ids: List[str], user_id: int) -> List[UploadSessionModel]:
+    """Lock a user's finalized sessions, in order; raises 404 or 409 for any other."""
+    sessions = {
+        session.id: session
+        for session in db.query(UploadSessionModel).filter(
+            UploadSessionModel.id.in_(session_ids)
+        ).with_for_update().all()
+    }
+    for session_id in session_ids:
+        session = sessions.get(session_id)
+        if session is None or session.user_id != user_id:
+            db.rollback()
+            raise HTTPException(status_code=404, detail=f"Upload session {session_id} not found")
+        if session.status != UploadSessionStatus.complete:
+            db.rollback()
+            raise HTTPException(status_code=409, detail=f"Upload session {session_id} is not finalized")
+    return [sessions[session_id] for session_id in session_ids]
+
+def claim_sessions(db: Session, session_ids: List[str], user_id: int) -> List[Tuple[str, str]]:
+    """
+    Take a reference on the files of finalized sessions, for a quote.
+
+    The sessions are left as they are, so a quote that fails afterwards
+    (e.g. with a 503 to be retried) releases its references and the
+    client can claim the same sessions again. Once the quote is saved,
+    consume_sessions deletes them in the same transaction. Either all
+    sessions are claimed or none.
+
+    Returns:
+        (path, sha256) of every distinct session's file, in order; each
+        holds a reference to be released with release_file when no longer used
+
+    Raises:
+        HTTPException: 404 if a session is not found, 409 if one is not
+            finalized
+    """
+    session_ids = list(dict.fromkeys(session_ids))
+    if not session_ids:
+        return []
+
+    claimed = []
+    for session in _finalized_sessions(db, session_ids, user_id):
+        attach_file(db, session.file_path)
+        claimed.append((session.file_path, session.sha256))
+    db.commit()
+    return claimed
+
+def consume_sessions(db: Session, session_ids: List[str], user_id: int) -> None:
+    """
+    Delete claimed sessions once the quote holding their files is saved.
+
+    The sessions' own references are released; the caller commits, with
+    the quote. Sessions already gone, e.g. expired since being claimed,
+    are skipped, as they released their reference then.
+    """
+    session_ids = list(dict.fromkeys(session_ids))
+    if not session_ids:
+        return
+    for session in db.query(UploadSessionModel).filter(
+        UploadSessionModel.id.in_(session_ids),
+        UploadSessionModel.user_id == user_id,
+        UploadSessionModel.status == UploadSessionStatus.complete
+    ).with_for_update():
+        _discard(db, session)
+
+def _discard(db: Session, session: UploadSessionModel) -> None:
+    """Delete a session with its partial file or its reference on the stored file; the caller commits."""
+    if session.status == UploadSessionStatus.complete:
+        release_file(db, session.file_path)
+    else:
+        try:
+            os.remove(part_path(session.id))
+        except FileNotFoundError:
+            pass
+    db.delete(session)
+
+def delete_session(db: Session, session_id: str, user_id: int) -> None:
+    """Abandon an upload session."""
+    session = db.query(UploadSessionModel).filter(UploadSessionModel.id == session_id).with_for_update().first()
+    if session is None or session.user_id != user_id:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    _discard(db, session)
+    db.commit()
+
+def expire_sessions(db: Session) -> int:
+    """
+    Delete the sessions idle past their expiry.
+
+    Sessions locked by a concurrent sweep are skipped, so several
+    application processes can run it at once.
+
+    Returns:
+        Number of sessions deleted
+    """
+    expired = db.query(UploadSessionModel).filter(
+        UploadSessionModel.expires_at < datetime.now(timezone.utc)
+    ).with_for_update(skip_locked=True).all()
+    for session in expired:
+        _discard(db, session)
+    db.commit()
+    return len(expired)
@@ -0,0 +1,137 @@
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Iterable, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class WorkerPoolSaturated(Exception):
+    """Raised when the worker pool has no free slot for another job, or lost the worker running it."""
+
+# Jobs running plus jobs waiting; callers are turned away beyond this
+_slots = threading.BoundedSemaphore(settings.ANALYSIS_POOL_SIZE + settings.ANALYSIS_QUEUE_DEPTH)
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ProcessPoolExecutor:
+    """Return the shared process pool, starting it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Spawned workers don't inherit the server's threads and locks
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.ANALYSIS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _replace_broken(executor: ProcessPoolExecutor) -> None:
+    """Drop a pool whose worker died, so the next job starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        if _executor is not executor:
+            # Already replaced after another of its jobs failed
+            return
+        _executor = None
+    logger.error("A worker process died; restarting the worker pool")
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _check_broken(executor: ProcessPoolExecutor, future: Future) -> None:
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _replace_broken(executor)
+
+def submit(fn: Callable, *args: Any) -> Future:
+    """
+    Submit a CPU-bound job to the process pool.
+
+    Args:
+        fn: A picklable, module-level function
+        args: Picklable arguments for the function
+
+    Returns:
+        Future for the job's result
+
+    Raises:
+        WorkerPoolSaturated: If the pool and its queue are full
+    """
+    if not _slots.acquire(blocking=False):
+        raise WorkerPoolSaturated("Worker pool is busy, try again shortly")
+
+    try:
+        executor = get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            _replace_broken(executor)
+            executor = get_executor()
+            future = executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda done: _check_broken(executor, done))
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+async def run_in_pool(fn: Callable, *args: Any) -> Any:
+    """
+    Run a job in the process pool without blocking the event loop.
+
+    Raises:
+        WorkerPoolSaturated: If the pool is full, or its worker died
+            running the job; the pool is restarted for later jobs
+    """
+    try:
+        return await asyncio.wrap_future(submit(fn, *args))
+    except BrokenProcessPool as e:
+        raise WorkerPoolSaturated("A worker process died, try again shortly") from e
+
+def run_in_pool_sync(fn: Callable, *args: Any) -> Any:
+    """Run a job in the process pool and wait for it (for sync routes); see run_in_pool."""
+    try:
+        return submit(fn, *args).result()
+    except BrokenProcessPool as e:
+        raise WorkerPoolSaturated("A worker process died, try again shortly") from e
+
+async def gather_in_pool(jobs: Iterable[Awaitable]) -> List[Any]:
+    """
+    Await a request's pool jobs, running at most ANALYSIS_POOL_SIZE at once.
+
+    A request never holds more of the pool's slots than it has workers,
+    so however many files it has, it only gets WorkerPoolSaturated when
+    other requests fill the queue. If a job fails, the ones not started
+    yet are cancelled.
+
+    Args:
+        jobs: Coroutines submitting to the pool, e.g. via run_in_pool
+
+    Returns:
+        The jobs' results, in order
+    """
+    limit = asyncio.Semaphore(settings.ANALYSIS_POOL_SIZE)
+
+    async def run(job: Awaitable) -> Any:
+        async with limit:
+            return await job
+
+    tasks = [asyncio.ensure_future(run(job)) for job in jobs]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+def shutdown_pool() -> None:
+    """Stop the worker processes."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+            logger.info("Worker pool shut down")
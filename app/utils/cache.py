@@ -0,0 +1,57 @@
+
+import os
+import json
+import logging
+import tempfile
+from typing import Any, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ResultCache:
+    """
+    Persistent JSON cache for results derived from file contents.
+
+    Entries live in CACHE_DIR/<namespace>/<key[:2]>/<key>.json and are keyed
+    by a content hash, so identical files share one entry. Bumping the
+    version invalidates every entry written by an older version.
+    """
+
+    def __init__(self, namespace: str, version: int):
+        self.namespace = namespace
+        self.version = version
+
+    def _path(self, key: str) -> str:
+        return os.path.join(settings.CACHE_DIR, self.namespace, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached result for a key, or None on a miss."""
+        try:
+            with open(self._path(key), "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {self.namespace} cache entry {key}: {str(e)}")
+            return None
+
+        if entry.get("version") != self.version:
+            return None
+        return entry.get("result")
+
+    def set(self, key: str, result: Any) -> None:
+        """Store a JSON-serializable result for a key."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": self.version, "result": result}, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -1,55 +1,78 @@
 
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from typing import List, Tuple
+from fastapi.concurrency import run_in_threadpool
 from app.config import settings
+from app.utils.mail_transport import get_mail_transport
 import logging
 
 logger = logging.getLogger(__name__)
 
-def send_email(subject, recipient, html_content):
+def build_email(subject, recipient, html_content):
     """
-    Send an email notification
+    Build an HTML email from the configured sender
+    """
+    # Create message container
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = settings.EMAIL_SENDER
+    msg['To'] = recipient
+    
+    # Create the HTML part of the message
+    html_part = MIMEText(html_content, 'html')
+    msg.attach(html_part)
+    return msg
+
+def send_emails(emails: List[Tuple[str, str, str]]) -> List[bool]:
+    """
+    Send a batch of emails over one pooled SMTP connection
+    
+    Args:
+        emails: (subject, recipient, HTML content) of every email
+        
+    Returns:
+        Whether each email was sent, in order
     """
     if not settings.EMAIL_ENABLED:
-        logger.warning(f"Email sending is disabled. Would have sent to {recipient}: {subject}")
-        return False
+        for subject, recipient, _ in emails:
+            logger.warning(f"Email sending is disabled. Would have sent to {recipient}: {subject}")
+        return [False] * len(emails)
     
     try:
-        # Create message container
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = settings.EMAIL_SENDER
-        msg['To'] = recipient
-        
-        # Create the HTML part of the message
-        html_part = MIMEText(html_content, 'html')
-        msg.attach(html_part)
-        
-        # Connect to SMTP server
-        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT)
-        if settings.SMTP_USE_TLS:
-            server.starttls()
-        
-        # Login if credentials are provided
-        if settings.SMTP_USERNAME and settings.SMTP_PASSWORD:
-            server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-        
-        # Send email
-        server.sendmail(settings.EMAIL_SENDER, recipient, msg.as_string())
-        server.quit()
-        
-        logger.info(f"Email sent to {recipient}: {subject}")
-        return True
+        results = get_mail_transport().send_messages([build_email(*email) for email in emails])
     except Exception as e:
-        logger.error(f"Failed to send email to {recipient}: {str(e)}")
-        return False
+        logger.error(f"Failed to send {len(emails)} emails: {str(e)}")
+        return [False] * len(emails)
+    
+    for (subject, recipient, _), sent in zip(emails, results):
+        if sent:
+            logger.info(f"Email sent to {recipient}: {subject}")
+    return results
+
+def send_email(subject, recipient, html_content):
+    """
+    Send an email notification
+    
+    Connections to the SMTP server are pooled, so this only costs the
+    message's own round trips; it still blocks, so async callers should
+    use send_email_async.
+    """
+    return send_emails([(subject, recipient, html_content)])[0]
 
-def send_quote_notification(quote_data):
+async def send_email_async(subject, recipient, html_content):
+    """
+    Send an email notification without blocking the event loop
     """
-    Send an email notification for a new quote request
+    return await run_in_threadpool(send_email, subject, recipient, html_content)
+
+def render_quote_notification(quote_data):
+    """
+    Render the admin notification for a new quote request
+    
+    Returns:
+        The subject and HTML content
     """
-    recipient = "cscheidegger@gmail.com"  # Fixed recipient as requested
     subject = f"Novo Orçamento Solicitado - #{quote_data['id']}"
     
     # Create HTML content for the email
@@ -92,13 +115,15 @@ def send_quote_notification(quote_data):
     </html>
     """
     
-    return send_email(subject, recipient, html_content)
+    return subject, html_content
 
-def send_advanced_quote_notification(quote_data):
+def render_advanced_quote_notification(quote_data):
     """
-    Send an email notification for a new advanced quote request with detailed information
+    Render the admin notification for a new advanced quote request with detailed information
+    
+    Returns:
+        The subject and HTML content
     """
-    recipient = "cscheidegger@gmail.com"  # Fixed recipient as requested
     subject = f"Novo Orçamento Detalhado - #{quote_data['id']}"
     
     # Create HTML content for the email
@@ -203,4 +228,58 @@ def send_advanced_quote_notification(quote_data):
     </html>
     """
     
-    return send_email(subject, recipient, html_content)
+    return subject, html_content
+
+def render_admin_digest(notifications):
+    """
+    Render one email summing up buffered admin notifications
+    
+    Args:
+        notifications: (subject, link, created_at) of every notification, oldest first
+        
+    Returns:
+        The subject and HTML content
+    """
+    subject = f"Resumo de Notificações - {len(notifications)} novas"
+    items = "".join(
+        f'<li><a href="{link}">{item_subject}</a> <span class="date">{created_at:%Y-%m-%d %H:%M}</span></li>'
+        if link else
+        f'<li>{item_subject} <span class="date">{created_at:%Y-%m-%d %H:%M}</span></li>'
+        for item_subject, link, created_at in notifications
+    )
+    
+    html_content = f"""
+    <html>
+    <head>
+        <style>
+            body {{ font-family: Arial, sans-serif; line-height: 1.6; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background-color: #4f46e5; color: white; padding: 15px; text-align: center; }}
+            .content {{ padding: 20px; background-color: #f9fafb; }}
+            .date {{ color: #6b7280; font-size: 12px; }}
+            .footer {{ text-align: center; margin-top: 20px; font-size: 12px; color: #6b7280; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h2>Resumo de Notificações</h2>
+            </div>
+            <div class="content">
+                <p>Olá,</p>
+                <p>Desde o último resumo, aconteceu o seguinte:</p>
+                <ul>
+                    {items}
+                </ul>
+                <p>Você pode visualizar e gerenciar os orçamentos no painel administrativo.</p>
+            </div>
+            <div class="footer">
+                <p>Este é um email automático, por favor não responda.</p>
+                <p>&copy; Proteus.lab</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    
+    return subject, html_content
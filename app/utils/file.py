@@ -1,8 +1,22 @@
 
 import os
 import uuid
+import shutil
+import hashlib
+import tempfile
+import zstandard
+from typing import BinaryIO, Optional, Tuple
 from fastapi import UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from app.config import settings
+from app.services.mesh.canonical import canonical_path
+from app.services.mesh.loader import ZSTD_MAGIC
+
+# Compressed files are only kept when they save at least this fraction
+MIN_COMPRESSION_SAVING = 0.05
+
+# Uploads are copied to disk in chunks of this many bytes
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 def validate_file_extension(filename: str, allowed_extensions: list) -> bool:
     """Check if the file has an allowed extension."""
@@ -11,19 +25,189 @@ def validate_file_extension(filename: str, allowed_extensions: list) -> bool:
         return False
     return True
 
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 hex digest of a file without loading it whole.
+
+    Compressed files hash as their original content, so cached results and
+    content-named derived files survive compression.
+    """
+    digest = hashlib.sha256()
+    with open_stored_file(file_path) as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def write_file_atomic(full_path: str, data: bytes) -> None:
+    """Write a file through a temporary sibling so readers never see it half-written."""
+    directory = os.path.dirname(full_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, full_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def is_compressed(full_path: str) -> bool:
+    """Check whether a stored file is zstd-compressed."""
+    with open(full_path, "rb") as f:
+        return f.read(len(ZSTD_MAGIC)) == ZSTD_MAGIC
+
+def open_stored_file(full_path: str) -> BinaryIO:
+    """
+    Open a stored file for reading, decompressing it on the fly if needed.
+
+    Compressed files are decompressed as a stream, so reading never inflates
+    a whole file in memory. The returned object is not seekable backwards.
+
+    Args:
+        full_path: Path of the file on disk
+
+    Returns:
+        A binary file-like object yielding the original content
+    """
+    f = open(full_path, "rb")
+    if f.read(len(ZSTD_MAGIC)) != ZSTD_MAGIC:
+        f.seek(0)
+        return f
+    f.seek(0)
+    return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+
+def open_upload(file_path: str) -> BinaryIO:
+    """Open an uploaded file, relative to the uploads directory, for reading."""
+    return open_stored_file(os.path.join(settings.UPLOAD_DIR, file_path))
+
+def should_compress(subfolder: str) -> bool:
+    """Check whether files saved to an uploads subfolder are stored compressed."""
+    return settings.UPLOAD_COMPRESSION and subfolder in settings.COMPRESSED_SUBFOLDERS
+
+def compress_file(full_path: str, level: int) -> bool:
+    """
+    Compress a stored file in place.
+
+    The file is compressed as a stream into a temporary sibling that
+    atomically replaces it, so concurrent readers see either version whole.
+    Files already compressed, or that would not shrink enough, are left
+    untouched.
+
+    Args:
+        full_path: Path of the file on disk
+        level: zstd compression level
+
+    Returns:
+        True if the file was replaced by its compressed version
+    """
+    if is_compressed(full_path):
+        return False
+
+    directory = os.path.dirname(full_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with open(full_path, "rb") as source, os.fdopen(fd, "wb") as target:
+            zstandard.ZstdCompressor(level=level).copy_stream(source, target)
+        size = os.path.getsize(full_path)
+        if os.path.getsize(tmp_path) > size * (1 - MIN_COMPRESSION_SAVING):
+            os.remove(tmp_path)
+            return False
+        shutil.copystat(full_path, tmp_path)
+        os.replace(tmp_path, full_path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def generate_unique_filename(filename: str) -> str:
     """Generate a unique filename to prevent overwrites."""
     ext = os.path.splitext(filename)[1]
     unique_filename = f"{uuid.uuid4()}{ext}"
     return unique_filename
 
+def _upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE / (1024 * 1024)} MB"
+    )
+
+def check_upload_name(filename: str, size: Optional[int], allowed_extensions: Optional[list] = None) -> None:
+    """Reject an upload by extension, and by size when the client declared it."""
+    if allowed_extensions:
+        if not validate_file_extension(filename, allowed_extensions):
+            raise HTTPException(
+                status_code=400,
+                detail=f"File type not allowed. Allowed types: {', '.join(allowed_extensions)}"
+            )
+    if size is not None and size > settings.MAX_UPLOAD_SIZE:
+        raise _upload_too_large()
+
+def check_upload(upload_file: UploadFile, allowed_extensions: Optional[list] = None) -> None:
+    """Reject an upload by extension, and by size when the client declared it, before copying it."""
+    check_upload_name(upload_file.filename, upload_file.size, allowed_extensions)
+
+def spool_upload(source: BinaryIO, directory: str) -> Tuple[str, str, int]:
+    """
+    Copy an upload stream into a temporary file (blocking).
+
+    The stream is copied in fixed-size chunks and hashed on the way; a
+    stream crossing MAX_UPLOAD_SIZE is abandoned right away. The temporary
+    file is created in `directory`, so it can be renamed into place
+    atomically once the caller has decided where it goes.
+
+    Args:
+        source: Binary stream of the uploaded content
+        directory: Directory, on the same filesystem as the destination
+
+    Returns:
+        Tuple of the temporary file's path, the SHA-256 of the content and
+        its size in bytes
+    """
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > settings.MAX_UPLOAD_SIZE:
+                    raise _upload_too_large()
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, digest.hexdigest(), size
+
+def _store_upload(source: BinaryIO, subfolder: str, filename: str) -> Tuple[str, str]:
+    """Spool an upload and rename it into a subfolder under a unique name (blocking)."""
+    upload_dir = os.path.join(settings.UPLOAD_DIR, subfolder)
+    tmp_path, sha256, _ = spool_upload(source, upload_dir)
+    unique_filename = generate_unique_filename(filename)
+    try:
+        if should_compress(subfolder):
+            compress_file(tmp_path, settings.UPLOAD_COMPRESSION_LEVEL)
+        os.replace(tmp_path, os.path.join(upload_dir, unique_filename))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return os.path.join(subfolder, unique_filename), sha256
+
 async def save_upload_file(
     upload_file: UploadFile, 
     subfolder: str,
     allowed_extensions: list = None
-) -> str:
+) -> Tuple[str, str]:
     """
-    Save an uploaded file and return its path.
+    Save an uploaded file under a unique name without buffering it in memory.
+
+    The copy runs in the thread pool, so the event loop stays free while
+    large files are written. Quote and product files go to the
+    deduplicated store in app.services.blobs instead.
     
     Args:
         upload_file: The file to save
@@ -31,42 +215,15 @@ async def save_upload_file(
         allowed_extensions: List of allowed file extensions
         
     Returns:
-        The relative path to the saved file
+        Tuple of the path relative to the uploads directory and the SHA-256
+        of the file's content
     """
-    # Check file size
-    content = await upload_file.read()
-    if len(content) > settings.MAX_UPLOAD_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE / (1024 * 1024)} MB"
-        )
-    
-    # Check file extension if provided
-    if allowed_extensions:
-        if not validate_file_extension(upload_file.filename, allowed_extensions):
-            raise HTTPException(
-                status_code=400,
-                detail=f"File type not allowed. Allowed types: {', '.join(allowed_extensions)}"
-            )
-    
-    # Use a unique filename to prevent overwrites
-    unique_filename = generate_unique_filename(upload_file.filename)
-    
-    # Create directory if it doesn't exist
-    upload_dir = os.path.join(settings.UPLOAD_DIR, subfolder)
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Save the file
-    file_path = os.path.join(upload_dir, unique_filename)
-    with open(file_path, "wb") as f:
-        f.write(content)
-    
-    # Return the path relative to the uploads directory
-    return os.path.join(subfolder, unique_filename)
+    check_upload(upload_file, allowed_extensions)
+    return await run_in_threadpool(_store_upload, upload_file.file, subfolder, upload_file.filename)
 
 def delete_upload_file(file_path: str) -> bool:
     """
-    Delete an uploaded file.
+    Delete an uploaded file along with its canonical mesh, if any.
     
     Args:
         file_path: The path relative to the uploads directory
@@ -76,6 +233,9 @@ def delete_upload_file(file_path: str) -> bool:
     """
     full_path = os.path.join(settings.UPLOAD_DIR, file_path)
     
+    if os.path.exists(canonical_path(full_path)):
+        os.remove(canonical_path(full_path))
+
     if os.path.exists(full_path):
         os.remove(full_path)
         return True
@@ -0,0 +1,245 @@
+
+import os
+import re
+import mimetypes
+import zstandard
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.utils.file import is_compressed
+
+# Files are read in chunks of this many bytes when they cannot be sent zero-copy
+SEND_CHUNK_SIZE = 256 * 1024
+
+# Model formats the mimetypes module does not know
+MEDIA_TYPES = {
+    ".stl": "model/stl",
+    ".obj": "model/obj",
+    ".3mf": "model/3mf",
+    ".bin": "application/octet-stream",
+}
+
+# ASGI extension through which a server sends a file with os.sendfile
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def media_type(file_path: str) -> str:
+    """Content type of a stored file, by extension."""
+    ext = os.path.splitext(file_path)[1].lower()
+    return MEDIA_TYPES.get(ext) or mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header holding a single byte range.
+
+    Args:
+        header: Value of the Range header
+        size: Size of the file in bytes
+
+    Returns:
+        Inclusive (start, end) offsets, or None if the header is to be
+        ignored: malformed, another unit, or several ranges
+
+    Raises:
+        ValueError: If the range lies outside the file
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+
+    # Suffix range: the last N bytes
+    if not first:
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, min(int(last), size - 1) if last else size - 1
+
+def _matches_etag(header: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def _parse_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Check a request's validators; If-None-Match takes precedence over If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _matches_etag(if_none_match, etag)
+    if_modified_since = _parse_date(request.headers.get("if-modified-since", ""))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+def _range_applies(request: Request, etag: str, mtime: float) -> bool:
+    """Check If-Range: a range is only served from the representation the client already has part of."""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', "W/")):
+        # Strong comparison, so weak tags never match
+        return if_range == etag
+    return _parse_date(if_range) == int(mtime)
+
+def _accepts_zstd(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() == "zstd":
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+class StoredFileResponse(Response):
+    """
+    Send a stored file, or a byte range of it, without loading it in memory.
+
+    The file goes to the server's zero-copy extension when it offers one,
+    so the kernel copies it straight to the socket with sendfile; otherwise
+    it is read in chunks in the thread pool. Compressed files served to
+    clients that do not accept zstd are decompressed on the fly.
+    """
+
+    def __init__(
+        self,
+        full_path: str,
+        headers: Dict[str, str],
+        status_code: int = 200,
+        start: int = 0,
+        length: Optional[int] = None,
+        decompress: bool = False,
+        media_type: Optional[str] = None
+    ):
+        self.full_path = full_path
+        self.status_code = status_code
+        self.start = start
+        self.length = length
+        self.decompress = decompress
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        f = await run_in_threadpool(open, self.full_path, "rb")
+        try:
+            if self.decompress:
+                reader = zstandard.ZstdDecompressor().stream_reader(f, closefd=False)
+                await self._send_chunks(send, reader, None)
+            elif ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False
+                })
+            else:
+                await run_in_threadpool(f.seek, self.start)
+                await self._send_chunks(send, f, self.length)
+        finally:
+            await run_in_threadpool(f.close)
+
+    async def _send_chunks(self, send: Send, f, length: Optional[int]) -> None:
+        remaining = length
+        while remaining is None or remaining > 0:
+            size = SEND_CHUNK_SIZE if remaining is None else min(SEND_CHUNK_SIZE, remaining)
+            chunk = await run_in_threadpool(f.read, size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def stored_file_response(
+    request: Request,
+    full_path: str,
+    etag: Optional[str] = None,
+    cache_control: str = "no-cache",
+    accel_path: Optional[str] = None
+) -> Response:
+    """
+    Build the response to a GET or HEAD request for a stored file.
+
+    Conditional requests are answered with 304 from the ETag and
+    Last-Modified validators, and a single byte range with 206 (or 416 if
+    it lies outside the file). Compressed files are sent as they are,
+    zstd-encoded, to clients accepting it, and decompressed otherwise,
+    in which case ranges are not supported since the size is unknown.
+
+    Args:
+        request: The request
+        full_path: Path of the file on disk
+        etag: Strong validator of the content, e.g. its hash; derived from
+            the size and modification time if not given
+        cache_control: Cache-Control header
+        accel_path: If given, plain files are not sent but handed to the
+            reverse proxy at this internal URL with X-Accel-Redirect
+
+    Returns:
+        The response
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+    """
+    stat = os.stat(full_path)
+    compressed = is_compressed(full_path)
+    encoded = compressed and _accepts_zstd(request)
+
+    tag = etag or f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    headers = {
+        # Each encoding is its own representation, with its own tag
+        "etag": f'"{tag}-zstd"' if encoded else f'"{tag}"',
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+    }
+    if compressed:
+        headers["vary"] = "Accept-Encoding"
+    if is_not_modified(request, headers["etag"], stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    content_type = media_type(full_path)
+    if compressed and not encoded:
+        return StoredFileResponse(full_path, headers, decompress=True, media_type=content_type)
+    if encoded:
+        headers["content-encoding"] = "zstd"
+    elif accel_path:
+        # The proxy serves ranges itself
+        headers["x-accel-redirect"] = accel_path
+        return Response(headers=headers, media_type=content_type)
+
+    headers["accept-ranges"] = "bytes"
+    start, end = 0, stat.st_size - 1
+    status_code = 200
+    range_header = request.headers.get("range")
+    if range_header and _range_applies(request, headers["etag"], stat.st_mtime):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{stat.st_size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["content-range"] = f"bytes {start}-{end}/{stat.st_size}"
+
+    headers["content-length"] = str(end - start + 1)
+    return StoredFileResponse(full_path, headers, status_code, start, end - start + 1, media_type=content_type)
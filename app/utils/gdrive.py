@@ -1,75 +1,135 @@
 
 import os
 import json
+import shutil
 import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import httplib2
 from google.oauth2 import service_account
+from google_auth_httplib2 import AuthorizedHttp
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-from io import BytesIO
+from googleapiclient.http import MediaFileUpload
 from app.config import settings
+from app.utils.file import is_compressed, open_stored_file
 
 logger = logging.getLogger(__name__)
 
+# Resumable uploads send files in chunks of this size (a multiple of 256 KiB)
+DRIVE_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Retries of each request on network errors and 5xx/429 responses, with backoff
+DRIVE_NUM_RETRIES = 5
+
+# Seconds before a request to Drive times out
+DRIVE_TIMEOUT = 60
+
+# The service and credentials, built once per process
+_service = None
+_credentials = None
+_service_lock = threading.Lock()
+
+# httplib2 connections are not thread-safe, so each thread gets its own
+_local = threading.local()
+
+# Uploads of all quotes share these threads, bounding concurrent transfers
+_upload_executor: Optional[ThreadPoolExecutor] = None
+
 def get_drive_service():
     """
-    Get an authenticated Google Drive service
+    Get the authenticated Google Drive service of this process
+    
+    The credentials are parsed and the service built on first use only.
+    The service may be shared across threads as long as requests are
+    executed with the calling thread's connection, see _thread_http.
     """
+    global _service, _credentials
     if not settings.GDRIVE_ENABLED:
         logger.warning("Google Drive integration is disabled")
         return None
     
-    try:
-        # The service account credentials should be stored securely
-        # and accessed from environment variables or a secure vault
-        service_account_info = json.loads(os.getenv("GDRIVE_CREDENTIALS", "{}"))
-        
-        # If no credentials are found, return None
-        if not service_account_info:
-            logger.error("No Google Drive credentials found")
+    with _service_lock:
+        if _service is not None:
+            return _service
+        try:
+            # The service account credentials should be stored securely
+            # and accessed from environment variables or a secure vault
+            service_account_info = json.loads(os.getenv("GDRIVE_CREDENTIALS", "{}"))
+            
+            # If no credentials are found, return None
+            if not service_account_info:
+                logger.error("No Google Drive credentials found")
+                return None
+            
+            _credentials = service_account.Credentials.from_service_account_info(
+                service_account_info,
+                scopes=['https://www.googleapis.com/auth/drive']
+            )
+            
+            _service = build('drive', 'v3', credentials=_credentials, cache_discovery=False)
+            return _service
+        except Exception as e:
+            logger.error(f"Error creating Google Drive service: {str(e)}")
             return None
-        
-        credentials = service_account.Credentials.from_service_account_info(
-            service_account_info,
-            scopes=['https://www.googleapis.com/auth/drive']
-        )
-        
-        service = build('drive', 'v3', credentials=credentials)
-        return service
-    except Exception as e:
-        logger.error(f"Error creating Google Drive service: {str(e)}")
-        return None
 
-def upload_file_to_drive(file_path, file_name, mime_type='application/octet-stream'):
+def _thread_http() -> AuthorizedHttp:
+    """The calling thread's authorized connection to Google, kept alive across requests."""
+    http = getattr(_local, "http", None)
+    if http is None:
+        http = AuthorizedHttp(_credentials, http=httplib2.Http(timeout=DRIVE_TIMEOUT))
+        _local.http = http
+    return http
+
+def upload_file_to_drive(file_path, file_name, folder_id=None, mime_type='application/octet-stream'):
     """
     Upload a file to Google Drive and return the URL
+    
+    The file is streamed from disk in resumable chunks of DRIVE_CHUNK_SIZE,
+    each retried on failure, so memory use does not depend on its size.
+    Compressed stored files are first decompressed to a temporary file.
+    
+    Args:
+        file_path: Path of the file on disk
+        file_name: Name of the file in Drive
+        folder_id: Drive folder to place the file in; GDRIVE_FOLDER_ID if not given
+        mime_type: Content type of the file
+    
+    Returns:
+        The file's web link, or None if it could not be uploaded
     """
     service = get_drive_service()
     if not service:
         return None
     
+    tmp_path = None
     try:
-        # Read the file
-        with open(file_path, 'rb') as f:
-            file_data = f.read()
-        
-        # Create a BytesIO object for the file data
-        fh = BytesIO(file_data)
+        source_path = file_path
+        if is_compressed(file_path):
+            fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(file_path)[1])
+            with open_stored_file(file_path) as f, os.fdopen(fd, "wb") as tmp:
+                shutil.copyfileobj(f, tmp)
+            source_path = tmp_path
         
         # Set up file metadata
+        parent = folder_id or settings.GDRIVE_FOLDER_ID
         file_metadata = {
             'name': file_name,
-            'parents': [settings.GDRIVE_FOLDER_ID] if settings.GDRIVE_FOLDER_ID else []
+            'parents': [parent] if parent else []
         }
         
-        # Create the media upload object
-        media = MediaIoBaseUpload(fh, mimetype=mime_type, resumable=True)
-        
-        # Upload the file
-        file = service.files().create(
+        # Upload the file chunk by chunk
+        media = MediaFileUpload(source_path, mimetype=mime_type, chunksize=DRIVE_CHUNK_SIZE, resumable=True)
+        request = service.files().create(
             body=file_metadata,
             media_body=media,
             fields='id,webViewLink'
-        ).execute()
+        )
+        http = _thread_http()
+        file = None
+        while file is None:
+            _, file = request.next_chunk(http=http, num_retries=DRIVE_NUM_RETRIES)
         
         # Log and return the URL
         file_id = file.get('id')
@@ -78,9 +138,69 @@ def upload_file_to_drive(file_path, file_name, mime_type='application/octet-stre
         return web_link
     
     except Exception as e:
-        logger.error(f"Error uploading file to Google Drive: {str(e)}")
+        logger.error(f"Error uploading file {file_name} to Google Drive: {str(e)}")
+        return None
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def list_folder_files(folder_id):
+    """
+    List the names of the files in a Google Drive folder
+    
+    Returns:
+        The names, or None if the folder could not be listed
+    """
+    service = get_drive_service()
+    if not service:
+        return None
+    
+    try:
+        names = set()
+        page_token = None
+        while True:
+            response = service.files().list(
+                q=f"'{folder_id}' in parents and trashed = false",
+                fields='nextPageToken,files(name)',
+                pageToken=page_token
+            ).execute(http=_thread_http(), num_retries=DRIVE_NUM_RETRIES)
+            names.update(file['name'] for file in response.get('files', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return names
+    except Exception as e:
+        logger.error(f"Error listing Google Drive folder {folder_id}: {str(e)}")
         return None
 
+def upload_files_to_drive(files: List[Tuple[str, str]], folder_id: str) -> Dict[str, Optional[str]]:
+    """
+    Upload files to a Google Drive folder in parallel
+    
+    At most GDRIVE_UPLOAD_CONCURRENCY files are transferred at a time by
+    this process, across all callers.
+    
+    Args:
+        files: (path on disk, name in Drive) of every file
+        folder_id: Drive folder to place the files in
+    
+    Returns:
+        Mapping of file name to its web link, or to None if it could not
+        be uploaded
+    """
+    global _upload_executor
+    with _service_lock:
+        if _upload_executor is None:
+            _upload_executor = ThreadPoolExecutor(
+                max_workers=settings.GDRIVE_UPLOAD_CONCURRENCY,
+                thread_name_prefix="drive-upload"
+            )
+    
+    futures = {
+        file_name: _upload_executor.submit(upload_file_to_drive, file_path, file_name, folder_id)
+        for file_path, file_name in files
+    }
+    return {file_name: future.result() for file_name, future in futures.items()}
+
 def create_quote_folder(quote_id):
     """
     Create a folder for a quote in Google Drive and return the URL
@@ -102,7 +222,7 @@ def create_quote_folder(quote_id):
         folder = service.files().create(
             body=folder_metadata,
             fields='id,webViewLink'
-        ).execute()
+        ).execute(http=_thread_http(), num_retries=DRIVE_NUM_RETRIES)
         
         # Log and return the URL
         folder_id = folder.get('id')
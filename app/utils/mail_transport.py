@@ -0,0 +1,180 @@
+
+import time
+import queue
+import smtplib
+import logging
+import threading
+from email.message import Message
+from typing import List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Failures after which a connection is replaced and the message sent again
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPHeloError, ConnectionError, TimeoutError)
+
+class SMTPPool:
+    """
+    A small pool of authenticated SMTP connections, reused across messages.
+
+    Opening a connection costs the greeting, EHLO, STARTTLS with its TLS
+    handshake and the login, several round trips in all; a pooled
+    connection only pays for the message itself. Connections idle for
+    longer than the server is likely to keep them are replaced, and a
+    connection that fails mid-send is replaced and the message sent again
+    once. Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        use_tls: bool = True,
+        username: str = "",
+        password: str = "",
+        size: int = 2,
+        timeout: float = 30,
+        max_idle_seconds: float = 60
+    ):
+        self.host = host
+        self.port = port
+        self.use_tls = use_tls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_idle_seconds = max_idle_seconds
+        # Most recently used first, as it is the most likely to still be open
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            # Login if credentials are provided
+            if self.username and self.password:
+                server.login(self.username, self.password)
+        except BaseException:
+            self._close(server)
+            raise
+        self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        """Take an idle connection still fresh enough, or open one."""
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < self.max_idle_seconds:
+                return server
+            self._close(server)
+
+    def send_messages(self, messages: List[Message]) -> List[bool]:
+        """
+        Send a batch of messages over one SMTP session.
+
+        Messages the server refuses are reported and skipped; if the
+        connection drops, the session is reopened and the message sent again.
+
+        Args:
+            messages: Messages with their From and To headers set
+
+        Returns:
+            Whether each message was accepted, in order
+        """
+        results: List[bool] = []
+        if not messages:
+            return results
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("No SMTP connection became available")
+        server = None
+        try:
+            for message in messages:
+                for attempt in range(2):
+                    if server is None:
+                        try:
+                            server = self._checkout()
+                        except (smtplib.SMTPException, OSError) as e:
+                            # Not reachable: the rest of the batch fails too
+                            logger.error(f"Failed to connect to SMTP server {self.host}: {str(e)}")
+                            return results + [False] * (len(messages) - len(results))
+                    try:
+                        server.send_message(message)
+                        results.append(True)
+                        break
+                    except RECONNECT_ERRORS as e:
+                        self._close(server)
+                        server = None
+                        if attempt:
+                            logger.error(f"Failed to send email to {message['To']}: {str(e)}")
+                            results.append(False)
+                    except smtplib.SMTPException as e:
+                        # Refused by the server; the session is still usable
+                        logger.error(f"Failed to send email to {message['To']}: {str(e)}")
+                        results.append(False)
+                        break
+            return results
+        finally:
+            if server is not None:
+                self._idle.put((server, time.monotonic()))
+            self._slots.release()
+
+    def send_message(self, message: Message) -> bool:
+        """Send one message over a pooled connection; see send_messages."""
+        return self.send_messages([message])[0]
+
+    async def send_messages_async(self, messages: List[Message]) -> List[bool]:
+        """send_messages in the thread pool, for async routes."""
+        return await run_in_threadpool(self.send_messages, messages)
+
+    async def send_message_async(self, message: Message) -> bool:
+        """send_message in the thread pool, for async routes."""
+        return await run_in_threadpool(self.send_message, message)
+
+    def close(self) -> None:
+        """Close the idle connections."""
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+_transport: Optional[SMTPPool] = None
+_transport_lock = threading.Lock()
+
+def get_mail_transport() -> SMTPPool:
+    """Get the SMTP connection pool of this process, configured from the settings."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = SMTPPool(
+                settings.SMTP_SERVER,
+                settings.SMTP_PORT,
+                use_tls=settings.SMTP_USE_TLS,
+                username=settings.SMTP_USERNAME,
+                password=settings.SMTP_PASSWORD,
+                size=settings.SMTP_POOL_SIZE,
+                timeout=settings.SMTP_TIMEOUT,
+                max_idle_seconds=settings.SMTP_MAX_IDLE_SECONDS
+            )
+        return _transport
+
+def close_mail_transport() -> None:
+    """Close the pooled SMTP connections, e.g. on shutdown."""
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
@@ -0,0 +1,185 @@
+
+import os
+import logging
+import tempfile
+import threading
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# An entry is (kind, id, name), e.g. ("quote", 12, "quotes/part.stl")
+Entry = Tuple[str, int, str]
+
+class VectorIndex:
+    """
+    In-memory nearest-neighbour index over fixed-size float vectors.
+
+    Vectors are kept in one contiguous float32 matrix with their squared
+    norms, so a lookup is a single matrix-vector product followed by a
+    partial sort. Brute force stays in the low milliseconds for tens of
+    thousands of vectors and needs no rebuilds when entries change. Removed
+    rows are filled with the last row to keep the matrix dense. Entries
+    belong to an owner, a (kind, id) pair, and are removed per owner.
+    synced_at is left to the caller to record how current the entries are
+    (e.g. a Unix time), and is saved and loaded with them.
+    """
+
+    def __init__(self, path: str, size: int, kinds: Sequence[str]):
+        self.path = path
+        self.size = size
+        self.kinds = tuple(kinds)
+        self._lock = threading.Lock()
+        self._entries: List[Entry] = []
+        self._rows: Dict[Entry, int] = {}
+        self._vectors = np.zeros((0, self.size), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._owners = np.zeros(0, dtype=np.int64)
+        self.synced_at: Optional[float] = None
+
+    def _owner(self, kind: str, item_id: int) -> int:
+        """Encode the owner of an entry as one integer."""
+        return item_id * len(self.kinds) + self.kinds.index(kind)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entries: Iterable[Tuple[Entry, List[float]]]) -> None:
+        """Add or replace the vectors of entries, skipping ones of the wrong size."""
+        with self._lock:
+            new_entries, new_vectors = [], []
+            for entry, values in entries:
+                vector = np.asarray(values, dtype=np.float32)
+                if vector.shape != (self.size,):
+                    continue
+                row = self._rows.get(entry)
+                if row is not None:
+                    self._vectors[row] = vector
+                    self._norms[row] = vector @ vector
+                else:
+                    self._rows[entry] = len(self._entries) + len(new_entries)
+                    new_entries.append(entry)
+                    new_vectors.append(vector)
+
+            if new_vectors:
+                stacked = np.vstack(new_vectors)
+                self._entries.extend(new_entries)
+                self._vectors = np.vstack([self._vectors, stacked])
+                self._norms = np.concatenate([self._norms, np.einsum("ij,ij->i", stacked, stacked)])
+                self._owners = np.concatenate([
+                    self._owners, np.array([self._owner(e[0], e[1]) for e in new_entries], dtype=np.int64)
+                ])
+
+    def owners(self, kind: str) -> Set[int]:
+        """IDs of the owners of a kind that have entries."""
+        with self._lock:
+            owners = np.unique(self._owners)
+        owners = owners[owners % len(self.kinds) == self.kinds.index(kind)]
+        return set((owners // len(self.kinds)).tolist())
+
+    def remove(self, kind: str, item_id: int) -> None:
+        """Remove every entry of an owner."""
+        with self._lock:
+            # Highest rows first, so a moved last row is never one to remove
+            for row in np.flatnonzero(self._owners == self._owner(kind, item_id))[::-1]:
+                del self._rows[self._entries[row]]
+                last = len(self._entries) - 1
+                if row != last:
+                    moved = self._entries[last]
+                    self._entries[row] = moved
+                    self._rows[moved] = row
+                    self._vectors[row] = self._vectors[last]
+                    self._norms[row] = self._norms[last]
+                    self._owners[row] = self._owners[last]
+                self._entries.pop()
+                self._vectors = self._vectors[:last]
+                self._norms = self._norms[:last]
+                self._owners = self._owners[:last]
+
+    def query(
+        self,
+        values: List[float],
+        limit: int = 10,
+        exclude: Optional[Tuple[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the entries closest to a vector.
+
+        Args:
+            values: Vector to search for
+            limit: Maximum number of matches
+            exclude: Owner (kind, id) whose entries are left out
+
+        Returns:
+            Matches with their kind, id, name and Euclidean distance,
+            ordered by increasing distance
+        """
+        vector = np.asarray(values, dtype=np.float32)
+        with self._lock:
+            if not self._entries:
+                return []
+            # |x - q|² = |x|² - 2 x·q + |q|²
+            distances = self._norms - 2 * (self._vectors @ vector) + vector @ vector
+            entries = self._entries
+
+            if exclude is not None:
+                distances[self._owners == self._owner(*exclude)] = np.inf
+
+            count = min(limit, len(distances))
+            nearest = np.argpartition(distances, count - 1)[:count]
+            nearest = nearest[np.argsort(distances[nearest])]
+            return [
+                {
+                    "kind": entries[row][0],
+                    "id": entries[row][1],
+                    "name": entries[row][2],
+                    "distance": round(float(np.sqrt(max(distances[row], 0.0))), 5),
+                }
+                for row in nearest
+                if np.isfinite(distances[row])
+            ]
+
+    def save(self) -> None:
+        """Write the index to disk atomically."""
+        with self._lock:
+            kinds = np.array([entry[0] for entry in self._entries], dtype=str)
+            ids = np.array([entry[1] for entry in self._entries], dtype=np.int64)
+            names = np.array([entry[2] for entry in self._entries], dtype=str)
+            vectors = self._vectors.copy()
+            synced_at = np.array([np.nan if self.synced_at is None else self.synced_at])
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, kinds=kinds, ids=ids, names=names, vectors=vectors, synced_at=synced_at)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self) -> bool:
+        """Replace the index with the one on disk; False if there is none."""
+        try:
+            with np.load(self.path) as data:
+                kinds, ids, names, vectors = data["kinds"], data["ids"], data["names"], data["vectors"]
+                synced_at = float(data["synced_at"][0]) if "synced_at" in data else np.nan
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable vector index {self.path}: {str(e)}")
+            return False
+
+        if vectors.shape[1:] != (self.size,) or not set(kinds.tolist()) <= set(self.kinds):
+            logger.warning(f"Ignoring vector index {self.path} with a different layout")
+            return False
+
+        with self._lock:
+            self._entries = [(str(kind), int(item_id), str(name)) for kind, item_id, name in zip(kinds, ids, names)]
+            self._rows = {entry: row for row, entry in enumerate(self._entries)}
+            self._vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            self._norms = np.einsum("ij,ij->i", self._vectors, self._vectors)
+            self._owners = np.array([self._owner(kind, item_id) for kind, item_id, _ in self._entries], dtype=np.int64)
+            self.synced_at = None if np.isnan(synced_at) else synced_at
+        return True
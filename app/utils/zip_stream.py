@@ -0,0 +1,79 @@
+
+import os
+import logging
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+
+from app.utils.file import is_compressed, open_stored_file
+from app.utils.file_response import SEND_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Formats that are compressed already, so deflating them again only costs CPU
+STORED_EXTENSIONS = {".3mf", ".zip", ".jpg", ".jpeg", ".png", ".webp", ".gz", ".zst"}
+
+class _ZipSink:
+    """
+    Write-only target of a ZipFile, holding what was written until drained.
+
+    Having no tell or seek, it makes zipfile write each entry's sizes and
+    CRC in a data descriptor after its data rather than seeking back.
+    """
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def stream_zip(files: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    Build a ZIP archive of stored files as a stream of chunks.
+
+    Each file is read in chunks of SEND_CHUNK_SIZE and every chunk is
+    yielded as soon as it is compressed, so no file or archive is ever held
+    whole in memory or on disk. Compressed stored files are decompressed on
+    the fly; formats compressed already, such as 3MF, are stored as they
+    are and others deflated. Files that no longer exist are skipped.
+
+    Args:
+        files: (name in the archive, path on disk) of every file
+
+    Yields:
+        The archive's bytes
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for name, full_path in files:
+            try:
+                info = zipfile.ZipInfo.from_file(full_path, name, strict_timestamps=False)
+                compressed = is_compressed(full_path)
+                source = open_stored_file(full_path)
+            except FileNotFoundError:
+                logger.warning(f"Skipped missing file {full_path} in ZIP archive")
+                continue
+
+            ext = os.path.splitext(name)[1].lower()
+            info.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            # The original size of a compressed file is only known once read
+            if compressed:
+                info.file_size = 0
+            with source, archive.open(info, "w", force_zip64=compressed) as target:
+                while chunk := source.read(SEND_CHUNK_SIZE):
+                    target.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            yield sink.drain()
+
+    # The central directory
+    yield sink.drain()
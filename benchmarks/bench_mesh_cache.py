@@ -0,0 +1,106 @@
+"""
+Benchmark loading models from their canonical mesh against parsing them.
+
+Parsing includes welding the corners into an indexed mesh, since that is
+what the canonical file stores and what analysis needs.
+
+Run from the repository root:
+    python -m benchmarks.bench_mesh_cache
+"""
+import os
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+
+from app.services.mesh import load_mesh, load_canonical
+from app.services.mesh.canonical import canonical_path
+from app.services.mesh.loader import STL_RECORD
+from app.services.mesh.topology import weld_vertices
+
+def sphere(rings: int, segments: int, radius: float = 20.0):
+    """Indexed UV sphere with 2 * rings * segments faces."""
+    theta = np.linspace(0, np.pi, rings + 1)
+    phi = np.linspace(0, 2 * np.pi, segments + 1)[:-1]
+    t, p = np.meshgrid(theta, phi, indexing="ij")
+    vertices = np.stack(
+        [radius * np.sin(t) * np.cos(p), radius * np.sin(t) * np.sin(p), radius * np.cos(t)], axis=-1
+    ).reshape(-1, 3).astype(np.float32)
+    index = np.arange((rings + 1) * segments).reshape(rings + 1, segments)
+    a, b = index[:-1], np.roll(index[:-1], -1, axis=1)
+    c, d = index[1:], np.roll(index[1:], -1, axis=1)
+    faces = np.concatenate([np.stack([a, c, b], -1).reshape(-1, 3), np.stack([b, c, d], -1).reshape(-1, 3)])
+    return vertices, faces
+
+def write_models(directory: str, vertices: np.ndarray, faces: np.ndarray):
+    triangles = vertices[faces]
+    paths = {}
+
+    paths["binary STL"] = os.path.join(directory, "model.stl")
+    records = np.zeros(len(triangles), dtype=STL_RECORD)
+    records["vertices"] = triangles
+    with open(paths["binary STL"], "wb") as f:
+        f.write(b"\0" * 80 + np.uint32(len(triangles)).tobytes() + records.tobytes())
+
+    paths["ASCII STL"] = os.path.join(directory, "ascii.stl")
+    with open(paths["ASCII STL"], "w") as f:
+        f.write("solid bench\n")
+        for tri in triangles:
+            f.write("facet normal 0 0 0\nouter loop\n")
+            f.writelines(f"vertex {x:.6e} {y:.6e} {z:.6e}\n" for x, y, z in tri)
+            f.write("endloop\nendfacet\n")
+        f.write("endsolid bench\n")
+
+    paths["OBJ"] = os.path.join(directory, "model.obj")
+    with open(paths["OBJ"], "w") as f:
+        f.writelines(f"v {x:.6f} {y:.6f} {z:.6f}\n" for x, y, z in vertices)
+        f.writelines(f"f {a + 1} {b + 1} {c + 1}\n" for a, b, c in faces)
+
+    paths["3MF"] = os.path.join(directory, "model.3mf")
+    xml = [
+        '<model xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02" unit="millimeter">',
+        '<resources><object id="1" type="model"><mesh><vertices>',
+        *(f'<vertex x="{x:.6f}" y="{y:.6f}" z="{z:.6f}"/>' for x, y, z in vertices),
+        "</vertices><triangles>",
+        *(f'<triangle v1="{a}" v2="{b}" v3="{c}"/>' for a, b, c in faces),
+        '</triangles></mesh></object></resources><build><item objectid="1"/></build></model>',
+    ]
+    with zipfile.ZipFile(paths["3MF"], "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("3D/3dmodel.model", "\n".join(xml))
+
+    return paths
+
+def best_of(runs: int, function, *args):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def parse(path: str):
+    vertices, faces = weld_vertices(load_mesh(path))
+    return vertices[faces]
+
+def load(path: str):
+    vertices, faces = load_canonical(path)
+    return vertices[faces]
+
+def main():
+    print(f"{'format':<12}{'faces':>10}{'MB':>8}{'parse ms':>12}{'load ms':>10}{'speedup':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for rings, segments in [(100, 100), (250, 400)]:
+            vertices, faces = sphere(rings, segments)
+            for name, path in write_models(directory, vertices, faces).items():
+                if os.path.exists(canonical_path(path)):
+                    os.remove(canonical_path(path))
+                parsed = best_of(3, parse, path)
+                # The first load builds the canonical file, the timed ones map it
+                load_canonical(path)
+                loaded = best_of(5, load, path)
+                size = os.path.getsize(path) / 1e6
+                print(f"{name:<12}{len(faces):>10}{size:>8.1f}{parsed:>12.1f}{loaded:>10.1f}{parsed / loaded:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+
+"""
+Benchmark the build-plate nesting estimator.
+
+Run from the repository root:
+    python -m benchmarks.bench_nesting
+"""
+import random
+import time
+
+from app.services.nesting import pack_plates
+
+PLATE = (256.0, 256.0, 256.0)
+SPACING = 5.0
+
+def random_parts(count: int, max_quantity: int, rng: random.Random):
+    return [
+        (rng.uniform(5, 120), rng.uniform(5, 120), rng.uniform(5, 200), rng.randint(1, max_quantity))
+        for _ in range(count)
+    ]
+
+def main():
+    rng = random.Random(42)
+    cases = [
+        ("1 part x 10", [(40.0, 30.0, 20.0, 10)]),
+        ("1 part x 5000", [(12.0, 8.0, 5.0, 5000)]),
+        ("1 part x 100000", [(12.0, 8.0, 5.0, 100000)]),
+        ("20 parts x <=1000", random_parts(20, 1000, rng)),
+        ("200 parts x <=5000", random_parts(200, 5000, rng)),
+    ]
+
+    print(f"{'case':<22}{'copies':>10}{'plates':>8}{'util':>8}{'ms':>10}")
+    for name, parts in cases:
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            result = pack_plates(parts, PLATE, SPACING)
+        elapsed = (time.perf_counter() - start) / runs * 1000
+        copies = sum(part[3] for part in parts)
+        print(f"{name:<22}{copies:>10}{result['plates']:>8}{result['utilization']:>8.2f}{elapsed:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+
+import io
+import os
+import asyncio
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.models.user import User  # Registers the table upload sessions reference
+from app.models.blob import Blob
+from app.models.upload_session import UploadSession, UploadSessionStatus
+from app.services import blobs
+from app.services.blobs import save_blobs, save_blob_sync, attach_blob, release_file, release_files, find_blob
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Blob.__table__.create(engine)
+    UploadSession.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def make_upload(name, data):
+    return UploadFile(io.BytesIO(data), filename=name)
+
+def test_identical_uploads_share_one_blob(db, tmp_path):
+    """Test that the same content is stored once and counted per upload."""
+    data = os.urandom(4096)
+    saved = asyncio.run(save_blobs(db, [make_upload("a.STL", data), make_upload("b.stl", data)], [".stl"]))
+    (path, sha256), (other_path, _) = saved
+
+    assert path == other_path and path.endswith(f"{sha256}.stl")
+    assert (tmp_path / path).read_bytes() == data
+    assert find_blob(db, sha256).refcount == 2
+    assert not list((tmp_path / "blobs").glob("*.tmp"))
+
+    # The file survives until its last reference is released, then goes with its thumbnail
+    thumbnail = tmp_path / os.path.dirname(path) / "thumbnails" / f"{sha256}.png"
+    thumbnail.parent.mkdir()
+    thumbnail.write_bytes(b"png")
+    release_files(db, [path])
+    assert (tmp_path / path).exists()
+    release_files(db, [path])
+    assert not (tmp_path / path).exists() and not thumbnail.exists()
+    assert find_blob(db, sha256) is None
+
+def test_release_rolled_back_keeps_file(db, tmp_path):
+    """Test that a released file is only deleted once the release is committed."""
+    path, sha256 = save_blob_sync(db, make_upload("part.stl", b"solid\n"), [".stl"])
+
+    release_file(db, path)
+    assert (tmp_path / path).exists()
+    db.rollback()
+    assert (tmp_path / path).exists()
+    assert find_blob(db, sha256).refcount == 1
+
+def test_attach_blob_by_hash(db, tmp_path, monkeypatch):
+    """Test that users can reference content they stored, and only that, without uploading it again."""
+    monkeypatch.setattr(blobs, "_in_user_quotes", lambda db, path, user_id: user_id == 1)
+    path, sha256 = save_blob_sync(db, make_upload("part.obj", b"v 0 0 0\n"), [".obj"])
+
+    assert attach_blob(db, sha256, 1, [".obj"]) == path
+    assert find_blob(db, sha256).refcount == 2
+    with pytest.raises(HTTPException):
+        attach_blob(db, sha256, 1, [".stl"])
+    with pytest.raises(HTTPException):
+        attach_blob(db, "0" * 64, 1)
+
+    # Other users cannot tell the content is stored, unless they uploaded it too
+    with pytest.raises(HTTPException):
+        attach_blob(db, sha256, 2)
+    with pytest.raises(HTTPException):
+        attach_blob(db, sha256, None)
+    db.add(UploadSession(
+        id="s" * 32, user_id=2, filename="part.obj", size=8, received=8,
+        status=UploadSessionStatus.complete, file_path=path, sha256=sha256
+    ))
+    db.commit()
+    assert attach_blob(db, sha256, 2) == path
+
+def test_rejected_upload_keeps_nothing(db, tmp_path, monkeypatch):
+    """Test that a batch with an oversize file takes no references."""
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024)
+    uploads = [make_upload("small.stl", b"x" * 10), make_upload("large.stl", b"x" * 4096)]
+
+    with pytest.raises(HTTPException):
+        asyncio.run(save_blobs(db, uploads, [".stl"]))
+
+    assert db.query(Blob).count() == 0
+    assert not [name for _, _, names in os.walk(tmp_path) for name in names]
+
+def test_release_legacy_file(db, tmp_path):
+    """Test that files saved outside the store are deleted when their release is committed."""
+    (tmp_path / "quotes").mkdir()
+    (tmp_path / "quotes" / "old.stl").write_bytes(b"solid\n")
+
+    release_file(db, os.path.join("quotes", "old.stl"))
+    assert (tmp_path / "quotes" / "old.stl").exists()
+    db.commit()
+    assert not (tmp_path / "quotes" / "old.stl").exists()
@@ -0,0 +1,70 @@
+
+import io
+import os
+import asyncio
+import hashlib
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from app.config import settings
+from app.services.mesh import load_mesh
+from app.utils.file import (
+    compress_file, file_sha256, is_compressed, open_stored_file, save_upload_file, UPLOAD_CHUNK_SIZE
+)
+from tests.test_mesh import make_box, write_ascii_stl, write_binary_stl
+
+def test_compress_file_is_transparent(tmp_path):
+    """Test that compressed models read, hash and parse like the originals."""
+    box = make_box()
+    for name, write in (("ascii.stl", write_ascii_stl), ("binary.stl", write_binary_stl)):
+        path = str(tmp_path / name)
+        write(path, box)
+        with open(path, "rb") as f:
+            original = f.read()
+        digest = file_sha256(path)
+
+        assert compress_file(path, level=3)
+        assert is_compressed(path)
+        assert not compress_file(path, level=3)
+
+        with open_stored_file(path) as f:
+            assert f.read() == original
+        assert file_sha256(path) == digest
+        assert (load_mesh(path) == box).all()
+
+def test_compress_file_skips_incompressible(tmp_path):
+    """Test that files that would not shrink are left as they are."""
+    path = tmp_path / "noise.stl"
+    data = os.urandom(4096)
+    path.write_bytes(data)
+
+    assert not compress_file(str(path), level=3)
+    assert path.read_bytes() == data
+
+def make_upload(name, data):
+    return UploadFile(io.BytesIO(data), filename=name)
+
+def test_save_upload_file_streams_and_hashes(tmp_path, monkeypatch):
+    """Test that uploads are saved under unique names with their content hash."""
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    data = os.urandom(3 * UPLOAD_CHUNK_SIZE + 17)
+
+    first = asyncio.run(save_upload_file(make_upload("part.stl", data), "quotes", [".stl"]))
+    second = asyncio.run(save_upload_file(make_upload("part.stl", data), "quotes", [".stl"]))
+
+    assert first[0] != second[0]
+    assert first[1] == second[1] == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / first[0]).read_bytes() == data
+    assert not list((tmp_path / "quotes").glob("*.tmp"))
+
+def test_save_upload_file_rejects_oversize(tmp_path, monkeypatch):
+    """Test that an oversize upload is abandoned without leaving files behind."""
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 2 * UPLOAD_CHUNK_SIZE)
+    upload = make_upload("large.stl", b"x" * (3 * UPLOAD_CHUNK_SIZE))
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(save_upload_file(upload, "quotes", [".stl"]))
+
+    assert error.value.status_code == 400
+    assert not list((tmp_path / "quotes").iterdir())
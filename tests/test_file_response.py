@@ -0,0 +1,100 @@
+
+import os
+import asyncio
+import pytest
+import zstandard
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from email.utils import formatdate
+
+from app.utils.file_response import stored_file_response, parse_range, StoredFileResponse
+
+@pytest.fixture
+def served(tmp_path):
+    """A client for an app serving files of tmp_path, and a 1000-byte model in it."""
+    app = FastAPI()
+
+    @app.api_route("/{name}", methods=["GET", "HEAD"])
+    def serve(name: str, request: Request):
+        return stored_file_response(request, str(tmp_path / name), etag=name.split(".")[0])
+
+    data = os.urandom(1000)
+    (tmp_path / "model.stl").write_bytes(data)
+    return TestClient(app), data
+
+def test_parse_range():
+    """Test single byte range parsing."""
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=990-2000", 1000) == (990, 999)
+    assert parse_range("bytes=0-1,5-9", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
+
+def test_ranges_and_validators(served):
+    """Test full, partial and conditional downloads."""
+    client, data = served
+
+    response = client.get("/model.stl")
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers["etag"] == '"model"'
+    assert response.headers["content-type"] == "model/stl"
+    assert response.headers["accept-ranges"] == "bytes"
+
+    response = client.get("/model.stl", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == data[100:200]
+    assert response.headers["content-range"] == "bytes 100-199/1000"
+
+    response = client.get("/model.stl", headers={"Range": "bytes=5000-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */1000"
+
+    # A range of another version of the file gets the whole file
+    response = client.get("/model.stl", headers={"Range": "bytes=100-199", "If-Range": '"other"'})
+    assert response.status_code == 200 and response.content == data
+
+    assert client.get("/model.stl", headers={"If-None-Match": 'W/"x", "model"'}).status_code == 304
+    last_modified = response.headers["last-modified"]
+    assert client.get("/model.stl", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/model.stl", headers={"If-Modified-Since": formatdate(0, usegmt=True)}).status_code == 200
+
+    response = client.head("/model.stl")
+    assert response.status_code == 200 and response.headers["content-length"] == "1000"
+    assert response.content == b""
+
+def test_compressed_file_encodings(served, tmp_path):
+    """Test that compressed files are sent encoded when accepted and decompressed otherwise."""
+    client, _ = served
+    data = b"solid part\n" * 5000
+    (tmp_path / "packed.stl").write_bytes(zstandard.ZstdCompressor().compress(data))
+
+    response = client.get("/packed.stl", headers={"Accept-Encoding": "gzip, zstd"})
+    assert response.headers["content-encoding"] == "zstd"
+    assert response.headers["etag"] == '"packed-zstd"'
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    response = client.get("/packed.stl", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers["etag"] == '"packed"'
+    assert "accept-ranges" not in response.headers
+
+def test_zero_copy_extension(tmp_path):
+    """Test that servers offering zero-copy sends get the file rather than its bytes."""
+    (tmp_path / "model.stl").write_bytes(b"0123456789")
+    response = StoredFileResponse(str(tmp_path / "model.stl"), {"content-length": "4"}, 206, start=3, length=4)
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            message = {**message, "data": os.pread(message["file"].fileno(), message["count"], message["offset"])}
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "extensions": {"http.response.zerocopysend": {}}}
+    asyncio.run(response(scope, None, send))
+    assert messages[0]["status"] == 206
+    assert messages[1]["data"] == b"3456"
@@ -0,0 +1,49 @@
+
+import os
+import json
+from PIL import Image
+
+from app.config import settings
+from app.services.images import plan_image_variants, _build_variants, variant_dir
+
+def save_image(tmp_path, name, image, **params):
+    image.save(tmp_path / name, **params)
+    return name
+
+def test_variants_follow_exif_orientation(tmp_path, monkeypatch):
+    """Test that a rotated photo gets upright variants at each width and format."""
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "IMAGE_VARIANT_WIDTHS", [320, 640, 1280])
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Stored sideways, shown rotated by 90 degrees
+    name = save_image(tmp_path, "photo.jpg", Image.new("RGB", (1600, 900), "red"), exif=exif)
+
+    variants = plan_image_variants(name, "a" * 64)
+    assert [(v["width"], v["height"], v["type"]) for v in variants] == [
+        (320, 569, "image/webp"), (320, 569, "image/jpeg"),
+        (640, 1138, "image/webp"), (640, 1138, "image/jpeg"),
+        (900, 1600, "image/webp"), (900, 1600, "image/jpeg"),
+    ]
+
+    output_dir = tmp_path / variant_dir(name, "a" * 64)
+    _build_variants(str(tmp_path / name), str(output_dir), variants, 80)
+    for variant in variants:
+        with Image.open(tmp_path / variant["path"]) as image:
+            assert image.size == (variant["width"], variant["height"])
+            assert Image.MIME[image.format] == variant["type"]
+    assert json.loads((output_dir / "manifest.json").read_text()) == variants
+
+def test_small_and_transparent_images(tmp_path, monkeypatch):
+    """Test that small images are not upscaled and transparency is flattened for JPEG."""
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    name = save_image(tmp_path, "logo.png", Image.new("RGBA", (200, 100), (0, 0, 0, 0)))
+
+    variants = plan_image_variants(name, "b" * 64)
+    assert [(v["width"], v["height"]) for v in variants] == [(200, 100), (200, 100)]
+    _build_variants(str(tmp_path / name), str(tmp_path / variant_dir(name, "b" * 64)), variants, 80)
+    jpeg = next(v for v in variants if v["type"] == "image/jpeg")
+    with Image.open(tmp_path / jpeg["path"]) as image:
+        assert image.getpixel((0, 0)) == (255, 255, 255)
+
+    (tmp_path / "notes.jpg").write_bytes(b"not an image")
+    assert plan_image_variants("notes.jpg", "c" * 64) is None
@@ -0,0 +1,99 @@
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models.job import Job, JobStatus
+from app.services.jobs import (
+    job_handler, enqueue, claim_jobs, run_job, retry_job, renew_leases, requeue_stale_jobs, queue_stats
+)
+
+calls = []
+
+@job_handler("test_flaky")
+def flaky(db, payload):
+    calls.append(payload["n"])
+    raise ConnectionError("Service unavailable")
+
+@job_handler("test_ok")
+def ok(db, payload):
+    calls.append(payload["n"])
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Job.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    calls.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def make_due(db, job_id):
+    db.get(Job, job_id).run_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+
+def test_retries_then_dead_letter(db):
+    """Test that failed jobs back off, die after their last attempt and can be retried."""
+    job_id = enqueue(db, "test_flaky", {"n": 1}, max_attempts=2).id
+    db.commit()
+
+    assert claim_jobs(db, 10) == [job_id]
+    run_job(db, job_id)
+    job = db.get(Job, job_id)
+    assert job.status == JobStatus.pending and job.attempts == 1
+    assert job.last_error == "ConnectionError: Service unavailable"
+    # Backing off
+    assert claim_jobs(db, 10) == []
+
+    make_due(db, job_id)
+    assert claim_jobs(db, 10) == [job_id]
+    run_job(db, job_id)
+    assert db.get(Job, job_id).status == JobStatus.dead
+    assert calls == [1, 1]
+
+    retry_job(db, db.get(Job, job_id))
+    job = db.get(Job, job_id)
+    assert job.started_at is None and job.locked_at is None
+    assert claim_jobs(db, 10) == [job_id]
+    assert db.get(Job, job_id).started_at is not None
+    # A long job whose lease is renewed is not taken for lost
+    db.get(Job, job_id).locked_at = datetime.now(timezone.utc) - timedelta(days=1)
+    db.commit()
+    assert renew_leases(db, [job_id]) == 1
+    assert requeue_stale_jobs(db) == 0
+
+    # A worker lost mid-job counts as a failed attempt
+    db.get(Job, job_id).locked_at = datetime.now(timezone.utc) - timedelta(days=1)
+    db.commit()
+    assert requeue_stale_jobs(db) == 1
+    job = db.get(Job, job_id)
+    assert job.status == JobStatus.pending and job.attempts == 1
+    assert job.last_error.startswith("TimeoutError")
+
+def test_dependencies_and_stats(db):
+    """Test that jobs wait for the job they depend on, and that finished jobs are measured."""
+    first_id = enqueue(db, "test_ok", {"n": 1}).id
+    second_id = enqueue(db, "test_ok", {"n": 2}, depends_on=first_id).id
+    db.commit()
+    assert queue_stats(db)["pending_by_kind"] == {"test_ok": 2}
+
+    assert claim_jobs(db, 10) == [first_id, second_id]
+    run_job(db, second_id)
+    job = db.get(Job, second_id)
+    assert job.status == JobStatus.pending and job.attempts == 0 and calls == []
+
+    run_job(db, first_id)
+    make_due(db, second_id)
+    assert claim_jobs(db, 10) == [second_id]
+    run_job(db, second_id)
+    assert calls == [1, 2]
+
+    stats = queue_stats(db)
+    assert stats["counts"] == {"pending": 0, "running": 0, "done": 2, "dead": 0}
+    assert stats["oldest_due_seconds"] is None
+    assert stats["completion"]["count"] == 2 and stats["completion"]["p95_seconds"] >= 0
+    assert stats["wait"]["count"] == 2
@@ -0,0 +1,72 @@
+
+import socket
+import asyncio
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.utils.email import build_email
+from app.utils.mail_transport import SMTPPool
+
+class RecordingHandler:
+    """Local stand-in for the SMTP server: keeps the messages and counts sessions."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.recipients = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        session.host_name = hostname
+        self.sessions += 1
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("blocked@"):
+            return "550 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield handler, SMTPPool("127.0.0.1", port, use_tls=False, size=2, timeout=5)
+    finally:
+        controller.stop()
+
+def test_batch_over_one_session(smtp_server):
+    """Test that a batch, and later messages, reuse one session, skipping refused recipients."""
+    handler, pool = smtp_server
+    messages = [build_email(f"Quote #{n}", f"admin{n}@example.com", "<p>Hi</p>") for n in range(3)]
+    messages.insert(1, build_email("Quote", "blocked@example.com", "<p>Hi</p>"))
+
+    assert pool.send_messages(messages) == [True, False, True, True]
+    assert pool.send_message(build_email("Quote #4", "admin4@example.com", "<p>Hi</p>"))
+    assert asyncio.run(pool.send_message_async(build_email("Quote #5", "admin5@example.com", "<p>Hi</p>")))
+    assert handler.recipients == [f"admin{n}@example.com" for n in (0, 1, 2, 4, 5)]
+    assert handler.sessions == 1 and pool.connections_opened == 1
+    pool.close()
+
+def test_reconnects_after_drop(smtp_server):
+    """Test that a dropped connection is replaced and the message sent again."""
+    handler, pool = smtp_server
+    assert pool.send_message(build_email("First", "admin@example.com", "<p>Hi</p>"))
+
+    # The server hangs up while the connection idles in the pool
+    server, _ = pool._idle.get_nowait()
+    server.sock.shutdown(socket.SHUT_RDWR)
+    pool._idle.put((server, 0))
+    pool.max_idle_seconds = float("inf")
+
+    assert pool.send_message(build_email("Second", "admin@example.com", "<p>Hi</p>"))
+    assert handler.recipients == ["admin@example.com"] * 2
+    assert pool.connections_opened == 2
+    pool.close()
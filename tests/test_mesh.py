@@ -0,0 +1,316 @@
+
+import zlib
+import zipfile
+import numpy as np
+import pytest
+
+from app.services.mesh import (
+    load_mesh, analyze_triangles, check_printability, slice_layers, slice_and_estimate,
+    optimize_orientation, load_canonical, MeshFormatError
+)
+from app.services.mesh import printability
+from app.services.mesh.canonical import canonical_path
+from app.services.mesh.loader import STL_RECORD, read_ascii_stl, read_obj, read_3mf
+from app.services.mesh.render import render_mesh, encode_png
+from app.services.mesh.preview import build_lods, encode_preview, decode_preview
+
+def make_box(size=(10.0, 20.0, 30.0), offset=(0.0, 0.0, 0.0)):
+    """Build a closed, outward-facing box as a triangle array."""
+    corners = np.array([
+        [0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+        [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1],
+    ], dtype=np.float32) * np.array(size, dtype=np.float32) + np.array(offset, dtype=np.float32)
+    faces = np.array([
+        [0, 2, 1], [0, 3, 2],  # bottom
+        [4, 5, 6], [4, 6, 7],  # top
+        [0, 1, 5], [0, 5, 4],  # front
+        [2, 3, 7], [2, 7, 6],  # back
+        [1, 2, 6], [1, 6, 5],  # right
+        [3, 0, 4], [3, 4, 7],  # left
+    ])
+    return corners[faces]
+
+def write_binary_stl(path, triangles):
+    records = np.zeros(len(triangles), dtype=STL_RECORD)
+    records["vertices"] = triangles
+    with open(path, "wb") as f:
+        f.write(b"\0" * 80)
+        f.write(np.uint32(len(triangles)).tobytes())
+        f.write(records.tobytes())
+
+def write_ascii_stl(path, triangles):
+    with open(path, "w") as f:
+        f.write("solid test\n")
+        for tri in triangles:
+            f.write("  facet normal 0 0 0\n    outer loop\n")
+            for v in tri:
+                f.write(f"      vertex {v[0]} {v[1]} {v[2]}\n")
+            f.write("    endloop\n  endfacet\n")
+        f.write("endsolid test\n")
+
+def test_analyze_box():
+    """Test volume, area, bounding box and center of mass of a box."""
+    result = analyze_triangles(make_box(offset=(100.0, 0.0, 0.0)))
+
+    assert result["triangle_count"] == 12
+    assert result["volume_mm3"] == pytest.approx(6000.0)
+    assert result["volume_cm3"] == pytest.approx(6.0)
+    assert result["surface_area_mm2"] == pytest.approx(2 * (200 + 300 + 600))
+    assert result["dimensions_mm"] == pytest.approx([10.0, 20.0, 30.0])
+    assert result["center_of_mass"] == pytest.approx([105.0, 10.0, 15.0])
+    assert not result["inverted"]
+
+def test_analyze_inverted_box():
+    """Test that inward-facing meshes are flagged but keep a positive volume."""
+    result = analyze_triangles(make_box()[:, ::-1])
+
+    assert result["volume_mm3"] == pytest.approx(6000.0)
+    assert result["inverted"]
+
+def test_load_binary_and_ascii_stl(tmp_path):
+    """Test that both STL encodings load the same triangles."""
+    box = make_box()
+    write_binary_stl(tmp_path / "box.stl", box)
+    write_ascii_stl(tmp_path / "ascii.stl", box)
+
+    assert np.allclose(load_mesh(str(tmp_path / "box.stl")), box)
+    assert np.allclose(load_mesh(str(tmp_path / "ascii.stl")), box)
+
+def test_binary_stl_is_memory_mapped(tmp_path):
+    """Test that binary STL vertices are a view into the mapped file."""
+    write_binary_stl(tmp_path / "box.stl", make_box())
+
+    triangles = load_mesh(str(tmp_path / "box.stl"))
+    assert isinstance(triangles, np.memmap)
+    assert not triangles.flags.owndata
+
+def test_ascii_stl_chunk_boundaries(tmp_path):
+    """Test that facets split across read chunks are parsed intact."""
+    box = make_box()
+    write_ascii_stl(tmp_path / "ascii.stl", box)
+
+    assert np.allclose(read_ascii_stl(str(tmp_path / "ascii.stl"), chunk_size=7), box)
+
+def test_load_obj_quads(tmp_path):
+    """Test that OBJ polygon faces are triangulated."""
+    path = tmp_path / "quad.obj"
+    path.write_text("v 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nf 1/1 2/2 3/3 4/4\n")
+
+    triangles = load_mesh(str(path))
+    assert triangles.shape == (2, 3, 3)
+
+def test_obj_chunked_tokenizer(tmp_path):
+    """Test OBJ parsing across chunk boundaries, with relative indices and n-gons."""
+    path = tmp_path / "mixed.obj"
+    path.write_text(
+        "# comment\nv 0 0 0\nv 1 0 0\nvt 0.5 0.5\nv 1 1 0\nv 0 1 0\n"
+        "f 1/1 2/1 3/1 4/1\n"
+        "v 0 0 1\nv 1 0 1\nv 1 1 1\n"
+        "f -3//1 -2//1 -1//1\nf 5 6 7"
+    )
+    expected = np.array([
+        [[0, 0, 0], [1, 0, 0], [1, 1, 0]],
+        [[0, 0, 0], [1, 1, 0], [0, 1, 0]],
+        [[0, 0, 1], [1, 0, 1], [1, 1, 1]],
+        [[0, 0, 1], [1, 0, 1], [1, 1, 1]],
+    ])
+
+    for chunk_size in (5, 16, 1 << 20):
+        assert np.array_equal(read_obj(str(path), chunk_size=chunk_size), expected)
+
+    path.write_text("v 0 0 0\nv 1 0 0\nv 1 1 0\nf 1 2 4\n")
+    with pytest.raises(MeshFormatError):
+        read_obj(str(path))
+
+def test_3mf_objects_components_and_items(tmp_path):
+    """Test that every build item, component and transform of a 3MF is placed."""
+    box = make_box((1.0, 1.0, 1.0))
+    unique, faces = np.unique(box.reshape(-1, 3), axis=0, return_inverse=True)
+    faces = faces.reshape(-1, 3)
+    mesh = (
+        "<mesh><vertices>"
+        + "".join(f'<vertex x="{x}" y="{y}" z="{z}"/>' for x, y, z in unique)
+        + "</vertices><triangles>"
+        + "".join(f'<triangle v1="{a}" v2="{b}" v3="{c}"/>' for a, b, c in faces)
+        + "</triangles></mesh>"
+    )
+    model = (
+        '<model xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02"><resources>'
+        f'<object id="1" type="model">{mesh}</object>'
+        '<object id="2" type="model"><components>'
+        '<component objectid="1" transform="2 0 0 0 2 0 0 0 2 0 0 0"/>'
+        '<component objectid="1" transform="1 0 0 0 1 0 0 0 1 5 0 0"/>'
+        '</components></object>'
+        '</resources><build>'
+        '<item objectid="1"/>'
+        '<item objectid="2" transform="1 0 0 0 1 0 0 0 1 0 10 0"/>'
+        '</build></model>'
+    )
+    path = tmp_path / "parts.3mf"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("3D/3dmodel.model", model)
+
+    triangles = read_3mf(str(path))
+    assert triangles.shape == (36, 3, 3)
+    assert np.allclose(triangles[:12], box)
+    # Component transforms apply first, then the item's
+    assert np.allclose(triangles[12:24], box * 2 + [0, 10, 0])
+    assert np.allclose(triangles[24:], box + [5, 10, 0])
+
+def test_3mf_component_fan_out_is_bounded(tmp_path):
+    """Test that components instancing each other many times are rejected before expansion."""
+    objects = ['<object id="0" type="model"><mesh><vertices>'
+               '<vertex x="0" y="0" z="0"/><vertex x="1" y="0" z="0"/><vertex x="0" y="1" z="0"/>'
+               '</vertices><triangles><triangle v1="0" v2="1" v3="2"/></triangles></mesh></object>']
+    # Every level holds ten copies of the one below: 10^16 triangles in all
+    for level in range(1, 17):
+        copies = f'<component objectid="{level - 1}"/>' * 10
+        objects.append(f'<object id="{level}" type="model"><components>{copies}</components></object>')
+    model = (
+        '<model xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02"><resources>'
+        + "".join(objects)
+        + '</resources><build><item objectid="16"/></build></model>'
+    )
+    path = tmp_path / "bomb.3mf"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("3D/3dmodel.model", model)
+
+    with pytest.raises(MeshFormatError, match="triangles"):
+        read_3mf(str(path))
+
+def test_canonical_mesh_cache(tmp_path):
+    """Test that models are normalized once into a mapped, indexed copy."""
+    box = make_box()
+    path = str(tmp_path / "ascii.stl")
+    write_ascii_stl(path, box)
+
+    vertices, faces = load_canonical(path)
+    assert vertices.shape == (8, 3) and faces.shape == (12, 3)
+    assert np.array_equal(vertices[faces], box)
+
+    cached_vertices, cached_faces = load_canonical(path)
+    assert isinstance(cached_vertices, np.memmap) and isinstance(cached_faces, np.memmap)
+    assert np.array_equal(cached_vertices[cached_faces], box)
+
+    # Replacing the model makes the canonical copy stale
+    write_ascii_stl(path, make_box(size=(1.0, 2.0, 3.0)))
+    vertices, faces = load_canonical(path)
+    assert not isinstance(vertices, np.memmap)
+    assert np.allclose(np.ptp(vertices, axis=0), [1, 2, 3])
+
+    # A corrupt canonical file is rebuilt rather than trusted
+    with open(canonical_path(path), "r+b") as f:
+        f.truncate(100)
+    vertices, faces = load_canonical(path)
+    assert len(faces) == 12
+
+def test_load_invalid_file(tmp_path):
+    """Test that garbage input raises a format error."""
+    path = tmp_path / "broken.stl"
+    path.write_bytes(b"not a mesh")
+
+    with pytest.raises(MeshFormatError):
+        load_mesh(str(path))
+
+def test_printability_of_closed_box():
+    """Test that a clean box passes every printability check."""
+    result = check_printability(make_box())
+
+    assert result["watertight"]
+    assert result["open_edges"] == 0
+    assert result["inconsistent_edges"] == 0
+    assert result["min_wall_thickness_mm"] == pytest.approx(10.0)
+    assert result["printable"]
+
+def test_printability_defects():
+    """Test that holes, flipped faces and thin walls are reported."""
+    open_box = check_printability(make_box()[:-1])
+    assert not open_box["watertight"]
+    assert open_box["open_edges"] == 3
+
+    flipped = make_box()
+    flipped[0] = flipped[0][::-1]
+    assert check_printability(flipped)["inconsistent_edges"] == 3
+
+    thin = check_printability(make_box(size=(10.0, 20.0, 0.5)))
+    assert thin["min_wall_thickness_mm"] == pytest.approx(0.5)
+    assert not thin["printable"]
+
+def test_thickness_in_bounded_batches(monkeypatch):
+    """Test that casting rays a few faces at a time finds the same walls."""
+    two_boxes = np.concatenate([make_box(size=(10.0, 20.0, 0.5)), make_box(offset=(20.0, 0.0, 0.0))])
+    expected = check_printability(two_boxes)
+    monkeypatch.setattr(printability, "_MAX_PAIRS", 50)
+    assert check_printability(two_boxes) == expected
+    assert expected["min_wall_thickness_mm"] == pytest.approx(0.5)
+
+def test_slice_box_layers():
+    """Test that every layer of a box has the box's cross-section."""
+    layers = slice_layers(make_box(offset=(5.0, -3.0, 2.0)), 0.5)
+
+    assert len(layers["z"]) == 60
+    assert layers["z"][0] == pytest.approx(2.25)
+    assert np.allclose(layers["area"], 200.0)
+    assert np.allclose(layers["perimeter"], 60.0)
+
+def test_slice_overhang_needs_support():
+    """Test that a wide block on a narrow column is flagged for support."""
+    column = make_box(size=(4.0, 4.0, 10.0), offset=(8.0, 8.0, 0.0))
+    top = make_box(size=(20.0, 20.0, 5.0), offset=(0.0, 0.0, 10.0))
+    estimate = slice_and_estimate(np.concatenate([column, top]), 0.2)
+
+    assert estimate["layer_count"] == 75
+    assert estimate["needs_support"]
+    assert estimate["print_time_hours"] > 0
+    assert not slice_and_estimate(make_box(), 0.2)["needs_support"]
+
+def test_orientation_prefers_flat_and_unsupported():
+    """Test that the optimizer flips overhangs onto the plate and lays tall parts down."""
+    column = make_box(size=(4.0, 4.0, 10.0), offset=(8.0, 8.0, 0.0))
+    top = make_box(size=(20.0, 20.0, 5.0), offset=(0.0, 0.0, 10.0))
+    result = optimize_orientation(np.concatenate([column, top]), candidates=64)
+
+    assert result["current"]["support_volume_cm3"] > 0
+    best = result["best"][0]
+    assert best["up"] == [0.0, 0.0, -1.0]
+    assert best["support_volume_cm3"] < result["current"]["support_volume_cm3"]
+    assert np.allclose(np.array(best["rotation"]) @ best["up"], [0.0, 0.0, 1.0])
+
+    tall = optimize_orientation(make_box(size=(5.0, 5.0, 50.0)), candidates=64)
+    assert tall["best"][0]["height_mm"] == pytest.approx(5.0)
+
+def test_render_thumbnail():
+    """Test that a rendered box is centred, shaded and encodes as a PNG."""
+    image = render_mesh(make_box(), size=64)
+
+    assert image.shape == (64, 64, 4)
+    # Corners stay transparent, the centre is covered by the model
+    assert image[0, 0, 3] == 0 and image[-1, -1, 3] == 0
+    assert image[32, 32, 3] == 255
+    # The three visible sides get distinct shades
+    covered = image[image[:, :, 3] == 255][:, :3]
+    assert len(np.unique(covered, axis=0)) == 3
+
+    png = encode_png(image)
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+    assert zlib.decompress(png[png.index(b"IDAT") + 4:-16])[1:257] == image[0].tobytes()
+
+def test_preview_lods_round_trip():
+    """Test that levels of detail fit their budgets and survive quantization."""
+    # A finely tessellated flat sheet: a 40 x 40 grid of quads
+    size = 40
+    x, y = np.meshgrid(np.arange(size + 1, dtype=np.float32), np.arange(size + 1, dtype=np.float32))
+    grid = np.stack([x, y, np.full_like(x, 5.0)], axis=-1)
+    a, b, c, d = grid[:-1, :-1], grid[:-1, 1:], grid[1:, 1:], grid[1:, :-1]
+    top = np.concatenate([np.stack([a, b, c], axis=2), np.stack([a, c, d], axis=2)]).reshape(-1, 3, 3)
+
+    lods = build_lods(top, targets=(10_000, 500, 100))
+    assert [len(faces) for _, faces in lods][0] == len(top)
+    assert all(len(faces) <= target for (_, faces), target in zip(lods[1:], (500, 100)))
+
+    vertices, faces = lods[1]
+    decoded_vertices, normals, decoded_faces = decode_preview(encode_preview(vertices, faces))
+    assert np.array_equal(decoded_faces, faces)
+    assert np.abs(decoded_vertices - vertices).max() < size / 65535 + 1e-4
+    # The sheet is flat, so every normal points straight up or down
+    assert np.allclose(np.abs(normals[:, 2]), 1.0, atol=0.02)
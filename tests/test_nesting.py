@@ -0,0 +1,24 @@
+
+from app.services.nesting import pack_plates, estimate_plates
+
+def test_pack_identical_parts():
+    """Test that identical parts fill whole plates before opening another."""
+    assert pack_plates([(10, 10, 5, 100)], (100, 100, 100))["plates"] == 1
+    result = pack_plates([(10, 10, 5, 101)], (100, 100, 100))
+    assert result["plates"] == 2
+    assert result["parts_per_plate"] == [100]
+
+def test_pack_mixed_parts_share_plates():
+    """Test that smaller parts top up shelves left by larger ones."""
+    result = pack_plates([(10, 10, 5, 250), (5, 5, 5, 10)], (100, 100, 100))
+    assert result["plates"] == 3
+
+def test_parts_that_do_not_fit():
+    """Test that oversized parts are rejected per printer."""
+    assert pack_plates([(200, 10, 5, 1)], (100, 100, 100)) is None
+    assert pack_plates([(10, 10, 500, 1)], (100, 100, 100)) is None
+
+    printers = [{"name": "small", "x": 100, "y": 100, "z": 100}, {"name": "large", "x": 300, "y": 300, "z": 300}]
+    result = estimate_plates([(200, 10, 5)], 1, printers)
+    assert result["printer"] == "large"
+    assert len(result["options"]) == 1
@@ -0,0 +1,73 @@
+
+import socket
+import pytest
+from email import message_from_bytes
+from aiosmtpd.controller import Controller
+from aiosmtpd.handlers import Message
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.models.notification import AdminNotification
+from app.services.notifications import notify_admins, flush_admin_digest
+from app.utils import mail_transport
+
+class Inbox(Message):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def handle_message(self, message):
+        self.messages.append(message)
+
+@pytest.fixture
+def inbox(monkeypatch):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = Inbox()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    pool = mail_transport.SMTPPool("127.0.0.1", port, use_tls=False, timeout=5)
+    monkeypatch.setattr(mail_transport, "_transport", pool)
+    monkeypatch.setattr(settings, "EMAIL_ENABLED", True)
+    try:
+        yield handler.messages
+    finally:
+        pool.close()
+        controller.stop()
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    AdminNotification.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def test_digest_mode(db, inbox, monkeypatch):
+    """Test that notifications are buffered into one digest, except high-priority ones."""
+    monkeypatch.setattr(settings, "ADMIN_NOTIFICATION_MODE", "digest")
+    for n in range(3):
+        assert notify_admins(db, f"Quote #{n}", "<p>Quote</p>", link=f"http://admin/quotes/{n}")
+    assert notify_admins(db, "Quote #9", "<p>Big quote</p>", high_priority=True)
+    db.commit()
+    assert [message["Subject"] for message in inbox] == ["Quote #9"]
+
+    assert flush_admin_digest(db) == 3
+    assert flush_admin_digest(db) == 0
+    assert len(inbox) == 2
+    digest = message_from_bytes(inbox[1].as_bytes()).get_payload()[0].get_payload(decode=True).decode()
+    assert all(f'<a href="http://admin/quotes/{n}">Quote #{n}</a>' in digest for n in range(3))
+    assert db.query(AdminNotification).count() == 0
+
+def test_immediate_mode(db, inbox, monkeypatch):
+    """Test that each notification is emailed right away."""
+    monkeypatch.setattr(settings, "ADMIN_NOTIFICATION_MODE", "immediate")
+    assert notify_admins(db, "Quote #1", "<p>Quote</p>")
+    assert notify_admins(db, "Quote #2", "<p>Quote</p>")
+    assert [message["Subject"] for message in inbox] == ["Quote #1", "Quote #2"]
+    assert db.query(AdminNotification).count() == 0
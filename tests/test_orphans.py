@@ -0,0 +1,103 @@
+
+import os
+import io
+import time
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.models.user import User  # Registers the table upload sessions reference
+from app.models.blob import Blob
+from app.models.product import Product
+from app.models.upload_session import UploadSession
+from app.services import orphans
+from app.services.blobs import save_blob_sync, find_blob
+from app.services.orphans import collect_orphans
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "GC_GRACE_HOURS", 1)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for model in (Blob, Product, UploadSession):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def quotes(monkeypatch):
+    """File lists of the quotes; the && array query needs PostgreSQL."""
+    quote_files = []
+    monkeypatch.setattr(
+        orphans, "_quote_files",
+        lambda db, paths: [files for files in quote_files if set(files) & set(paths)]
+    )
+    return quote_files
+
+def write(tmp_path, path, data=b"x" * 100, age_hours=2):
+    full_path = tmp_path / path
+    full_path.parent.mkdir(parents=True, exist_ok=True)
+    full_path.write_bytes(data)
+    mtime = time.time() - age_hours * 3600
+    os.utime(full_path, (mtime, mtime))
+    return path
+
+def test_collects_only_unreferenced_old_files(db, tmp_path, quotes):
+    """Test that orphans past the grace period go and everything in use stays."""
+    quotes.append(["quotes/kept.stl"])
+    db.add(Product(title="Lamp", image="images/lamp.jpg"))
+    db.commit()
+    kept = [
+        write(tmp_path, "quotes/kept.stl"),
+        write(tmp_path, "quotes/kept.stl.mesh"),
+        write(tmp_path, "images/lamp.jpg"),
+        write(tmp_path, "quotes/new.stl", age_hours=0),
+        write(tmp_path, f"quotes/thumbnails/{'a' * 64}.png"),
+    ]
+    deleted = [
+        write(tmp_path, "quotes/lost.stl"),
+        write(tmp_path, "images/replaced.jpg"),
+        write(tmp_path, "quotes/gone.stl.mesh"),
+        write(tmp_path, "blobs/tmpabc.tmp"),
+        write(tmp_path, "sessions/" + "0" * 32 + ".part"),
+        write(tmp_path, f"blobs/{'b' * 2}/{'b' * 64}.stl"),
+        write(tmp_path, f"blobs/{'c' * 2}/previews/{'c' * 64}/lod0.bin"),
+    ]
+
+    stats = collect_orphans(db, dry_run=True)
+    assert stats["deleted"] == len(deleted) and stats["bytes_reclaimed"] == 100 * len(deleted)
+    assert all((tmp_path / path).exists() for path in deleted)
+
+    stats = collect_orphans(db)
+    assert stats["scanned"] == len(kept) + len(deleted)
+    assert stats["deleted"] == len(deleted)
+    assert all((tmp_path / path).exists() for path in kept)
+    assert not any((tmp_path / path).exists() for path in deleted)
+    # Emptied preview folders go too
+    assert not (tmp_path / "blobs" / "cc" / "previews" / ("c" * 64)).exists()
+
+def test_reconciles_leaked_blob_references(db, tmp_path, quotes, monkeypatch):
+    """Test that references held by nothing are dropped, deleting the blob with the last."""
+    used, _ = save_blob_sync(db, UploadFile(io.BytesIO(b"solid used\n"), filename="used.stl"))
+    leaked, leaked_sha256 = save_blob_sync(db, UploadFile(io.BytesIO(b"solid leaked\n"), filename="leaked.stl"))
+    save_blob_sync(db, UploadFile(io.BytesIO(b"solid used\n"), filename="used.stl"))
+    quotes.append([used])
+    thumbnail = write(tmp_path, os.path.join(os.path.dirname(leaked), "thumbnails", f"{leaked_sha256}.png"))
+
+    # Fresh rows are left alone, as their requests may still be running
+    assert collect_orphans(db)["refcounts_fixed"] == 0
+    assert find_blob(db, leaked_sha256).refcount == 1
+
+    monkeypatch.setattr(settings, "GC_GRACE_HOURS", -1)
+    stats = collect_orphans(db)
+    assert stats["refcounts_fixed"] == 2
+    assert db.query(Blob).filter(Blob.path == used).one().refcount == 1
+    assert find_blob(db, leaked_sha256) is None
+    assert not (tmp_path / leaked).exists() and not (tmp_path / thumbnail).exists()
+    assert (tmp_path / used).exists()
@@ -0,0 +1,60 @@
+
+import pytest
+
+from app.services.pricing import (
+    price_matrix, price_models, quantity_multiplier, validate_options, PricingError,
+    MATERIALS, FINISHES, SETUP_FEE, MINIMUM_UNIT_PRICE
+)
+
+def test_price_matrix_shape_and_values():
+    """Test that N files and M options produce (N, M) price arrays."""
+    options = [("PLA", "standard"), ("resina", "pintado"), ("petg", "sanded")]
+    prices = price_matrix([100.0, 0.5], options, quantity=1)
+
+    assert prices["total_price"].shape == (2, 3)
+    expected = 100.0 * MATERIALS["resin"]["cost_per_cm3"] * FINISHES["painted"]["multiplier"]
+    assert prices["unit_price"][0, 1] == pytest.approx(expected)
+    assert prices["weight_g"][0, 0] == pytest.approx(100.0 * MATERIALS["pla"]["density"])
+    # Tiny parts are charged the minimum unit price
+    assert prices["unit_price"][1, 0] == pytest.approx(MINIMUM_UNIT_PRICE)
+    assert prices["total_price"][1, 0] == pytest.approx(MINIMUM_UNIT_PRICE + SETUP_FEE)
+
+def test_quantity_breaks():
+    """Test that larger quantities get cheaper unit prices."""
+    assert quantity_multiplier(1) == 1.0
+    assert quantity_multiplier(10) < quantity_multiplier(9)
+    assert quantity_multiplier(1000) <= quantity_multiplier(100)
+    with pytest.raises(PricingError):
+        quantity_multiplier(0)
+
+def test_validate_options():
+    """Test that options are checked against the pricing tables up front."""
+    validate_options([("PLA", "standard"), ("resina", "pintado")], 5)
+    with pytest.raises(PricingError, match="material"):
+        validate_options([("unobtainium", "standard")], 1)
+    with pytest.raises(PricingError, match="finish"):
+        validate_options([("pla", "gilded")], 1)
+    with pytest.raises(PricingError):
+        validate_options([("pla", "standard")], 0)
+
+def test_price_models_unknown_material():
+    """Test that unknown materials leave the quote for manual pricing."""
+    models = {"quotes/a.stl": {"volume_cm3": 10.0}}
+
+    assert price_models(models, "unobtanium", "standard", 1) is None
+    assert price_models({"quotes/b.stl": {"error": "broken"}}, "pla", "standard", 1) is None
+
+    pricing = price_models(models, "pla", "standard", 2)
+    assert pricing["total"] == pytest.approx(pricing["files"]["quotes/a.stl"]["total_price"])
+
+def test_price_models_uses_sliced_print_time():
+    """Test that lead times follow the sliced print time of the material's process."""
+    slicing = {"print_time_hours": 30.0, "resin_print_time_hours": 5.0}
+    models = {"quotes/a.stl": {"volume_cm3": 10.0, "slicing": slicing}}
+    nesting = {"plates": 1}
+
+    fdm = price_models(models, "pla", "standard", 2, nesting)
+    resin = price_models(models, "resina", "standard", 2, nesting)
+    assert fdm["print_time_hours"] == pytest.approx(60.0)
+    assert resin["print_time_hours"] == pytest.approx(10.0)
+    assert fdm["lead_time_days"] > resin["lead_time_days"]
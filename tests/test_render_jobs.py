@@ -0,0 +1,89 @@
+
+import pytest
+from datetime import datetime, timedelta, timezone
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.config import settings
+from app.models.job import Job, JobStatus
+from app.models.product import Product
+from app.services import images, previews, thumbnails
+from app.services.jobs import claim_jobs, run_job
+from app.services.render_jobs import enqueue_product_model_renders, enqueue_product_image_variants
+from app.services.workers import WorkerPoolSaturated
+from tests.test_mesh import make_box, write_binary_stl
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "CACHE_DIR", str(tmp_path / "cache"))
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    for model in (Job, Product):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def busy_pool(fn, *args):
+    raise WorkerPoolSaturated("Worker pool is busy, try again shortly")
+
+def test_model_renders_recorded_once_written(db, tmp_path, monkeypatch):
+    """Test that a busy pool retries the thumbnail and previews later instead of linking missing files."""
+    write_binary_stl(tmp_path / "part.stl", make_box())
+    product = Product(title="Part", model_file="part.stl", model_analysis={"sha256": "a" * 64})
+    db.add(product)
+    db.flush()
+    enqueue_product_model_renders(db, product)
+    db.commit()
+
+    for module in (thumbnails, previews):
+        monkeypatch.setattr(module, "run_in_pool_sync", busy_pool)
+    job_ids = claim_jobs(db, 10)
+    for job_id in job_ids:
+        run_job(db, job_id)
+        job = db.get(Job, job_id)
+        assert job.status == JobStatus.pending and job.last_error.startswith("WorkerPoolSaturated")
+    for job_id in job_ids:
+        db.get(Job, job_id).run_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    product = db.get(Product, product.id)
+    assert product.thumbnail is None and product.model_previews is None
+
+    for module in (thumbnails, previews):
+        monkeypatch.setattr(module, "run_in_pool_sync", lambda fn, *args: fn(*args))
+    assert claim_jobs(db, 10) == job_ids
+    for job_id in job_ids:
+        run_job(db, job_id)
+        assert db.get(Job, job_id).status == JobStatus.done
+    product = db.get(Product, product.id)
+    assert product.thumbnail == f"thumbnails/{'a' * 64}.png"
+    assert (tmp_path / product.thumbnail).read_bytes().startswith(b"\x89PNG")
+    assert product.model_previews and all((tmp_path / lod["path"]).exists() for lod in product.model_previews)
+
+def test_image_variants_recorded_once_written(db, tmp_path, monkeypatch):
+    """Test that a busy pool retries the image variants later instead of listing missing files."""
+    Image.new("RGB", (800, 600), "red").save(tmp_path / "photo.jpg")
+    product = Product(title="Photo", image="photo.jpg")
+    db.add(product)
+    db.flush()
+    enqueue_product_image_variants(db, product, "b" * 64)
+    db.commit()
+
+    monkeypatch.setattr(images, "run_in_pool_sync", busy_pool)
+    job_id, = claim_jobs(db, 10)
+    run_job(db, job_id)
+    job = db.get(Job, job_id)
+    assert job.status == JobStatus.pending
+    assert db.get(Product, product.id).image_variants is None
+
+    monkeypatch.setattr(images, "run_in_pool_sync", lambda fn, *args: fn(*args))
+    job.run_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db.commit()
+    claim_jobs(db, 10)
+    run_job(db, job_id)
+    variants = db.get(Product, product.id).image_variants
+    assert variants and all((tmp_path / variant["path"]).exists() for variant in variants)
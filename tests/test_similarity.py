@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from app.services.mesh import shape_descriptor
+from app.services.mesh.descriptor import DESCRIPTOR_SIZE
+from app.utils.vector_index import VectorIndex
+from tests.test_mesh import make_box
+
+def test_descriptor_separates_shapes():
+    """Test that similar shapes get closer descriptors than different ones."""
+    cube = shape_descriptor(make_box(size=(10.0, 10.0, 10.0)))
+    moved_cube = shape_descriptor(make_box(size=(10.2, 10.0, 10.0), offset=(50.0, 0.0, 0.0)))
+    plank = shape_descriptor(make_box(size=(100.0, 10.0, 2.0)))
+
+    assert cube.shape == (DESCRIPTOR_SIZE,)
+    assert np.linalg.norm(cube - moved_cube) < np.linalg.norm(cube - plank)
+
+def test_vector_index_query_remove_and_reload(tmp_path):
+    """Test nearest neighbours, owner removal and persistence."""
+    index = VectorIndex(str(tmp_path / "index.npz"), 3, kinds=("quote", "product"))
+    index.add([
+        (("quote", 1, "a.stl"), [0.0, 0.0, 0.0]),
+        (("quote", 2, "b.stl"), [1.0, 0.0, 0.0]),
+        (("quote", 2, "c.stl"), [0.0, 2.0, 0.0]),
+        (("product", 1, "d.stl"), [0.1, 0.0, 0.0]),
+        (("product", 3, "bad.stl"), [1.0]),
+    ])
+    assert len(index) == 4
+
+    matches = index.query([0.0, 0.0, 0.0], limit=2, exclude=("quote", 1))
+    assert [(m["kind"], m["id"], m["name"]) for m in matches] == [("product", 1, "d.stl"), ("quote", 2, "b.stl")]
+    assert matches[0]["distance"] == pytest.approx(0.1, abs=1e-5)
+
+    assert index.owners("quote") == {1, 2} and index.owners("product") == {1}
+
+    index.remove("quote", 2)
+    index.synced_at = 1700000000.5
+    index.save()
+    reloaded = VectorIndex(str(tmp_path / "index.npz"), 3, kinds=("quote", "product"))
+    assert reloaded.load()
+    assert reloaded.synced_at == 1700000000.5 and reloaded.owners("quote") == {1}
+    assert [m["name"] for m in reloaded.query([0.0, 0.0, 0.0])] == ["a.stl", "d.stl"]
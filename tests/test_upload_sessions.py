@@ -0,0 +1,166 @@
+
+import os
+import asyncio
+import hashlib
+import pytest
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.requests import ClientDisconnect
+
+from app.config import settings
+from app.models.user import User  # Registers the table upload sessions reference
+from app.models.blob import Blob
+from app.models.upload_session import UploadSession, UploadSessionStatus
+from app.services.blobs import find_blob, release_files
+from app.services.upload_sessions import (
+    create_session, get_session, write_chunk, finalize_session, claim_sessions, consume_sessions,
+    delete_session, expire_sessions, part_path
+)
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Blob.__table__.create(engine)
+    UploadSession.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+def body(*chunks, disconnect=False):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+        if disconnect:
+            raise ClientDisconnect()
+    return stream()
+
+def put(db, session, offset, *chunks, **kwargs):
+    return asyncio.run(write_chunk(db, session, offset, body(*chunks, **kwargs)))
+
+def test_resumed_upload_is_stored(db, tmp_path):
+    """Test that an interrupted upload resumes from the bytes received and finalizes into the store."""
+    data = os.urandom(10000)
+    session = create_session(db, 1, "part.STL", len(data))
+
+    # The connection drops partway through the first chunk
+    session = put(db, session, 0, data[:3000], data[3000:4000], disconnect=True)
+    assert session.received == 4000
+    assert get_session(db, session.id, 1).received == 4000
+
+    # Offsets past the bytes received are refused; resending an overlap is fine
+    with pytest.raises(HTTPException) as e:
+        put(db, session, 5000, data[5000:])
+    assert e.value.status_code == 409
+    with pytest.raises(HTTPException) as e:
+        finalize_session(db, session.id, 1)
+    assert e.value.status_code == 409
+    session = put(db, session, 3500, data[3500:])
+    assert session.received == len(data)
+
+    session = finalize_session(db, session.id, 1)
+    sha256 = hashlib.sha256(data).hexdigest()
+    assert session.status == UploadSessionStatus.complete and session.sha256 == sha256
+    assert session.file_path.endswith(f"{sha256}.stl")
+    assert (tmp_path / session.file_path).read_bytes() == data
+    assert not os.path.exists(part_path(session.id))
+    assert find_blob(db, sha256).refcount == 1
+
+    # Retrying the finalize changes nothing
+    assert finalize_session(db, session.id, 1).file_path == session.file_path
+    assert find_blob(db, sha256).refcount == 1
+
+def test_session_rejects_oversize_and_other_users(db, monkeypatch):
+    """Test the size and ownership checks of upload sessions."""
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 1024)
+    with pytest.raises(HTTPException):
+        create_session(db, 1, "big.stl", 2048)
+    with pytest.raises(HTTPException):
+        create_session(db, 1, "notes.txt", 10)
+
+    session = create_session(db, 1, "part.obj", 10)
+    with pytest.raises(HTTPException) as e:
+        get_session(db, session.id, 2)
+    assert e.value.status_code == 404
+
+    # A chunk running past the declared size keeps only what came before it
+    with pytest.raises(HTTPException) as e:
+        put(db, session, 0, b"v 0 0", b" 0\nv 1 1 1\n")
+    assert e.value.status_code == 400
+    assert get_session(db, session.id, 1).received == 5
+
+def test_claimed_sessions_pass_their_reference(db):
+    """Test that quotes take over the files of finalized sessions, once each."""
+    data = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n"
+    session = create_session(db, 1, "part.obj", len(data))
+    put(db, session, 0, data)
+    pending = create_session(db, 1, "other.obj", len(data))
+
+    with pytest.raises(HTTPException) as e:
+        claim_sessions(db, [session.id, pending.id], 1)
+    assert e.value.status_code == 409
+    with pytest.raises(HTTPException):
+        claim_sessions(db, [session.id], 1)
+
+    session = finalize_session(db, session.id, 1)
+    claimed = claim_sessions(db, [session.id, session.id], 1)
+    assert claimed == [(session.file_path, session.sha256)]
+    assert find_blob(db, session.sha256).refcount == 2
+
+    # Saving the quote deletes the session and its own reference
+    consume_sessions(db, [session.id], 1)
+    db.commit()
+    assert find_blob(db, session.sha256).refcount == 1
+    with pytest.raises(HTTPException):
+        claim_sessions(db, [session.id], 1)
+
+def test_sessions_survive_a_saturated_pool(db, tmp_path):
+    """Test that a quote refused with a 503 can be retried with the same sessions."""
+    data = os.urandom(100)
+    session = create_session(db, 1, "part.stl", len(data))
+    put(db, session, 0, data)
+    session = finalize_session(db, session.id, 1)
+
+    # The worker pool is saturated: the quote releases what it claimed
+    claimed = claim_sessions(db, [session.id], 1)
+    release_files(db, [file_path for file_path, _ in claimed])
+    assert find_blob(db, session.sha256).refcount == 1
+    assert get_session(db, session.id, 1).status == UploadSessionStatus.complete
+
+    # The retry goes through
+    assert claim_sessions(db, [session.id], 1) == claimed
+    consume_sessions(db, [session.id], 1)
+    db.commit()
+    assert find_blob(db, session.sha256).refcount == 1
+    assert (tmp_path / session.file_path).read_bytes() == data
+    assert db.query(UploadSession).count() == 0
+
+def test_expired_sessions_are_discarded(db, tmp_path):
+    """Test that idle sessions lose their partial file or their stored file."""
+    data = os.urandom(100)
+    partial = create_session(db, 1, "a.stl", len(data))
+    put(db, partial, 0, data[:50])
+    complete = create_session(db, 1, "b.stl", len(data))
+    put(db, complete, 0, data)
+    complete = finalize_session(db, complete.id, 1)
+    fresh = create_session(db, 1, "c.stl", len(data))
+    abandoned = create_session(db, 1, "d.stl", len(data))
+
+    delete_session(db, abandoned.id, 1)
+    assert not os.path.exists(part_path(abandoned.id))
+
+    past = datetime.now(timezone.utc) - timedelta(minutes=1)
+    for session in (partial, complete):
+        session.expires_at = past
+    db.commit()
+
+    assert expire_sessions(db) == 2
+    assert not os.path.exists(part_path(partial.id))
+    assert not (tmp_path / complete.file_path).exists()
+    assert find_blob(db, complete.sha256) is None
+    assert [session.id for session in db.query(UploadSession)] == [fresh.id]
@@ -0,0 +1,33 @@
+
+import os
+import asyncio
+import pytest
+
+from app.config import settings
+from app.services.workers import gather_in_pool, run_in_pool, run_in_pool_sync, shutdown_pool, WorkerPoolSaturated
+
+def crash() -> None:
+    os._exit(1)
+
+@pytest.fixture(autouse=True)
+def pool():
+    yield
+    shutdown_pool()
+
+def test_pool_recovers_from_dead_worker():
+    """Test that a job whose worker dies fails alone, and the pool restarts for the next ones."""
+    assert run_in_pool_sync(abs, -3) == 3
+
+    with pytest.raises(WorkerPoolSaturated):
+        run_in_pool_sync(crash)
+
+    assert run_in_pool_sync(abs, -4) == 4
+    with pytest.raises(WorkerPoolSaturated):
+        asyncio.run(run_in_pool(crash))
+    assert asyncio.run(run_in_pool(abs, -5)) == 5
+
+def test_request_fan_out_fits_the_pool():
+    """Test that one request can run more jobs than the pool and its queue hold."""
+    capacity = settings.ANALYSIS_POOL_SIZE + settings.ANALYSIS_QUEUE_DEPTH
+    jobs = [run_in_pool(abs, -n) for n in range(3 * capacity)]
+    assert asyncio.run(gather_in_pool(jobs)) == list(range(3 * capacity))
@@ -0,0 +1,31 @@
+
+import io
+import os
+import zipfile
+import zstandard
+
+from app.utils.file_response import SEND_CHUNK_SIZE
+from app.utils.zip_stream import stream_zip
+
+def test_stream_zip(tmp_path):
+    """Test that files are archived in bounded chunks, decompressed and stored or deflated by format."""
+    model = b"solid part\n" * 100000
+    packed = os.urandom(3 * SEND_CHUNK_SIZE)
+    (tmp_path / "part.stl").write_bytes(zstandard.ZstdCompressor().compress(model))
+    (tmp_path / "plate.3mf").write_bytes(packed)
+
+    chunks = list(stream_zip([
+        ("part.stl", str(tmp_path / "part.stl")),
+        ("missing.stl", str(tmp_path / "missing.stl")),
+        ("plate.3mf", str(tmp_path / "plate.3mf")),
+    ]))
+    assert len(chunks) > 3
+    assert max(len(chunk) for chunk in chunks) < SEND_CHUNK_SIZE + 1024
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["part.stl", "plate.3mf"]
+        assert archive.read("part.stl") == model
+        assert archive.read("plate.3mf") == packed
+        assert archive.getinfo("part.stl").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.getinfo("plate.3mf").compress_type == zipfile.ZIP_STORED